@@ -0,0 +1,82 @@
+"""
+Obsidian 链接改写微基准：对比旧版（代码块替换为占位符，wiki 链接与标准链接各扫描一遍，
+再逐个 replace 恢复代码块）与新版（单次线性扫描）在代码块密集文章上的耗时。
+
+翻译接口受网络与频率限制，计时期间翻译替换为原样返回；内部链接索引按空索引处理，不访问数据库。
+
+用法（在 backend 目录下执行）：
+    python benchmarks/bench_links.py [--blocks 100 500 2000] [--rounds 5]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+import django
+
+# 将项目根目录添加到 Python 的模块搜索路径中
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", 'settings.development')
+django.setup()
+
+from blog import utils  # noqa: E402
+
+# 旧版代码块正则与占位符
+legacy_code_pattern = re.compile(r'(```[\s\S]*?```|~~~[\s\S]*?~~~|`[^`]*?`)')
+
+
+def legacy_update_obsidian_links(content, title=None):
+    """旧版流程：保存代码块 -> wiki 链接 -> 标准链接 -> 逐个恢复代码块"""
+    code_blocks = legacy_code_pattern.findall(content)
+    content = legacy_code_pattern.sub('__CODE_BLOCK__', content)
+    content = utils.convert_obsidian_wiki_links(content, title)
+    content = utils.convert_standard_markdown_links(content, title)
+    for code_block in code_blocks:
+        content = content.replace('__CODE_BLOCK__', code_block, 1)
+    return content
+
+
+def build_post(blocks):
+    """构造包含指定数量代码块的文章，每个代码块前后穿插行内代码与各类链接"""
+    section = (
+        '## 第 {i} 节\n\n'
+        '正文使用 `inline_{i}()` 调用，参见 [[note-{i}|笔记 {i}]] 与 ![[image-{i}.png|300]]。\n'
+        '外部链接 [Django](https://www.djangoproject.com/) 与本地图片 ![图 {i}](res/Pasted image {i}.png)。\n\n'
+        '```python\n'
+        'def func_{i}(x):\n'
+        '    # [[不是链接]] 与 [也不是](链接)\n'
+        '    return x * {i}\n'
+        '```\n\n'
+    )
+    return ''.join(section.format(i=i) for i in range(blocks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Obsidian 链接改写微基准')
+    parser.add_argument('--blocks', type=int, nargs='+', default=[100, 500, 2000], help='文章中的代码块数量')
+    parser.add_argument('--rounds', type=int, default=5, help='每个实现的计时轮数')
+    args = parser.parse_args()
+
+    utils.translate_many = lambda texts, from_lang='zh', to_lang='en': list(texts)
+    utils.load_link_slugs = dict
+
+    for blocks in args.blocks:
+        text = build_post(blocks)
+        assert legacy_update_obsidian_links(text, 'title') == utils.update_obsidian_links(text, 'title')
+        print(f'corpus: {blocks} code blocks, {len(text.encode("utf-8")) / 1024:.1f} KB, rounds: {args.rounds}')
+
+        results = {}
+        for name, func in [('legacy', legacy_update_obsidian_links), ('single-pass', utils.update_obsidian_links)]:
+            # 取多次重复中的最小值，降低系统噪声的影响
+            best = min(timeit.repeat(lambda: func(text, 'title'), number=args.rounds, repeat=3)) / args.rounds
+            results[name] = best
+            print(f'{name:>13}: {best * 1000:8.3f} ms/post')
+
+        print(f'{"speedup":>13}: {results["legacy"] / results["single-pass"]:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+渲染流程基准：在不同形态、不同大小的合成语料上分别测量各阶段的耗时、内存分配与吞吐量，
+结果保存为 JSON，可与之前提交的结果对比以发现性能回退。
+
+离线运行：翻译接口替换为原样返回，不访问网络；内部链接索引按空索引处理，不访问数据库。
+
+阶段：
+    update_obsidian_links   链接改写
+    render_markdown         完整渲染（不经过缓存）
+    generate_toc            由 token 流生成目录
+    generate_summary        从 HTML 生成摘要
+    summary_from_markdown   从 Markdown 生成摘要
+    highlight               搜索结果高亮
+    count_words             字数统计
+
+用法（在 backend 目录下执行）：
+    python benchmarks/bench_pipeline.py [--shapes mixed cjk] [--sizes 16 256] [--rounds 5]
+                                        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+import django
+
+# 将项目根目录添加到 Python 的模块搜索路径中
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", 'settings.development')
+django.setup()
+
+from benchmarks.corpora import SHAPES, generate_corpus  # noqa: E402
+from blog import utils  # noqa: E402
+
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+
+# 高亮阶段使用的搜索词，与语料中的词汇重合
+HIGHLIGHT_QUERY = 'django 缓存 render 中国'
+
+
+def prepare(text):
+    """
+    预先计算各阶段的输入，避免阶段之间相互计入耗时
+    :return: 各阶段输入组成的字典
+    """
+    body = utils.update_obsidian_links(text, title='benchmark')
+    tokens = utils.markdown_renderer.parse(utils.replace_markdown_symbols(body), {})
+    html, _ = utils.render_markdown_uncached(text, title='benchmark')
+    return {'markdown': text, 'tokens': tokens, 'html': html}
+
+
+# 阶段名称 -> (输入名称, 执行函数)
+STAGES = {
+    'update_obsidian_links': ('markdown', lambda text: utils.update_obsidian_links(text, title='benchmark')),
+    'render_markdown': ('markdown', lambda text: utils.render_markdown_uncached(text, title='benchmark')),
+    'generate_toc': ('tokens', utils.generate_toc),
+    'generate_summary': ('html', lambda html: utils.generate_summary(html, 200)),
+    'summary_from_markdown': ('markdown', lambda text: utils.generate_summary_from_markdown(text, 200)),
+    'highlight': ('html', lambda html: utils.CustomHighlighter(HIGHLIGHT_QUERY).highlight(html)),
+    'count_words': ('html', utils.count_words),
+}
+
+
+def measure_memory(func, arg):
+    """
+    用 tracemalloc 统计单次执行的内存分配
+    :return: (峰值 KB, 执行结束时仍未释放的分配 KB)
+    """
+    tracemalloc.start()
+    try:
+        func(arg)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024, current / 1024
+
+
+def run_stage(stage, inputs, rounds):
+    """
+    测量单个阶段：耗时取多次重复中的最小值，吞吐量按源 Markdown 大小计算
+    """
+    input_name, func = STAGES[stage]
+    arg = inputs[input_name]
+    # 先执行一次预热，再单独统计内存，计时期间不开启 tracemalloc
+    func(arg)
+    peak_kb, retained_kb = measure_memory(func, arg)
+    seconds = min(timeit.repeat(lambda: func(arg), number=rounds, repeat=3)) / rounds
+    size = len(inputs['markdown'].encode('utf-8'))
+    return {
+        'seconds': seconds,
+        'mb_per_s': size / (1024 * 1024) / seconds if seconds > 0 else None,
+        'peak_kb': round(peak_kb, 1),
+        'retained_kb': round(retained_kb, 1),
+    }
+
+
+def git_commit():
+    """获取当前提交，便于对比不同提交的结果"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path):
+    """与基线结果对比，输出耗时变化比例"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['shape'], r['size_kb'], r['stage']): r for r in baseline['results']}
+
+    print(f'\ncompared with {baseline_path} ({baseline["meta"]["commit"]}):')
+    for r in results:
+        old = previous.get((r['shape'], r['size_kb'], r['stage']))
+        if old:
+            ratio = r['seconds'] / old['seconds']
+            print(f'{r["shape"]:>12} {r["size_kb"]:>6} KB {r["stage"]:>22}: {ratio:6.2f}x time'
+                  f'{"  <-- slower" if ratio > 1.1 else ""}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='渲染流程基准')
+    parser.add_argument('--shapes', nargs='+', default=SHAPES, choices=SHAPES, help='语料形态')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 256], help='语料大小（KB）')
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=list(STAGES), help='测量的阶段')
+    parser.add_argument('--rounds', type=int, default=5, help='每个阶段的计时轮数')
+    parser.add_argument('--seed', type=int, default=0, help='语料随机种子')
+    parser.add_argument('--output', help='JSON 结果文件，默认保存到 benchmarks/results/pipeline-<commit>.json')
+    parser.add_argument('--compare', help='与之前保存的 JSON 结果对比')
+    args = parser.parse_args()
+
+    # 翻译接口替换为原样返回，保证离线运行且耗时稳定
+    utils.translate_many = lambda texts, from_lang='zh', to_lang='en': list(texts)
+    utils.load_link_slugs = dict
+
+    results = []
+    print(f'{"shape":>12} {"size":>9} {"stage":>22} {"ms":>10} {"MB/s":>8} {"peak KB":>10} {"retained KB":>12}')
+    for shape in args.shapes:
+        for size_kb in args.sizes:
+            inputs = prepare(generate_corpus(shape, size_kb, seed=args.seed))
+            for stage in args.stages:
+                result = {'shape': shape, 'size_kb': size_kb, 'stage': stage,
+                          **run_stage(stage, inputs, args.rounds)}
+                results.append(result)
+                print(f'{shape:>12} {size_kb:>6} KB {stage:>22} {result["seconds"] * 1000:10.3f} '
+                      f'{result["mb_per_s"] or 0:8.2f} {result["peak_kb"]:10.1f} {result["retained_kb"]:12.1f}')
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f'pipeline-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'commit': commit,
+                'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'rounds': args.rounds,
+                'seed': args.seed,
+            },
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f'\nresults saved to {output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+链接解析病态输入基准：对比原回溯正则与线性解析器在长单行病态输入上的耗时随长度的变化。
+
+原正则在这些输入上为平方级甚至更差，单次耗时超过 --budget 秒后不再测试更大的长度。
+--render 时另外统计完整渲染（链接改写与 markdown-it 渲染）的耗时。
+单元测试只按扫描的字符数验证线性关系（见 LinkParserTest），耗时对比在此测量。
+
+用法（在 backend 目录下执行）：
+    python benchmarks/bench_redos.py [--sizes 4096 16384 65536 262144 1048576] [--budget 1] [--render]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import django
+
+# 将项目根目录添加到 Python 的模块搜索路径中
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", 'settings.development')
+django.setup()
+
+from blog.utils import LinkParser, render_markdown_uncached  # noqa: E402
+
+# 原 wiki 链接与标准链接正则
+legacy_wiki_link_regex = re.compile(
+    r'(!?)\[\[([^\]\|\n#]*?)(?:#([^\]\|\n]*?))?(?:\|([^\]\|\n]*?))?(?:\|(\d+)(?:x(\d+))?)?\]\]'
+)
+legacy_link_regex = re.compile(
+    r'(!)?\[((?:[^\]\|\n]*(?:\|[^\]\n]*)?))\]\(((?:[^()\n]|\([^()\n]*\))*[^)\n]*)\)'
+)
+
+# 病态输入：均为不含换行的单行文本
+CASES = {
+    'unclosed url': lambda n: '[a](' + 'x' * n,
+    'unbalanced parens': lambda n: '[a](' + '(x' * (n // 2),
+    'pipes in text': lambda n: '[' + '|' * n,
+    'link openers': lambda n: '[a](' * (n // 4),
+    'wiki openers': lambda n: '[[' * (n // 2),
+    'wiki pipes': lambda n: '[[' * (n // 8) + '|' * (n // 2) + ']]',
+    'wiki size': lambda n: '[[' * (n // 8) + 'a|b|' + '1' * (n // 2) + 'y]]',
+}
+
+
+def legacy_scan(content):
+    """原实现：两个正则各扫描一遍"""
+    list(legacy_wiki_link_regex.finditer(content))
+    list(legacy_link_regex.finditer(content))
+
+
+def parser_scan(content):
+    """新实现：线性解析器各扫描一遍"""
+    parser = LinkParser(content)
+    list(parser.iter_matches('[[', parser.match_wiki))
+    list(parser.iter_matches('[', parser.match_link))
+
+
+def timed(func, content):
+    started = time.perf_counter()
+    func(content)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='链接解析病态输入基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4096, 16384, 65536, 262144, 1048576],
+                        help='输入长度（字符数）')
+    parser.add_argument('--budget', type=float, default=1, help='原正则单次耗时上限（秒）')
+    parser.add_argument('--render', action='store_true', help='同时测量完整渲染的耗时')
+    args = parser.parse_args()
+
+    render_header = f' {"render (s)":>11}' if args.render else ''
+    print(f'{"case":>18} {"size":>9} {"legacy (s)":>11} {"parser (s)":>11}{render_header}')
+    for name, build in CASES.items():
+        over_budget = False
+        for size in args.sizes:
+            content = build(size)
+            legacy = '-'
+            if not over_budget:
+                elapsed = timed(legacy_scan, content)
+                legacy = f'{elapsed:.3f}'
+                over_budget = elapsed > args.budget
+            render = f' {timed(render_markdown_uncached, content):>11.3f}' if args.render else ''
+            print(f'{name:>18} {size:>9} {legacy:>11} {timed(parser_scan, content):>11.3f}{render}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Markdown 渲染微基准：对比旧版（每次新建解析器、正文与目录各解析一次）与
+新版（模块级渲染器、单次解析同时生成正文与目录）的耗时。
+
+用法（在 backend 目录下执行）：
+    python benchmarks/bench_render.py [--file scripts/sample.md] [--repeat 20] [--rounds 50]
+"""
+import argparse
+import os
+import pathlib
+import sys
+import timeit
+from collections import defaultdict
+
+import django
+
+# 将项目根目录添加到 Python 的模块搜索路径中
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", 'settings.development')
+django.setup()
+
+from markdown_it import MarkdownIt  # noqa: E402
+from mdit_py_plugins.anchors import anchors_plugin  # noqa: E402
+from blog.utils import (  # noqa: E402
+    custom_slugify, generate_toc, markdown_renderer, replace_markdown_symbols,
+)
+
+
+def legacy_dict_to_html(toc):
+    """旧版目录渲染：递归字符串拼接，重复标题会被字典键合并"""
+
+    def render_toc_items(items):
+        html = '<ul class="toc_list">'
+        for title, data in items.items():
+            slug = custom_slugify(title)
+            level = int(data['level'])
+            html += f'<li class="toc-list-item"><a href="#{slug}" class="toc-link node-name--H{level}">{title}</a>'
+            if data['children']:
+                html += render_toc_items(data['children'])
+            html += '</li>'
+        html += '</ul>'
+        return html
+
+    return render_toc_items(toc) if toc else ''
+
+
+def legacy_render(text):
+    """旧版渲染流程：新建解析器，render 一次，生成目录时再 parse 一次"""
+    md = MarkdownIt('gfm-like').use(
+        anchors_plugin, min_level=2, max_level=4, slug_func=custom_slugify,
+        permalink=True, permalinkSymbol='', permalinkBefore=False, permalinkSpace=True
+    )
+    rendered_body = md.render(text)
+
+    tokens = md.parse(text)
+    toc = defaultdict(dict)
+    stack = []
+    for i, token in enumerate(tokens):
+        if token.type == 'heading_open' and token.tag in ['h2', 'h3', 'h4', 'h5']:
+            level = int(token.tag[1])
+            title = tokens[i + 1].content.strip()
+            while stack and stack[-1][1] >= level:
+                stack.pop()
+            current = stack[-1][0] if stack else toc
+            current[title] = {'children': {}, 'level': level}
+            stack.append((current[title]['children'], level))
+
+    return rendered_body, legacy_dict_to_html(dict(toc))
+
+
+def single_parse_render(text):
+    """新版渲染流程：复用模块级渲染器，单次解析"""
+    env = {}
+    tokens = markdown_renderer.parse(text, env)
+    rendered_body = markdown_renderer.renderer.render(tokens, markdown_renderer.options, env)
+    return rendered_body, generate_toc(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Markdown 渲染微基准')
+    parser.add_argument('--file', default=os.path.join(BASE_DIR, 'scripts', 'sample.md'), help='Markdown 语料文件')
+    parser.add_argument('--repeat', type=int, default=20, help='语料重复次数，用于模拟长文')
+    parser.add_argument('--rounds', type=int, default=50, help='每个实现的计时轮数')
+    args = parser.parse_args()
+
+    sample = pathlib.Path(args.file).read_text(encoding='utf-8')
+    text = replace_markdown_symbols('\n\n'.join([sample] * args.repeat))
+    print(f'corpus: {args.file} x {args.repeat} = {len(text.encode("utf-8")) / 1024:.1f} KB, rounds: {args.rounds}')
+
+    results = {}
+    for name, func in [('legacy', legacy_render), ('single-parse', single_parse_render)]:
+        # 取多次重复中的最小值，降低系统噪声的影响
+        best = min(timeit.repeat(lambda: func(text), number=args.rounds, repeat=3)) / args.rounds
+        results[name] = best
+        print(f'{name:>13}: {best * 1000:8.3f} ms/render')
+
+    print(f'{"speedup":>13}: {results["legacy"] / results["single-parse"]:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
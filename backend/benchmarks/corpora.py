@@ -0,0 +1,115 @@
+"""
+基准测试用的合成 Markdown 语料，按形态与大小生成，相同参数与随机种子生成的内容完全一致。
+
+形态：
+    headings     大量多级标题（含重名标题）与短段落
+    wiki_links   密集的 wiki 链接、图片嵌入与本地资源链接
+    code_blocks  大量围栏代码块与行内代码
+    tables       大型表格
+    cjk          以中文为主的长段落
+    mixed        以上各形态轮流出现
+"""
+import random
+
+# 常用汉字，用于生成中文文本
+CJK_CHARS = (
+    '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方'
+    '后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开'
+    '它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此'
+)
+
+ASCII_WORDS = [
+    'django', 'python', 'markdown', 'render', 'cache', 'query', 'model', 'view', 'template', 'index',
+    'search', 'token', 'parser', 'server', 'request', 'response', 'session', 'middleware', 'signal', 'field',
+]
+
+SHAPES = ['headings', 'wiki_links', 'code_blocks', 'tables', 'cjk', 'mixed']
+
+
+def cjk_text(rng, length):
+    """生成指定长度的中文文本，间隔插入标点"""
+    chars = [rng.choice(CJK_CHARS) for _ in range(length)]
+    for i in range(rng.randint(8, 20), length, rng.randint(8, 20)):
+        chars[i] = rng.choice('，。；')
+    return ''.join(chars) + '。'
+
+
+def ascii_text(rng, words):
+    """生成指定单词数的英文文本"""
+    return ' '.join(rng.choice(ASCII_WORDS) for _ in range(words)) + '.'
+
+
+def headings_section(rng, i):
+    level = rng.choice([2, 2, 3, 3, 4, 5])
+    # 约四分之一的标题与之前的标题重名，用于覆盖锚点去重
+    title = f'小结 {i % 7}' if rng.random() < 0.25 else f'{ascii_text(rng, 2)[:-1]} {cjk_text(rng, 4)[:-1]} {i}'
+    return f'{"#" * level} {title}\n\n{ascii_text(rng, 12)} {cjk_text(rng, 20)}\n\n'
+
+
+def wiki_links_section(rng, i):
+    return (
+        f'参见 [[note-{i}]]、[[note-{i}#段落 {i}|别名 {i}]] 与 [[folder/sub/note {i}.md]]。'
+        f'图片 ![[Pasted image {i}.png]]，缩放 ![[image-{i}.jpg|图 {i}|300x200]]。\n'
+        f'本地链接 [文档 {i}](docs/file-{i}.md#anchor) 与图片 ![图 {i}](res/Pasted%20image%20{i}.png)，'
+        f'外部链接 [Django](https://www.djangoproject.com/ref/{i}/)。\n\n'
+    )
+
+
+def code_blocks_section(rng, i):
+    lines = '\n'.join(f'    value_{j} = compute({j}, "[[not-a-link]]")  # `{j}`' for j in range(rng.randint(3, 12)))
+    return (
+        f'调用 `func_{i}()` 前先执行 `setup({i})`，参见 `config[{i}]`。\n\n'
+        f'```python\ndef func_{i}():\n{lines}\n    return [x](y)\n```\n\n'
+        f'~~~bash\npython manage.py command_{i} --option {i}\n~~~\n\n'
+    )
+
+
+def tables_section(rng, i):
+    columns = rng.randint(4, 8)
+    rows = rng.randint(20, 60)
+    header = '| ' + ' | '.join(f'列 {c}' for c in range(columns)) + ' |'
+    divider = '| ' + ' | '.join(rng.choice(['---', ':---:', '---:']) for _ in range(columns)) + ' |'
+    body = '\n'.join(
+        '| ' + ' | '.join(rng.choice([ascii_text(rng, 2), cjk_text(rng, 4), str(rng.randint(0, 10 ** 6))])
+                          for _ in range(columns)) + ' |'
+        for _ in range(rows)
+    )
+    return f'## 表格 {i}\n\n{header}\n{divider}\n{body}\n\n'
+
+
+def cjk_section(rng, i):
+    return f'{cjk_text(rng, rng.randint(80, 300))}\n\n'
+
+
+SECTIONS = {
+    'headings': headings_section,
+    'wiki_links': wiki_links_section,
+    'code_blocks': code_blocks_section,
+    'tables': tables_section,
+    'cjk': cjk_section,
+}
+
+
+def generate_corpus(shape, size_kb, seed=0):
+    """
+    生成指定形态的语料，UTF-8 编码后大小不小于 size_kb
+    :param shape: 语料形态，见 SHAPES
+    :param size_kb: 目标大小（KB）
+    :param seed: 随机种子
+    :return: Markdown 文本
+    """
+    if shape not in SHAPES:
+        raise ValueError(f'未知的语料形态：{shape}')
+
+    rng = random.Random(f'{shape}-{seed}')
+    generators = list(SECTIONS.values()) if shape == 'mixed' else [SECTIONS[shape]]
+
+    parts = ['语料开头的导语段落，用于摘要生成。' + ascii_text(rng, 20) + '\n\n']
+    size = len(parts[0].encode('utf-8'))
+    i = 0
+    while size < size_kb * 1024:
+        section = generators[i % len(generators)](rng, i)
+        parts.append(section)
+        size += len(section.encode('utf-8'))
+        i += 1
+    return ''.join(parts)
@@ -1,7 +1,10 @@
 # Register your models here.
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.urls import path
 from blog.models import Post, Category, Tag
-from blog.utils import render_markdown
+from blog.utils import render_markdown, render_markdown_incremental
 from blog.forms import PostForm
 
 
@@ -23,6 +26,10 @@ class PostAdmin(admin.ModelAdmin):
     # 指定自定义表单类
     form = PostForm
 
+    class Media:
+        # 编辑页实时预览
+        js = ('assets/js/admin-preview.js',)
+
     @admin.display(description='分类')
     def get_categories(self, obj):
         """
@@ -30,6 +37,28 @@ class PostAdmin(admin.ModelAdmin):
         """
         return ', '.join([category.name for category in obj.categories.all()])
 
+    def get_urls(self):
+        """
+        添加实时预览接口
+        """
+        urls = [
+            path('preview/', self.admin_site.admin_view(self.preview_view), name='blog_post_preview'),
+        ]
+        return urls + super().get_urls()
+
+    def preview_view(self, request):
+        """
+        实时预览接口：按块增量渲染正文，只重新渲染变化的块
+        返回正文 HTML 与目录 HTML
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        if not (self.has_add_permission(request) or self.has_change_permission(request)):
+            raise PermissionDenied
+
+        rendered_body, toc = render_markdown_incremental(request.POST.get('body', ''), request.POST.get('title', ''))
+        return JsonResponse({'html': rendered_body, 'toc': toc})
+
     def save_model(self, request, obj, form, change):
         """
         重写 save_model 方法，生成 toc 和 rendered_body
@@ -42,8 +71,8 @@ class PostAdmin(admin.ModelAdmin):
         if (change and 'body' in form.changed_data) or not change:
             # 渲染正文并生成目录
             rendered_body, toc = render_markdown(obj.body, obj.title)
-            obj.rendered_body = rendered_body
-            obj.toc = toc
+            # 同时更新渲染摘要、字数与阅读时间
+            obj.set_rendered(rendered_body, toc)
             # 不需要显式调用 obj.save()，super().save_model() 会处理保存逻辑
 
         # 保存文章模型实例
@@ -0,0 +1,103 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def post_validators(queryset):
+    """
+    文章集合的验证器：最新的更新时间与文章数，一次聚合查询，不读取文章行
+    文章新增、删除，或标题、摘要、置顶、排序时间、标签与分类等页面显示的内容变化时随之变化（见 Post.updated_time）
+    :param queryset: 页面显示的文章（不需要排序与切片）
+    """
+    return queryset.order_by().aggregate(latest=Max('updated_time'), count=Count('pk', distinct=True))
+
+
+def merge_latest(validators, *names):
+    """
+    以 'latest' 与 names 中最晚的时间作为 'latest'（Last-Modified），各项仍计入 ETag
+    :param validators: 验证器字典
+    :param names: 其他时间验证器的名称，如分类、标签自身的更新时间
+    """
+    times = [validators.get(name) for name in ('latest', *names)]
+    validators['latest'] = max((time for time in times if time is not None), default=None)
+    return validators
+
+
+def make_etag(validators):
+    """
+    由验证器生成弱 ETag：页面中的侧边栏等内容不计入验证器，响应不保证逐字节相同
+    """
+    digest = hashlib.md5(repr(sorted(validators.items())).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def conditional_response(request, validators, get_response, on_not_modified=None):
+    """
+    条件 GET：请求头中的 If-None-Match / If-Modified-Since 与验证器匹配时直接返回 304，不执行视图
+    否则执行视图，并在响应中设置 ETag 与 Last-Modified
+    :param validators: 验证器字典，'latest' 为最后修改时间，其余值只用于生成 ETag；None 表示照常执行视图（如非 GET 请求）
+    :param get_response: 生成完整响应的无参函数
+    :param on_not_modified: 返回 304 时调用的无参函数，如计入浏览量
+    """
+    if validators is None:
+        return get_response()
+
+    etag = make_etag(validators)
+    latest = validators.get('latest')
+    last_modified = int(latest.timestamp()) if latest else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = get_response()
+    elif response.status_code == 304 and on_not_modified is not None:
+        on_not_modified()
+
+    # 只为成功的响应设置验证器，404 等错误页面不应被当作可重新验证的内容
+    if response.status_code in (200, 304):
+        if not response.has_header('ETag'):
+            response['ETag'] = etag
+        if last_modified is not None and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional(validators_func):
+    """
+    函数视图的条件 GET 装饰器
+    :param validators_func: validators_func(request, *args, **kwargs) 返回验证器字典，见 conditional_response
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            validators = validators_func(request, *args, **kwargs) if request.method in ('GET', 'HEAD') else None
+            return conditional_response(request, validators, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """
+    类视图的条件 GET：执行视图前用一次聚合查询计算验证器，匹配时返回 304，不查询列表、不渲染模板
+    子类重写 get_validators
+    """
+
+    def get_validators(self):
+        """
+        :return: 验证器字典，见 conditional_response；None 表示照常执行视图
+        """
+        return None
+
+    def not_modified(self):
+        """
+        返回 304 时调用，子类可重写以记录访问等
+        """
+
+    def dispatch(self, request, *args, **kwargs):
+        validators = self.get_validators() if request.method in ('GET', 'HEAD') else None
+        return conditional_response(
+            request, validators, lambda: super(ConditionalGetMixin, self).dispatch(request, *args, **kwargs),
+            on_not_modified=self.not_modified,
+        )
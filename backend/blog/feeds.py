@@ -1,5 +1,6 @@
 from django.contrib.syndication.views import Feed
 from django.urls import reverse
+from blog.conditional import conditional_response, post_validators
 from blog.models import Post
 
 
@@ -10,13 +11,20 @@ class LatestPostsFeed(Feed):
     # RSS feed 的描述，用于简要说明该订阅源的内容
     description = "Updates on new blog posts."
 
+    def __call__(self, request, *args, **kwargs):
+        # 条件 GET：订阅内容未变化时返回 304，不查询文章、不生成 XML
+        validators = post_validators(Post.objects.all()) if request.method in ('GET', 'HEAD') else None
+        return conditional_response(
+            request, validators, lambda: super(LatestPostsFeed, self).__call__(request, *args, **kwargs)
+        )
+
     # 动态生成 feed 链接
     def link(self):
         return reverse('blog:index')
 
-    # 返回最新的博客文章，按照创建时间倒序排列
+    # 返回最近发布或更新的博客文章，按照排序时间（有修改时间时为修改时间）倒序排列
     def items(self):
-        return Post.objects.order_by('-created_time')[:5]
+        return Post.objects.select_related('author').order_by('-effective_time')[:5]
 
     # 定义每个 RSS 条目的标题，通常是博客文章的标题
     def item_title(self, item):
@@ -35,5 +43,8 @@ class LatestPostsFeed(Feed):
     def item_pubdate(self, item):
         return item.created_time
 
+    def item_updateddate(self, item):
+        return item.effective_time
+
     def item_author_name(self, item):
         return item.author.username if item.author else "匿名"
@@ -3,6 +3,11 @@ from blog.models import Post
 
 
 class PostForm(forms.ModelForm):
+    # 正文与目录保存在 PostContent 中，不是 Post 的模型字段，需显式声明并在校验后写回实例
+    body = forms.CharField(label='正文', widget=forms.Textarea)
+    toc = forms.CharField(label='侧边栏目录', widget=forms.Textarea, required=False)
+    content_fields = ('body', 'toc')
+
     class Meta:
         """Meta 类定义了表单的模型和字段，以及字段的显示方式"""
         model = Post
@@ -10,3 +15,20 @@ class PostForm(forms.ModelForm):
         widgets = {
             'excerpt': forms.Textarea(attrs={'rows': 5, 'cols': 80}),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            for name in self.content_fields:
+                self.initial.setdefault(name, getattr(self.instance, name))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name in self.content_fields:
+            # 与模型字段相同，未提交的字段（如后台编辑页不显示目录）保持不变
+            if name not in cleaned_data:
+                continue
+            if self.fields[name].widget.value_omitted_from_data(self.data, self.files, self.add_prefix(name)):
+                continue
+            setattr(self.instance, name, cleaned_data[name])
+        return cleaned_data
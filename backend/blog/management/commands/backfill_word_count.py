@@ -0,0 +1,53 @@
+# blog/management/commands/backfill_word_count.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.models import Post
+from blog.utils import LinkSlugIndex, count_words, estimate_read_time, render_markdown
+
+
+class Command(BaseCommand):
+    help = 'Backfill word_count/read_time of posts from their rendered body.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Recount every post instead of only posts with word_count = 0.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows fetched per chunk and written per bulk_update.')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        queryset = Post.objects.order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(word_count=0)
+
+        # 先取出主键再分块读取，避免边遍历边更新过滤条件所依赖的字段
+        pks = list(queryset.values_list('pk', flat=True))
+
+        # 所有文章共用同一个链接索引，只加载一次
+        link_index = LinkSlugIndex()
+        updated = 0
+        for i in range(0, len(pks), batch_size):
+            rows = Post.objects.filter(pk__in=pks[i:i + batch_size]).values_list(
+                'pk', 'title', 'content__body', 'content__rendered_body'
+            )
+            batch = []
+            now = timezone.now()
+            for pk, title, body, rendered_body in rows:
+                # 尚未渲染的文章按当前渲染器渲染后统计（命中渲染缓存时无需重新渲染），不写回 rendered_body
+                if not rendered_body:
+                    rendered_body, _ = render_markdown(body, title=title, link_index=link_index)
+                word_count = count_words(rendered_body)
+                batch.append(Post(
+                    pk=pk, word_count=word_count, read_time=estimate_read_time(word_count), updated_time=now,
+                ))
+
+            with transaction.atomic():
+                # bulk_update 不更新 auto_now 字段，显式写入更新时间，文章页的验证器随之变化
+                Post.objects.bulk_update(batch, ['word_count', 'read_time', 'updated_time'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled word count of {updated} posts.'))
+
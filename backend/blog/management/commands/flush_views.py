@@ -0,0 +1,21 @@
+# blog/management/commands/flush_views.py
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.stats import flush_view_counts, get_view_cache
+
+
+class Command(BaseCommand):
+    help = 'Write buffered page-view increments back to Post.views in one batched UPDATE.'
+
+    def handle(self, *args, **options):
+        # 计数缓存需为多进程共享的缓存（如 Redis），进程内缓存的计数由各进程的后台线程写回
+        # 本命令在独立进程中运行，进程内缓存中读不到任何计数
+        if isinstance(get_view_cache(), LocMemCache):
+            raise CommandError(
+                "The 'views' cache is a per-process LocMemCache; its counts are written back by each "
+                "server process's background thread. Configure a shared cache such as Redis to use flush_views."
+            )
+        # 计数由其他进程记录，本进程不知道哪些文章有增量，读取全部文章的计数
+        flushed = flush_view_counts(all_posts=True)
+        self.stdout.write(self.style.SUCCESS(f'Flushed views of {flushed} posts.'))
@@ -0,0 +1,168 @@
+# blog/management/commands/rerender_posts.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from blog.models import Post, PostContent
+from blog.pagecache import purge_pages
+from blog.utils import LinkSlugIndex, count_words, get_link_index_generation, link_targets, load_link_slugs
+from blog.utils import render_digest, render_markdown, scan_links
+
+
+# 渲染后写回的字段，分别位于文章表与内容表
+RENDERED_FIELDS = ['render_hash', 'word_count', 'read_time', 'updated_time']
+RENDERED_CONTENT_FIELDS = ['rendered_body', 'toc']
+
+
+def init_worker():
+    """
+    子进程初始化：以 spawn 方式启动时需重新加载 Django 配置
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def render_post(row):
+    """
+    在子进程中渲染单篇文章，不访问数据库、缓存与翻译接口
+    fork 方式启动的子进程继承了主进程的数据库连接，不能在子进程中使用
+    :param row: (pk, title, body, links)，links 为主进程解析好的该文章全部内部链接目标（见 LinkSlugIndex.resolve_many）
+    :return: (rendered_body, toc, word_count)
+    """
+    _, title, body, links = row
+    link_index = LinkSlugIndex(links, translate=False)
+    rendered_body, toc = render_markdown(body, title=title, use_cache=False, link_index=link_index)
+    return rendered_body, toc, count_words(rendered_body)
+
+
+def parse_since(value):
+    """
+    解析 --since 参数，支持日期（2024-01-01）或日期时间（2024-01-01T08:00:00）
+    """
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'无法解析的时间：{value}')
+        since = datetime.combine(day, dt_time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+class Command(BaseCommand):
+    help = 'Re-render rendered_body/toc of posts in parallel and write them back in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--changed-only', action='store_true',
+                            help='Only re-render posts whose content or renderer hash changed.')
+        parser.add_argument('--since', help='Only re-render posts created or modified since this date/datetime.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be re-rendered without writing.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of render processes (1 renders in-process).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows fetched per chunk and written per bulk_update.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        changed_only = options['changed_only']
+        dry_run = options['dry_run']
+
+        queryset = Post.objects.order_by('pk')
+        if options['since']:
+            since = parse_since(options['since'])
+            queryset = queryset.filter(Q(created_time__gte=since) | Q(modified_time__gte=since))
+
+        total = queryset.count()
+        # 只取渲染所需的列，按块流式读取，避免一次性加载全部正文
+        rows = queryset.values_list('pk', 'title', 'content__body', 'render_hash').iterator(chunk_size=batch_size)
+
+        # 先读取链接索引版本号再加载索引：加载后索引再变化时，本次写入的 render_hash 已过时，下次仍会重新渲染
+        self.link_generation = get_link_index_generation()
+
+        executor = None
+        if not dry_run:
+            # 链接索引只在主进程加载一次，每批文章的链接目标在主进程解析与翻译后传给各渲染进程
+            self.link_index = LinkSlugIndex(load_link_slugs())
+            if workers > 1:
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+        scanned = rendered = 0
+        started = time.monotonic()
+        try:
+            batch = []
+            for pk, title, body, render_hash in rows:
+                scanned += 1
+                # 内容与渲染器均未变化的文章直接跳过，摘要计算在主进程完成，开销很小
+                if changed_only and render_hash == render_digest(body, title, self.link_generation):
+                    continue
+                batch.append((pk, title, body))
+                if len(batch) >= batch_size:
+                    rendered += self.process_batch(batch, executor, workers, dry_run)
+                    self.report(scanned, total, rendered, started)
+                    batch = []
+            if batch:
+                rendered += self.process_batch(batch, executor, workers, dry_run)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.report(scanned, total, rendered, started)
+        action = 'Would re-render' if dry_run else 'Re-rendered'
+        self.stdout.write(self.style.SUCCESS(f'{action} {rendered} of {scanned} posts.'))
+
+    def process_batch(self, batch, executor, workers, dry_run):
+        """
+        渲染一批文章并通过 bulk_update 写回
+        :return: 本批处理的文章数
+        """
+        if dry_run:
+            return len(batch)
+
+        # 一批文章的未知链接目标合并为一次翻译请求，子进程只接收各自文章需要的映射
+        targets = [link_targets(scan_links(body), title) for _, title, body in batch]
+        self.link_index.prefetch(target for post_targets in targets for target in post_targets)
+        rows = [
+            (pk, title, body, self.link_index.resolve_many(post_targets))
+            for (pk, title, body), post_targets in zip(batch, targets)
+        ]
+
+        if executor is None:
+            results = map(render_post, rows)
+        else:
+            # 每个子进程一次领取若干篇，减少进程间通信次数
+            results = executor.map(render_post, rows, chunksize=max(1, len(rows) // (workers * 4)))
+
+        posts = []
+        # bulk_update 不更新 auto_now 字段，显式写入更新时间，文章页的验证器随之变化
+        now = timezone.now()
+        for (pk, title, body), (rendered_body, toc, word_count) in zip(batch, results):
+            post = Post(pk=pk, title=title, body=body, updated_time=now)
+            post.set_rendered(rendered_body, toc, word_count, self.link_generation)
+            posts.append(post)
+        # bulk_update 不触发 save() 与 pre_save 信号，slug、摘要等字段保持不变
+        with transaction.atomic():
+            Post.objects.bulk_update(posts, RENDERED_FIELDS)
+            PostContent.objects.bulk_update([post.get_content() for post in posts], RENDERED_CONTENT_FIELDS)
+        # 不触发信号，整页缓存中这些文章的页面在此清除
+        purge_pages(*(f'post:{post.pk}' for post in posts))
+        return len(posts)
+
+    def report(self, scanned, total, rendered, started):
+        """
+        输出进度与吞吐量
+        """
+        elapsed = time.monotonic() - started
+        rate = rendered / elapsed if elapsed > 0 else 0
+        self.stdout.write(f'[{scanned}/{total}] rendered {rendered} posts, {elapsed:.1f}s, {rate:.1f} posts/s')
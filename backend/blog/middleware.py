@@ -1,25 +1,37 @@
+import itertools
 import logging
 
+from django.conf import settings
+
 logger = logging.getLogger(__name__)
 
 
 class StoreLastURLMiddleware:
     """
-    保存用户访问页面的 URL
+    保存用户访问页面的 URL，作为返回地址
+    保存位置由 settings.LAST_URL_STORAGE 决定：
+    - 'session'：保存在会话中，每个请求写一次会话，匿名访问也会创建会话并设置 Cookie
+    - None：不保存（站内目前没有读取返回地址的页面），请求不读写会话，响应不设置 Cookie，可被整页缓存与代理缓存
     """
 
+    # 本进程避免的会话写入次数
+    avoided_writes = itertools.count(1)
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.storage = getattr(settings, 'LAST_URL_STORAGE', 'session')
 
     def __call__(self, request):
         """
         只保存非搜索页面的 URL
         """
-        if 'search' not in request.path:
+        if 'search' in request.path:
+            logger.debug(f"Search page accessed: {request.path}, no URL saved.")
+        elif self.storage == 'session':
             logger.debug(f"Saving URL: {request.build_absolute_uri()} for {request.path}")
             request.session['last_url'] = request.build_absolute_uri()
         else:
-            logger.debug(f"Search page accessed: {request.path}, no URL saved.")
+            logger.debug(f"Session write avoided for {request.path} ({next(self.avoided_writes)} in this process)")
 
         response = self.get_response(request)
         return response
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0023_alter_post_categories_alter_post_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='render_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
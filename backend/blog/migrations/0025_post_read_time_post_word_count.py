@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0024_post_render_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='read_time',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='阅读时间'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='字数'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0025_post_read_time_post_word_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Translation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_hash', models.CharField(editable=False, max_length=64)),
+                ('source', models.TextField(verbose_name='原文')),
+                ('from_lang', models.CharField(max_length=10, verbose_name='原文语言')),
+                ('to_lang', models.CharField(max_length=10, verbose_name='目标语言')),
+                ('text', models.TextField(verbose_name='译文')),
+                ('created_time', models.DateTimeField(default=django.utils.timezone.now, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '翻译',
+                'verbose_name_plural': '翻译',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='translation',
+            constraint=models.UniqueConstraint(fields=('source_hash', 'from_lang', 'to_lang'), name='unique_translation'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0026_translation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostVisitorSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('registers', models.BinaryField(verbose_name='草图')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visitor_sketches', to='blog.post', verbose_name='文章')),
+            ],
+            options={
+                'verbose_name': '访客草图',
+                'verbose_name_plural': '访客草图',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postvisitorsketch',
+            constraint=models.UniqueConstraint(fields=('post', 'date'), name='unique_post_visitor_sketch'),
+        ),
+    ]
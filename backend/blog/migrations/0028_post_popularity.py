@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:13
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_popularity(apps, schema_editor):
+    """
+    以已有浏览量初始化热度，浏览时间未知，按发布时间计算，之后的浏览会逐渐取代这部分热度
+    热度的定义见 blog.stats.increased_popularity
+    """
+    Post = apps.get_model('blog', 'Post')
+    half_life = getattr(settings, 'POPULAR_POSTS_HALF_LIFE', 7 * 24 * 3600)
+    posts = list(Post.objects.filter(views__gt=0).only('pk', 'views', 'created_time'))
+    for post in posts:
+        post.popularity = math.log2(post.views) + post.created_time.timestamp() / half_life
+    Post.objects.bulk_update(posts, ['popularity'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0027_postvisitorsketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='popularity',
+            field=models.FloatField(db_index=True, default=0, editable=False, verbose_name='热度'),
+        ),
+        migrations.RunPython(seed_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_content(apps, schema_editor):
+    """
+    将正文、渲染后的正文与目录从文章表复制到内容表，按块读取，避免一次性加载全部正文
+    """
+    Post = apps.get_model('blog', 'Post')
+    PostContent = apps.get_model('blog', 'PostContent')
+    rows = Post.objects.order_by('pk').values_list('pk', 'body', 'rendered_body', 'toc').iterator(chunk_size=200)
+    batch = []
+    for pk, body, rendered_body, toc in rows:
+        batch.append(PostContent(post_id=pk, body=body, rendered_body=rendered_body, toc=toc))
+        if len(batch) >= 200:
+            PostContent.objects.bulk_create(batch)
+            batch = []
+    PostContent.objects.bulk_create(batch)
+
+
+def restore_content(apps, schema_editor):
+    """
+    回滚时将内容复制回文章表
+    """
+    Post = apps.get_model('blog', 'Post')
+    PostContent = apps.get_model('blog', 'PostContent')
+    rows = PostContent.objects.values_list('post_id', 'body', 'rendered_body', 'toc').iterator(chunk_size=200)
+    batch = []
+    for pk, body, rendered_body, toc in rows:
+        batch.append(Post(pk=pk, body=body, rendered_body=rendered_body, toc=toc))
+        if len(batch) >= 200:
+            Post.objects.bulk_update(batch, ['body', 'rendered_body', 'toc'])
+            batch = []
+    Post.objects.bulk_update(batch, ['body', 'rendered_body', 'toc'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0028_post_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostContent',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='blog.post')),
+                ('body', models.TextField(verbose_name='正文')),
+                ('rendered_body', models.TextField(blank=True, editable=False)),
+                ('toc', models.TextField(blank=True, verbose_name='侧边栏目录')),
+            ],
+            options={
+                'verbose_name': '文章内容',
+                'verbose_name_plural': '文章内容',
+            },
+        ),
+        migrations.RunPython(copy_content, restore_content),
+        migrations.RemoveField(
+            model_name='post',
+            name='body',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='rendered_body',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='toc',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    """
+    由父级关系逐层计算所有分类的物化路径
+    """
+    Category = apps.get_model('blog', 'Category')
+    categories = list(Category.objects.only('pk', 'slug', 'parent_id'))
+    children = {}
+    for category in categories:
+        children.setdefault(category.parent_id, []).append(category)
+
+    level = [(category, category.slug) for category in children.get(None, [])]
+    while level:
+        next_level = []
+        for category, path in level:
+            category.path = path
+            next_level.extend((child, f'{path}/{child.slug}') for child in children.get(category.pk, []))
+        level = next_level
+    Category.objects.bulk_update(categories, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0029_postcontent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
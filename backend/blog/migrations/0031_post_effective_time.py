@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:26
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def backfill_effective_time(apps, schema_editor):
+    """
+    已有文章的排序时间：有修改时间时为修改时间，否则为创建时间，一条 UPDATE 完成
+    """
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.update(effective_time=Coalesce('modified_time', 'created_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0030_category_path_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='effective_time',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='排序时间'),
+        ),
+        migrations.RunPython(backfill_effective_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pin', 'effective_time'], name='blog_post_pin_effective_idx'),
+        ),
+    ]
@@ -1,14 +1,21 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.text import slugify
-from markdown_it import MarkdownIt
-from blog.utils import generate_summary, slugify_translate
-from django.db.models import F
-from django.utils.crypto import get_random_string
-from django.db.models.signals import pre_save
+from blog.utils import generate_summary, generate_summary_from_markdown, slugify_translate
+from blog.utils import render_digest, count_words, estimate_read_time
+from blog.utils import bump_link_index_generation
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
+from blog.pagination import bump_post_count_version
+from blog.stats import record_view, count_unique_visitors
+from blog.pagecache import purge_pages
 
 
 class Category(models.Model):
@@ -20,8 +27,11 @@ class Category(models.Model):
     # 表示当前分类的父级分类，自关联，暂时不用
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='children')
 
-    # 缓存路径
-    path = models.CharField(max_length=255, blank=True, editable=False)
+    # 物化路径：从顶级分类到当前分类的 slug 以 / 连接，保存时维护，用于生成 URL、按路径查找与查询所有子孙分类
+    path = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+
+    # 更新时间：保存分类或其文章关联变化时更新，分类页面的条件 GET 验证器取其最大值
+    updated_time = models.DateTimeField('更新时间', auto_now=True)
 
     # 显示声明管理器，用于管理模型实例
     objects = models.Manager()
@@ -38,24 +48,136 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        """
+        校验父级分类：不能是自身或自身的子孙分类
+        """
+        if self.parent_id is not None and self.pk is not None and self.parent.is_descendant_of(self):
+            raise ValidationError({'parent': '父级分类不能是自身或其子孙分类'})
+
     def save(self, *args, **kwargs):
+        """
+        保存分类并维护物化路径：slug 或父级分类变化时，用一条 UPDATE 改写所有子孙分类的路径前缀
+        """
         if not self.slug:
             self.slug = slugify(self.name, allow_unicode=True)
 
+        old_path = None
+        if self.pk is not None:
+            old_path = Category.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+
+        parent = self.parent
+        if parent is not None and self.pk is not None and parent.is_descendant_of(self):
+            raise ValueError('父级分类不能是自身或其子孙分类')
+        self.path = f'{parent.path}/{self.slug}' if parent is not None else self.slug
+
+        # 路径变化时 path 必须写入
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and old_path != self.path:
+            kwargs['update_fields'] = {*update_fields, 'path'}
+
         super().save(*args, **kwargs)
 
+        if old_path and old_path != self.path:
+            Category.objects.filter(path__startswith=f'{old_path}/').update(
+                path=Concat(Value(self.path), Substr('path', len(old_path) + 1))
+            )
+
+    def is_descendant_of(self, other):
+        """
+        判断当前分类是否为 other 自身或其子孙分类，按路径前缀判断，不查询数据库
+        """
+        return self.pk == other.pk or self.path.startswith(f'{other.path}/')
+
+    def get_descendants(self, include_self=True):
+        """
+        获取所有子孙分类：一次按路径前缀的索引查询
+        :param include_self: 是否包含当前分类
+        """
+        condition = Q(path__startswith=f'{self.path}/')
+        if include_self:
+            condition |= Q(pk=self.pk)
+        return Category.objects.filter(condition)
+
     def get_absolute_url(self):
         """
-        生成当前对象的绝对路径
+        生成当前对象的绝对路径，直接使用物化路径，不查询父级分类
         """
-        if self.parent:
-            ancestors = [self.slug]
-            parent = self.parent
-            while parent:
-                ancestors.insert(0, parent.slug)
-                parent = parent.parent
-            return reverse('blog:category_detail', args=['/'.join(ancestors)])
-        return reverse('blog:category_detail', args=[self.slug])
+        return reverse('blog:category_detail', args=[self.path or self.slug])
+
+
+# 分类树的缓存键与有效期（秒），分类或文章变化时由信号清除
+CATEGORY_TREE_CACHE_KEY = 'category_tree'
+CATEGORY_TREE_TIMEOUT = 600
+
+# 分类树保存在数据库缓存中，多个进程共享，任一进程清除后对所有进程生效
+CATEGORY_TREE_CACHE_ALIAS = 'render'
+
+# 分类页显示的文章字段，其他字段变化时无需清除分类树缓存
+CATEGORY_TREE_POST_FIELDS = ('title', 'slug', 'created_time', 'modified_time')
+
+
+def build_category_tree():
+    """
+    构建分类树，查询次数固定，与分类数量无关：
+    一次聚合查询获取所有分类及其文章数、子分类数，一次查询获取顶级分类下的文章，在内存中组装
+    :return: 按名称排序的顶级分类列表，每个分类带有 post_count、child_count、subcategories 属性，
+             顶级分类另有按时间降序排列的 posts_list
+    """
+    categories = list(Category.objects.annotate(
+        post_count=Count('post', distinct=True),
+        child_count=Count('children', distinct=True),
+    ).order_by('name'))
+
+    nodes = {}
+    for category in categories:
+        category.subcategories = []
+        nodes[category.pk] = category
+
+    roots = []
+    for category in categories:
+        parent = nodes.get(category.parent_id)
+        if parent is None:
+            category.posts_list = []
+            roots.append(category)
+        else:
+            parent.subcategories.append(category)
+
+    # 同一篇文章属于多个顶级分类时每个分类各出现一次
+    posts = Post.objects.filter(categories__in=[root.pk for root in roots]).annotate(
+        category_pk=F('categories')
+    ).only('pk', *CATEGORY_TREE_POST_FIELDS)
+    for post in posts:
+        nodes[post.category_pk].posts_list.append(post)
+
+    return roots
+
+
+def get_category_tree_cache():
+    """
+    获取分类树所在的缓存
+    """
+    alias = CATEGORY_TREE_CACHE_ALIAS if CATEGORY_TREE_CACHE_ALIAS in settings.CACHES else DEFAULT_CACHE_ALIAS
+    return caches[alias]
+
+
+def get_category_tree():
+    """
+    读取分类树，不在缓存中时重新构建
+    """
+    cache = get_category_tree_cache()
+    tree = cache.get(CATEGORY_TREE_CACHE_KEY)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(CATEGORY_TREE_CACHE_KEY, tree, timeout=CATEGORY_TREE_TIMEOUT)
+    return tree
+
+
+def clear_category_tree():
+    """
+    清除分类树缓存
+    """
+    get_category_tree_cache().delete(CATEGORY_TREE_CACHE_KEY)
 
 
 class Tag(models.Model):
@@ -63,6 +185,9 @@ class Tag(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True, null=True)
 
+    # 更新时间：保存标签或其文章关联变化时更新，标签页面的条件 GET 验证器取其最大值
+    updated_time = models.DateTimeField('更新时间', auto_now=True)
+
     # 显示声明管理器，用于管理模型实例
     objects = models.Manager()
 
@@ -86,6 +211,32 @@ class Tag(models.Model):
         return reverse('blog:tag_detail', args=[self.slug])
 
 
+# 摘要由这些字段生成，只更新部分字段时据此判断是否需要重新生成摘要
+EXCERPT_SOURCE_FIELDS = frozenset({'body', 'rendered_body'})
+
+# 保存在 PostContent 中的大字段，Post 上的同名属性读写对应的 PostContent
+CONTENT_FIELDS = frozenset({'body', 'rendered_body', 'toc'})
+
+# 文章列表与侧边栏显示、决定列表顺序的字段，变化时清除整页缓存中所有依赖于文章列表的页面
+PAGE_LIST_POST_FIELDS = frozenset({'title', 'slug', 'pin', 'effective_time'})
+
+# 只更新这些计数字段时不更新 updated_time，页面中的浏览量允许滞后
+UNTRACKED_POST_FIELDS = frozenset({'views', 'popularity'})
+
+
+def content_property(name):
+    """
+    生成读写 PostContent 字段的属性，首次访问时才查询内容表
+    """
+    def getter(self):
+        return getattr(self.get_content(), name)
+
+    def setter(self, value):
+        setattr(self.get_content(), name, value)
+
+    return property(getter, setter)
+
+
 class Post(models.Model):
     """创建文章模型类"""
 
@@ -97,11 +248,11 @@ class Post(models.Model):
     # null=True：在数据库中，slug 字段可以存储 NULL 值。
     slug = models.SlugField('slug', max_length=100, unique=True, blank=True, null=True)
 
-    # 文章正文，使用 TextField 模型字段
-    body = models.TextField('正文')
-
-    # 文章目录
-    toc = models.TextField('侧边栏目录', blank=True)
+    # 正文、渲染后的正文与目录保存在一对一的 PostContent 中，列表、订阅、站点地图等查询只读取较窄的文章行
+    # 属性读写与原字段相同：post.body = ...; post.save()，详情页等需要正文时用 select_related('content') 一并查询
+    body = content_property('body')
+    rendered_body = content_property('rendered_body')
+    toc = content_property('toc')
 
     # 文章创建时间，存储时间的字段用 DateTimeField 类型
     # default=timezone.now 表示默认值为当前时间
@@ -111,6 +262,14 @@ class Post(models.Model):
     # 文章最后一次修改时间
     modified_time = models.DateTimeField('修改时间', null=True, blank=True, db_index=True)
 
+    # 排序时间：有修改时间时为修改时间，否则为创建时间，保存时维护
+    # 首页、归档、最近更新、订阅与站点地图按此排序，可直接使用索引，无需逐行计算 Coalesce 后排序
+    effective_time = models.DateTimeField('排序时间', default=timezone.now, editable=False, db_index=True)
+
+    # 更新时间：保存页面显示的字段、标签与分类变化或被改名时更新，只更新浏览量等计数时不变
+    # 文章页、列表页、订阅与站点地图的条件 GET 验证器取其最大值，有索引时为一次索引查找
+    updated_time = models.DateTimeField('更新时间', auto_now=True, db_index=True)
+
     # 文章摘要，可以没有文章摘要，但默认情况下 CharField 要求必须存入数据，否则就会报错
     # 指定 CharField 的 blank=True 参数值后就可以允许空值了
     excerpt = models.CharField('摘要', max_length=200, blank=True)
@@ -128,11 +287,18 @@ class Post(models.Model):
     # 新增 views 字段，用于存储文章浏览量
     views = models.PositiveIntegerField(default=0, editable=False)
 
+    # 热度：按半衰期指数衰减的浏览量，保存为对数形式（见 blog.stats.increased_popularity），写回浏览量时一并更新
+    popularity = models.FloatField('热度', default=0, editable=False, db_index=True)
+
     # 新增一个字段，用于存储文章是否置顶
     pin = models.BooleanField(default=False)
 
-    # 新增一个字段，用于存储文章渲染后的正文内容
-    rendered_body = models.TextField(editable=False, blank=True)
+    # 渲染摘要，记录生成 rendered_body 时的正文、标题及渲染器版本，用于判断是否需要重新渲染
+    render_hash = models.CharField(max_length=64, editable=False, blank=True)
+
+    # 正文字数与预计阅读时间（分钟），渲染时计算，详情页直接读取
+    word_count = models.PositiveIntegerField('字数', default=0, editable=False)
+    read_time = models.PositiveIntegerField('阅读时间', default=0, editable=False)
 
     # 显示声明管理器，用于管理模型实例
     objects = models.Manager()
@@ -142,42 +308,171 @@ class Post(models.Model):
         verbose_name_plural = verbose_name
         ordering = ['-created_time', 'title']
 
+        indexes = [
+            # 首页先显示置顶文章，再按排序时间降序，第一页为索引范围扫描
+            models.Index(fields=['pin', 'effective_time'], name='blog_post_pin_effective_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        is_new = self.pk is None  # 是否首次创建
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        记录读取时列表页显示的字段值，保存时据此判断文章列表是否变化（见 changed_list_fields）
+        """
+        instance = super().from_db(db, field_names, values)
+        instance.remember_list_fields()
+        return instance
 
+    def remember_list_fields(self):
+        """
+        记录列表页显示的字段的当前值，未加载的延迟字段不记录
+        """
+        self._loaded_list_values = {
+            name: self.__dict__[name] for name in PAGE_LIST_POST_FIELDS if name in self.__dict__
+        }
+
+    def changed_list_fields(self, update_fields=None):
+        """
+        自读取或上次保存以来发生变化的列表页显示的字段，未记录的字段（如新文章）视为变化
+        :param update_fields: 本次保存的字段，None 表示全部字段
+        :return: 变化的字段名集合
+        """
+        fields = PAGE_LIST_POST_FIELDS if update_fields is None else PAGE_LIST_POST_FIELDS.intersection(update_fields)
+        loaded = self.__dict__.get('_loaded_list_values', {})
+        return {name for name in fields if name not in loaded or getattr(self, name) != loaded[name]}
+
+    def save(self, *args, **kwargs):
+        """
+        保存文章，查询次数固定：
+        - 已有 slug：只执行一次 INSERT 或 UPDATE
+        - slug 为空：根据标题生成，额外一次前缀查询分配唯一 slug（翻译未命中缓存时另有翻译缓存查询）
+        - 字段值为 F() 等表达式（如 F('views') + 1）：保存后额外一次 SELECT，只刷新这些字段
+        指定 update_fields 且只包含计数、置顶等字段时为单列写入，不生成摘要，也不重新索引
+        正文等大字段保存在 PostContent 中：新文章额外一次 INSERT；完整保存时只在正文已读取或修改过时额外一次 UPDATE；
+        指定 update_fields 时只写入其中的内容字段
+        """
         # 获取 update_fields，指定更新的字段
         update_fields = kwargs.get("update_fields")
 
         # 如果 slug 为空，不论是否创建，均根据标题生成
         if not self.slug:
-            self.slug = slugify_translate(self.title)
-            # 确保 slug 唯一（追加随机后缀）
-            while Post.objects.filter(slug=self.slug).exists():
-                self.slug = f"{self.slug}-{get_random_string(4)}"
-
-        # 如果传入了 update_fields，则确保 slug 被加入进去
-        if update_fields:
-            update_fields = set(update_fields)
-            update_fields.add("slug")  # 添加 slug 到更新字段
-            kwargs["update_fields"] = list(update_fields)  # 更新回 kwargs
-        else:
-            # 如果没有指定 update_fields，则更新所有字段
-            kwargs["update_fields"] = None
+            self.slug = self.allocate_slug(slugify_translate(self.title))
+            # 如果传入了 update_fields，则确保新生成的 slug 被加入进去
+            if update_fields is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "slug"}
+
+        # 只更新部分字段且正文发生变化时，一并写入重新生成的摘要（由 set_excerpt 生成）
+        if update_fields is not None and not self.excerpt and not EXCERPT_SOURCE_FIELDS.isdisjoint(update_fields):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "excerpt"}
+
+        # 排序时间随创建、修改时间更新
+        self.effective_time = self.modified_time or self.created_time
+        if update_fields is not None and not {'created_time', 'modified_time'}.isdisjoint(update_fields):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "effective_time"}
+
+        # 内容字段从 update_fields 中分离，由 save_content 写入 PostContent
+        content_fields = None
+        if update_fields is not None:
+            content_fields = CONTENT_FIELDS.intersection(kwargs["update_fields"])
+            kwargs["update_fields"] = set(kwargs["update_fields"]) - CONTENT_FIELDS
+            # auto_now 字段只在完整保存或被指定时写入：写入文章表中计数以外的字段时一并写入更新时间
+            # 只写入内容表时不更新，文章页的渲染结果由 render_hash 标识
+            if kwargs["update_fields"] - UNTRACKED_POST_FIELDS:
+                kwargs["update_fields"].add("updated_time")
+
+        # 新文章总是创建内容行，保存前准备好，保存后无需再查询
+        creating = self.pk is None
+        if creating:
+            self.get_content()
 
         # 可选：修改时间更新控制（如果启用 modified_time 字段）
-        # update_fields = kwargs.get("update_fields")
-        # if not is_new and update_fields:
+        # if self.pk is not None and update_fields:
         #     if not {"views", "pin"}.intersection(update_fields):
         #         self.modified_time = timezone.now()
 
+        # 记录值为表达式的字段，保存后只刷新这些字段，不重新读取正文等大字段
+        expression_fields = [
+            field.attname for field in self._meta.concrete_fields
+            if hasattr(getattr(self, field.attname), 'resolve_expression')
+        ]
+
         # 保存操作
         super().save(*args, **kwargs)
+        self.save_content(content_fields, creating)
+        # post_save 信号的接收器已比较过变化的字段，记录保存后的值
+        self.remember_list_fields()
 
-        # 保存后刷新字段（如 auto_now 相关字段）
-        self.refresh_from_db()
+        # 只读取表达式字段的新值（refresh_from_db 会清除已加载的 PostContent）
+        if expression_fields:
+            values = Post.objects.filter(pk=self.pk).values(*expression_fields).get()
+            for attname, value in values.items():
+                setattr(self, attname, value)
+
+    def get_content(self):
+        """
+        获取正文等大字段所在的 PostContent：已加载时直接返回，否则查询一次
+        新文章（或尚无内容行的文章）返回一个未保存的 PostContent，随文章一起保存
+        """
+        if not self._state.adding or self._meta.get_field('content').is_cached(self):
+            try:
+                return self.content
+            except PostContent.DoesNotExist:
+                pass
+        return PostContent(post=self)
+
+    def save_content(self, update_fields=None, creating=False):
+        """
+        保存 PostContent
+        :param update_fields: 需要写入的内容字段，None 表示完整保存（只在已读取或修改过正文时写入）
+        :param creating: 文章是否为新创建，新文章的内容行直接 INSERT
+        """
+        if update_fields is None:
+            if not self._meta.get_field('content').is_cached(self):
+                return
+        elif not update_fields:
+            return
+
+        content = self.get_content()
+        if content._state.adding:
+            content.save(force_insert=creating)
+        else:
+            content.save(update_fields=update_fields)
+
+    def allocate_slug(self, base):
+        """
+        用一次前缀查询分配唯一 slug：base 未被占用时直接使用，否则追加最小的未占用数字后缀
+        :param base: 由标题生成的 slug
+        :return: 唯一的 slug
+        """
+        max_length = self._meta.get_field('slug').max_length
+        # 预留数字后缀的长度
+        base = base[:max_length - 6].strip('-') or 'post'
+
+        taken = set(
+            Post.objects.filter(slug__startswith=base).exclude(pk=self.pk).values_list('slug', flat=True)
+        )
+        slug = base
+        suffix = 1
+        while slug in taken:
+            suffix += 1
+            slug = f"{base}-{suffix}"
+        return slug
+
+    def set_rendered(self, rendered_body, toc, word_count=None, link_generation=None):
+        """
+        设置渲染结果及由其派生的字段：渲染摘要、字数与阅读时间
+        :param rendered_body: 渲染后的 HTML 内容
+        :param toc: 目录 HTML
+        :param word_count: 已统计的字数，未提供时根据 rendered_body 统计
+        :param link_generation: 渲染前读取的内部链接索引版本号，未提供时读取当前值
+        """
+        self.rendered_body = rendered_body
+        self.toc = toc
+        self.render_hash = render_digest(self.body, self.title, link_generation)
+        self.word_count = count_words(rendered_body) if word_count is None else word_count
+        self.read_time = estimate_read_time(self.word_count)
 
     def generate_slug(self):
         """生成 slug 字段"""
@@ -197,28 +492,253 @@ class Post(models.Model):
 
     def increase_views(self):
         """
-        增加文章浏览量
+        增加文章浏览量：计入缓存中的浏览量缓冲，不写数据库，由后台线程或 flush_views 命令批量写回
+        views 更新为数据库中的值加上尚未写回的增量，每个从数据库读取的实例只应调用一次
+        """
+        self.views += record_view(self.pk)
+
+    def unique_visitors(self, since=None):
+        """
+        估计独立访客数（误差约 2%），只包含已由后台线程写回数据库的访问
+        :param since: 起始日期，None 表示全部
         """
-        # self.views += 1
-        self.views = F('views') + 1  # 使用 F() 表达式避免读-写竞争问题
-        self.save(update_fields=['views'])
+        return count_unique_visitors(self.pk, since)
+
+
+class PostVisitorSketch(models.Model):
+    """文章独立访客草图模型类，每篇文章每天一行，保存 HyperLogLog 寄存器，不保存访客信息"""
+    post = models.ForeignKey(Post, verbose_name='文章', on_delete=models.CASCADE, related_name='visitor_sketches')
+    date = models.DateField('日期')
+    registers = models.BinaryField('草图')
+
+    # 显示声明管理器，用于管理模型实例
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = '访客草图'
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'date'], name='unique_post_visitor_sketch'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} {self.date}'
+
+
+class PostContent(models.Model):
+    """文章内容模型类，保存正文、渲染后的正文与目录等大字段，与文章一一对应"""
+    post = models.OneToOneField(Post, primary_key=True, on_delete=models.CASCADE, related_name='content')
+
+    # 文章正文，使用 TextField 模型字段
+    body = models.TextField('正文')
+
+    # 渲染后的正文内容
+    rendered_body = models.TextField(editable=False, blank=True)
+
+    # 文章目录
+    toc = models.TextField('侧边栏目录', blank=True)
+
+    # 显示声明管理器，用于管理模型实例
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = '文章内容'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return str(self.post_id)
+
+    @property
+    def index_owner(self):
+        """只更新内容时，搜索索引按所属文章判断是否需要更新（见 blog.signals.UpdateFieldsSignalProcessor）"""
+        return self.post
+
+
+class Translation(models.Model):
+    """翻译缓存模型类，按原文与语言对持久化翻译结果，避免重复调用翻译接口"""
+    # 原文的 SHA-256 摘要，用于唯一约束与查询（原文为 TextField，不宜直接建索引）
+    source_hash = models.CharField(max_length=64, editable=False)
+    source = models.TextField('原文')
+    from_lang = models.CharField('原文语言', max_length=10)
+    to_lang = models.CharField('目标语言', max_length=10)
+    text = models.TextField('译文')
+    created_time = models.DateTimeField('创建时间', default=timezone.now)
+
+    # 显示声明管理器，用于管理模型实例
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = '翻译'
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(fields=['source_hash', 'from_lang', 'to_lang'], name='unique_translation'),
+        ]
+
+    def __str__(self):
+        return f'{self.source} -> {self.text}'
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Post)
+@receiver(m2m_changed, sender=Post.categories.through)
+def invalidate_category_tree(sender, update_fields=None, **kwargs):
+    """
+    分类、文章或文章所属分类变化时清除分类树缓存，只更新计数等分类页不显示的文章字段时保留
+    分类树保存在共享缓存中，事务提交后再清除，避免其他进程在提交前重新缓存旧的分类树
+    """
+    if sender is Post and update_fields is not None and set(CATEGORY_TREE_POST_FIELDS).isdisjoint(update_fields):
+        return
+    transaction.on_commit(clear_category_tree)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_count(sender, created=True, **kwargs):
+    """
+    新增或删除文章时使缓存的文章总数失效
+    版本号保存在共享缓存中，事务提交后再递增，避免其他进程在提交前按旧的数据重新缓存总数
+    """
+    if created:
+        transaction.on_commit(bump_post_count_version)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, created=True, update_fields=None, **kwargs):
+    """
+    文章变化时清除整页缓存：只修改正文、摘要等字段时只清除包含该文章的页面，
+    新增、删除文章或修改标题、置顶、排序时间等字段时文章列表随之变化，一并清除依赖于 'posts' 的页面
+    在事务提交后清除，避免并发请求在提交前把旧内容重新写入缓存
+    """
+    dependencies = [f'post:{instance.pk}']
+    if created or instance.changed_list_fields(update_fields):
+        dependencies.append('posts')
+    transaction.on_commit(lambda: purge_pages(*dependencies))
+
+
+@receiver(post_save, sender=PostContent)
+def purge_post_content_pages(sender, instance, **kwargs):
+    """
+    只保存内容时（如 post.save(update_fields=['body'])）文章表不写入，不发送文章的 post_save 信号，
+    在此清除包含该文章的页面
+    """
+    dependency = f'post:{instance.post_id}'
+    transaction.on_commit(lambda: purge_pages(dependency))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_link_index(sender, instance, created=True, update_fields=None, **kwargs):
+    """
+    新增、删除文章或修改标题、slug 时内部链接的目标随之变化，递增链接索引版本号，
+    使已缓存的渲染结果失效，rerender_posts --changed-only 据 render_hash 重新渲染引用旧索引的文章
+    """
+    if created or not {'title', 'slug'}.isdisjoint(instance.changed_list_fields(update_fields)):
+        transaction.on_commit(bump_link_index_generation)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Post.categories.through)
+def purge_post_relation_pages(sender, instance, action, reverse, model, pk_set=None, **kwargs):
+    """
+    文章的标签或分类变化时清除整页缓存：涉及的文章页面、标签页面，以及依赖于全部标签或分类的页面
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    field = Post.tags.field if sender is Post.tags.through else Post.categories.field
+    if action == 'pre_clear':
+        # 清空后无法得知原有的关联，清空前查询一次
+        lookup = field.name if reverse else field.related_query_name()
+        pk_set = set(model.objects.filter(**{lookup: instance.pk}).values_list('pk', flat=True))
+    posts, related = (pk_set, {instance.pk}) if reverse else ({instance.pk}, pk_set)
+
+    dependencies = [f'post:{pk}' for pk in posts]
+    if field.name == 'tags':
+        dependencies += [f'tag:{pk}' for pk in related]
+        dependencies.append('tags')
+    else:
+        # 分类页面按物化路径包含子孙分类的文章，只依赖于分类整体
+        dependencies.append('categories')
+    transaction.on_commit(lambda: purge_pages(*dependencies))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Post.categories.through)
+def touch_post_relations(sender, instance, action, reverse, model, pk_set=None, **kwargs):
+    """
+    文章的标签或分类变化时更新两端的更新时间，文章页、标签与分类页面的验证器随之变化
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    now = timezone.now()
+    if action == 'pre_clear':
+        field = Post.tags.field if sender is Post.tags.through else Post.categories.field
+        lookup = field.name if reverse else field.related_query_name()
+        related = model.objects.filter(**{lookup: instance.pk})
+    else:
+        related = model.objects.filter(pk__in=pk_set)
+    related.update(updated_time=now)
+    type(instance).objects.filter(pk=instance.pk).update(updated_time=now)
+    instance.updated_time = now
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_posts(sender, instance, created=False, **kwargs):
+    """
+    修改或删除标签时更新其文章的更新时间：文章页显示标签的名称与链接
+    删除标签时关联随之删除，不发送 m2m_changed 信号，在删除前更新
+    """
+    if not created:
+        Post.objects.filter(tags=instance).update(updated_time=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_posts(sender, instance, created=False, **kwargs):
+    """
+    修改或删除分类时更新其及子孙分类中文章的更新时间：文章页与列表显示分类的名称与链接，链接随路径变化
+    """
+    if not created:
+        Post.objects.filter(categories__in=instance.get_descendants()).update(updated_time=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def purge_tag_pages(sender, instance, **kwargs):
+    """
+    标签变化时清除整页缓存：该标签的页面、显示该标签的文章页面，以及包含标签列表的页面
+    """
+    dependencies = [f'tag:{instance.pk}', 'tags']
+    transaction.on_commit(lambda: purge_pages(*dependencies))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def purge_category_pages(sender, **kwargs):
+    """
+    分类变化时清除整页缓存：修改分类会改变子孙分类的路径与链接，清除依赖于分类的所有页面
+    """
+    transaction.on_commit(lambda: purge_pages('categories'))
 
 
 @receiver(pre_save, sender=Post)  # 注册信号接收器
-def set_excerpt(instance, **kwargs):
+def set_excerpt(instance, update_fields=None, **kwargs):
     """
     在 Post 保存前自动生成摘要
     :param instance: Post 实例
+    :param update_fields: 本次保存更新的字段，None 表示全部字段
     :param kwargs: 其他参数
     """
+    # 只更新计数等与摘要无关的字段时跳过（正文变化时 Post.save 会把 excerpt 加入 update_fields）
+    if update_fields is not None and 'excerpt' not in update_fields:
+        return
+
     # 检查是否已存在摘要（避免覆盖用户手动设置的摘要）
     if not instance.excerpt:
-        # 获取渲染后的正文内容
-        if not instance.rendered_body:
-            md = MarkdownIt()
-            instance.rendered_body = md.render(instance.body)
-
-        html = instance.rendered_body
-
         # 生成摘要（120个字符）
-        instance.excerpt = generate_summary(html, 120)
+        # 已有渲染结果时从 HTML 中提取，否则直接从 Markdown token 流中提取，均在收集足够字符后提前结束
+        if instance.rendered_body:
+            instance.excerpt = generate_summary(instance.rendered_body, 120)
+        else:
+            instance.excerpt = generate_summary_from_markdown(instance.body, 120)
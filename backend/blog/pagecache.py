@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import cc_delim_re, get_conditional_response, has_vary_header
+from django.utils.http import parse_http_date_safe, urlencode
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# 整页缓存，存储于数据库，多个 uWSGI 进程共享，任一进程保存文章后清除的页面对所有进程生效
+PAGE_CACHE_ALIAS = 'pages'
+
+# 页面最长缓存时间（秒），浏览量、热门文章等不触发清除的内容最多滞后这么久
+# 依赖索引的读-改-写没有加锁，并发未命中时可能丢失少量登记，这些页面同样在超时后更新
+PAGE_CACHE_TIMEOUT = 300
+
+# 响应中不缓存的头部：由外层中间件按每个请求重新生成
+UNCACHED_HEADERS = {'set-cookie', 'vary'}
+
+# 参与缓存键的查询参数（分页），带有其他查询参数的请求不使用缓存，避免任意参数组合产生无限多的缓存条目
+PAGE_CACHE_QUERY_PARAMS = ('page', 'after', 'before')
+
+# 本进程的命中统计
+page_cache_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'purges': 0}
+page_cache_stats_lock = threading.Lock()
+
+
+def get_page_cache():
+    return caches[PAGE_CACHE_ALIAS]
+
+
+def count(name, n=1):
+    with page_cache_stats_lock:
+        page_cache_stats[name] += n
+
+
+def get_page_cache_stats():
+    """
+    本进程的整页缓存统计，命中率为命中次数占查找次数的比例
+    """
+    with page_cache_stats_lock:
+        stats = dict(page_cache_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+    return stats
+
+
+def is_mobile(request):
+    # 与 meta_data 模板标签判断设备的方式一致，移动端与 PC 端的页面分别缓存
+    return 'mobile' in request.META.get('HTTP_USER_AGENT', '').lower()
+
+
+def page_cache_key(request):
+    """
+    页面缓存键：协议、域名、路径与分页参数，以及设备类型（页面内容随 User-Agent 是否为移动端变化）
+    分页参数按固定顺序排列，参数顺序不同的相同页面共用一个缓存条目
+    """
+    query = urlencode([(name, request.GET[name]) for name in PAGE_CACHE_QUERY_PARAMS if name in request.GET])
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'page:{"m" if is_mobile(request) else "d"}:{digest}'
+
+
+def dependency_key(dependency):
+    return f'page_dependency:{dependency}'
+
+
+def is_cacheable_request(request):
+    """
+    只缓存匿名用户的 GET / HEAD 请求，查询参数只能是分页参数（见 PAGE_CACHE_QUERY_PARAMS），且每个参数只出现一次
+    没有会话 Cookie 的请求必然是匿名用户，无需读取会话；带有会话 Cookie 时再检查登录状态
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if any(name not in PAGE_CACHE_QUERY_PARAMS or len(values) > 1 for name, values in request.GET.lists()):
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and request.user.is_authenticated:
+        return False
+    return True
+
+
+def is_cacheable_response(request, response):
+    """
+    只缓存参与整页缓存的视图（见 PageCacheMixin）返回的、与用户无关的成功响应
+    """
+    if request.method != 'GET' or getattr(request, 'page_dependencies', None) is None:
+        return False
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    # 设置了 Cookie 相关的 Vary（如使用了 CSRF 令牌）或禁止缓存的响应因人而异
+    if has_vary_header(response, 'Cookie'):
+        return False
+    cache_control = {
+        directive.split('=', 1)[0].strip().lower()
+        for directive in cc_delim_re.split(response.get('Cache-Control', ''))
+    }
+    return not {'private', 'no-cache', 'no-store'} & cache_control
+
+
+def depend_on(request, *dependencies):
+    """
+    登记当前页面依赖的对象，对象变化时由 purge_pages 清除该页面
+    请求不参与整页缓存时忽略，模板标签可以无条件调用
+    :param dependencies: 依赖名称，如 'post:1'、'tag:2'，或 'posts'、'tags'、'categories' 等集合
+    """
+    page_dependencies = getattr(request, 'page_dependencies', None)
+    if page_dependencies is not None:
+        page_dependencies.update(dependencies)
+
+
+def on_page_hit(request, func, *args):
+    """
+    登记命中缓存时需要执行的操作，如计入浏览量：命中时不执行视图，由中间件调用 func(request, *args)
+    :param func: 函数的导入路径，与参数一起保存在缓存中
+    """
+    request.__dict__.setdefault('page_hit_hooks', []).append((func, args))
+
+
+def store_page(key, response, dependencies, hooks=()):
+    """
+    缓存页面，并在每个依赖的索引中登记页面的缓存键
+    """
+    cache = get_page_cache()
+    headers = [
+        (name, value) for name, value in response.items() if name.lower() not in UNCACHED_HEADERS
+    ]
+    cache.set(key, {'content': response.content, 'headers': headers, 'hooks': list(hooks)}, PAGE_CACHE_TIMEOUT)
+
+    dependency_keys = [dependency_key(dependency) for dependency in dependencies]
+    indexes = cache.get_many(dependency_keys)
+    cache.set_many({
+        index_key: indexes.get(index_key, set()) | {key} for index_key in dependency_keys
+    }, PAGE_CACHE_TIMEOUT)
+    count('stores')
+
+
+def purge_pages(*dependencies):
+    """
+    清除依赖于指定对象的页面
+    :param dependencies: 依赖名称，与 depend_on 登记时相同
+    """
+    cache = get_page_cache()
+    dependency_keys = [dependency_key(dependency) for dependency in dependencies]
+    indexes = cache.get_many(dependency_keys)
+    if not indexes:
+        return
+    page_keys = set().union(*indexes.values())
+    cache.delete_many([*page_keys, *indexes])
+    count('purges', len(page_keys))
+    logger.debug(f'Purged {len(page_keys)} cached pages for {", ".join(dependencies)}')
+
+
+def cached_response(request, entry):
+    """
+    由缓存条目生成响应，并执行登记的命中操作
+    缓存的响应带有验证器（见 blog.conditional）时，与请求头匹配则返回 304
+    """
+    response = HttpResponse(entry['content'])
+    for name, value in entry['headers']:
+        response[name] = value
+    for func, args in entry['hooks']:
+        import_string(func)(request, *args)
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified')),
+        response=response,
+    )
+
+
+class PageCacheMiddleware:
+    """
+    匿名用户的整页缓存：命中时只读取一次缓存，不执行视图、查询与模板渲染
+    只在 URL 解析到参与整页缓存的视图（PageCacheMixin）时查找缓存，订阅、站点地图、搜索等请求不读取缓存
+    响应头 X-Page-Cache 标明命中（HIT）或未命中（MISS）
+    应放在 AuthenticationMiddleware 之后，以判断登录状态
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        key = getattr(request, 'page_cache_key', None)
+        if key is not None and is_cacheable_response(request, response):
+            store_page(key, response, request.page_dependencies, getattr(request, 'page_hit_hooks', ()))
+            response['X-Page-Cache'] = 'MISS'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if not (view_class and issubclass(view_class, PageCacheMixin)) or not is_cacheable_request(request):
+            return None
+
+        key = page_cache_key(request)
+        entry = get_page_cache().get(key)
+        if entry is None:
+            count('misses')
+            request.page_cache_key = key
+            return None
+
+        count('hits')
+        response = cached_response(request, entry)
+        response['X-Page-Cache'] = 'HIT'
+        return response
+
+
+class PageCacheMixin:
+    """
+    视图参与整页缓存：渲染时登记页面依赖的对象，子类重写 get_page_dependencies
+    页面中的模板标签可通过 depend_on 追加依赖（如侧边栏的最近更新依赖于 'posts'）
+    """
+
+    def get_page_dependencies(self, context):
+        """
+        :param context: 模板上下文
+        :return: 页面依赖的对象，见 depend_on
+        """
+        return []
+
+    def render_to_response(self, context, **response_kwargs):
+        self.request.page_dependencies = set(self.get_page_dependencies(context))
+        return super().render_to_response(context, **response_kwargs)
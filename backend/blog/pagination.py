@@ -0,0 +1,212 @@
+import base64
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+# 文章总数的缓存有效期（秒）
+POST_COUNT_TIMEOUT = 300
+POST_COUNT_VERSION_KEY = 'post_count_version'
+
+# 文章总数与版本号保存在数据库缓存中，多个进程共享：文章新增、删除后递增版本号，所有进程随即重新计数
+POST_COUNT_CACHE_ALIAS = 'render'
+
+
+def get_post_count_cache():
+    """
+    获取文章总数及其版本号所在的缓存，未配置时退回默认缓存
+    """
+    alias = POST_COUNT_CACHE_ALIAS if POST_COUNT_CACHE_ALIAS in settings.CACHES else DEFAULT_CACHE_ALIAS
+    return caches[alias]
+
+
+def initial_post_count_version():
+    """
+    版本号不存在（首次使用或被缓存淘汰）时的初始值：取当前毫秒时间，不会与淘汰前使用过的版本号重复
+    """
+    return time.time_ns() // 1000000
+
+
+def bump_post_count_version():
+    """
+    使所有已缓存的文章总数失效
+    """
+    cache = get_post_count_cache()
+    try:
+        cache.incr(POST_COUNT_VERSION_KEY)
+    except ValueError:
+        cache.set(POST_COUNT_VERSION_KEY, initial_post_count_version(), timeout=None)
+
+
+class CachedCountPaginator(Paginator):
+    """
+    总数缓存的分页器：按页码分页时不必每次执行 COUNT(*)
+    缓存键由查询语句生成，不同的查询集互不影响；总数与计数时的版本号一同保存，
+    与版本号在一次缓存查询中读取，版本号不一致即失效
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+
+        cache = get_post_count_cache()
+        key = f'post_count:{hashlib.md5(str(query).encode("utf-8")).hexdigest()}'
+        cached = cache.get_many([POST_COUNT_VERSION_KEY, key])
+        version = cached.get(POST_COUNT_VERSION_KEY)
+        if version is not None and key in cached and cached[key][0] == version:
+            return cached[key][1]
+
+        count = super().count
+        if version is None:
+            # 并发初始化时以先写入的版本号为准
+            cache.add(POST_COUNT_VERSION_KEY, initial_post_count_version(), timeout=None)
+            version = cache.get(POST_COUNT_VERSION_KEY)
+        if version is not None:
+            cache.set(key, (version, count), timeout=POST_COUNT_TIMEOUT)
+        return count
+
+
+def encode_cursor(values):
+    """
+    将排序字段的值编码为不透明的游标
+    """
+    data = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """
+    解码游标，按字段类型转换各个值
+    :param token: encode_cursor 生成的游标
+    :param fields: 排序字段（模型字段实例）
+    :raise ValueError: 游标格式错误
+    """
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(data)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (TypeError, ValueError, ValidationError, UnicodeDecodeError):
+        raise ValueError(f'无效的游标：{token}')
+
+
+class CursorPage:
+    """
+    游标分页的当前页，提供与 Page 相近的接口，但没有页码与总数
+    """
+    is_cursor = True
+    number = None
+    paginator = None
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        """
+        :param object_list: 当前页的对象
+        :param next_cursor: 下一页（更早的文章）的游标，没有下一页时为 None
+        :param previous_cursor: 上一页（更新的文章）的游标，没有上一页时为 None
+        """
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginationMixin:
+    """
+    列表视图的游标分页：请求中带有 ?after=<游标>（更早的文章）或 ?before=<游标>（更新的文章）时，
+    按 cursor_fields 做键集分页，不执行 COUNT(*)，也不使用 OFFSET，任意深度的页面与第一页开销相同
+    不带游标时仍按页码分页，总数由 CachedCountPaginator 缓存
+    get_queryset 的排序必须与 cursor_fields 一致：各字段均降序，且最后一个字段唯一（如主键）
+    """
+    paginator_class = CachedCountPaginator
+    cursor_fields = ('pk',)
+
+    def get_cursor_fields(self, queryset):
+        """
+        排序字段对应的模型字段，用于解码游标
+        """
+        opts = queryset.model._meta
+        return [opts.pk if name == 'pk' else opts.get_field(name) for name in self.cursor_fields]
+
+    def get_cursor(self, obj):
+        return encode_cursor([getattr(obj, name) for name in self.cursor_fields])
+
+    def paginate_numbered(self, queryset, page_size):
+        """
+        按页码分页，并为当前页设置 next_cursor / previous_cursor：
+        页码链接仍按页码跳转，上一页、下一页的箭头改用游标，从任意页码继续翻页都不再使用 OFFSET
+        """
+        paginator, page, _, is_paginated = super().paginate_queryset(queryset, page_size)
+        # 读取首尾对象时页面的查询集被求值为列表，模板中直接使用同一个列表，不再重复查询
+        object_list = page.object_list = list(page.object_list)
+        page.next_cursor = self.get_cursor(object_list[-1]) if page.has_next() and object_list else None
+        page.previous_cursor = self.get_cursor(object_list[0]) if page.has_previous() and object_list else None
+        return paginator, page, object_list, is_paginated
+
+    def keyset_condition(self, values, lookup):
+        """
+        键集条件：(f1, f2, ...) 按字典序小于（lt）或大于（gt）游标值
+        展开为 f1 < v1 OR (f1 = v1 AND f2 < v2) OR ...，数据库可使用排序字段上的联合索引
+        """
+        condition = Q()
+        for i, name in enumerate(self.cursor_fields):
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for previous, value in zip(self.cursor_fields[:i], values[:i]):
+                term &= Q(**{previous: value})
+            condition |= term
+        return condition
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        if not after and not before:
+            return self.paginate_numbered(queryset, page_size)
+
+        try:
+            values = decode_cursor(after or before, self.get_cursor_fields(queryset))
+        except ValueError as e:
+            raise Http404(str(e))
+
+        if after:
+            # 更早的文章：沿排序方向继续读取，多取一条用于判断是否还有下一页
+            rows = list(queryset.filter(self.keyset_condition(values, 'lt'))[:page_size + 1])
+            object_list = rows[:page_size]
+            has_next, has_previous = len(rows) > page_size, True
+        else:
+            # 更新的文章：反向读取后再翻转
+            rows = list(queryset.filter(self.keyset_condition(values, 'gt')).reverse()[:page_size + 1])
+            object_list = rows[:page_size][::-1]
+            has_next, has_previous = True, len(rows) > page_size
+
+        page = CursorPage(
+            object_list,
+            next_cursor=self.get_cursor(object_list[-1]) if has_next and object_list else None,
+            previous_cursor=self.get_cursor(object_list[0]) if has_previous and object_list else None,
+        )
+        return None, page, object_list, page.has_other_pages()
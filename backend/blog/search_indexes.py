@@ -8,10 +8,14 @@ class PostIndex(indexes.SearchIndex, indexes.Indexable):
     title = indexes.CharField(model_attr='title')  # 定义 title 字段，索引模型的 title 属性
     body = indexes.CharField(model_attr='body')  # 定义 body 字段，索引模型的 body 属性
 
+    # 索引内容依赖的模型字段，只更新其他字段时不重新索引（见 blog.signals.UpdateFieldsSignalProcessor）
+    model_fields = frozenset({'title', 'body'})
+
     def get_model(self):
         """返回与当前索引相关联的模型类"""
         return Post
 
     def index_queryset(self, using=None):
         """定义要被索引的数据集"""
-        return self.get_model().objects.all()  # 这里返回 Post 模型的所有对象
+        # 这里返回 Post 模型的所有对象，正文保存在 PostContent 中，一并查询
+        return self.get_model().objects.select_related('content')
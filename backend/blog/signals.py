@@ -0,0 +1,36 @@
+from haystack.exceptions import NotHandled
+from haystack.signals import RealtimeSignalProcessor
+
+
+class UpdateFieldsSignalProcessor(RealtimeSignalProcessor):
+    """
+    实时更新搜索索引的信号处理器，识别 save(update_fields=...)：
+    只更新了索引不依赖的字段（如 views、pin）时不重新索引，避免每次计数更新都同步请求搜索引擎
+    索引类通过 model_fields 声明其依赖的模型字段，未声明时按原有方式每次保存都重新索引
+    通过 index_owner 声明所属对象的模型（如保存正文的 PostContent）只在部分更新时按所属对象处理，
+    完整保存时所属对象自身的保存信号已经更新索引
+    """
+
+    def handle_save(self, sender, instance, update_fields=None, **kwargs):
+        if hasattr(instance, 'index_owner'):
+            if update_fields is None:
+                return
+            instance = instance.index_owner
+            sender = type(instance)
+        if update_fields is not None and not self.affects_index(sender, instance, update_fields):
+            return
+        super().handle_save(sender, instance, update_fields=update_fields, **kwargs)
+
+    def affects_index(self, sender, instance, update_fields):
+        """
+        判断本次更新的字段是否影响任一后端中的索引内容
+        """
+        for using in self.connection_router.for_write(instance=instance):
+            try:
+                index = self.connections[using].get_unified_index().get_index(sender)
+            except NotHandled:
+                continue
+            model_fields = getattr(index, 'model_fields', None)
+            if model_fields is None or not model_fields.isdisjoint(update_fields):
+                return True
+        return False
@@ -1,5 +1,6 @@
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
+from .conditional import post_validators
 from .models import Post, Tag
 from django.db.models import Count
 
@@ -13,12 +14,12 @@ class PostSitemap(Sitemap):
 
     def items(self):
         # 返回需要展示的文章
-        return Post.objects.all().order_by('-modified_time')
+        return Post.objects.all().order_by('-effective_time')
 
     @staticmethod
     def lastmod(obj):
-        # 返回文章的最后修改时间
-        return obj.modified_time if obj.modified_time else obj.created_time
+        # 返回文章的最后修改时间，没有修改时间时为创建时间
+        return obj.effective_time
 
     # def location(self, obj):
     #     """
@@ -56,3 +57,10 @@ class TagSitemap(Sitemap):
 
     def location(self, obj):
         return reverse('blog:tag_detail', args=[obj.slug])  # tag_detail 是标签详情页的 URL 名称
+
+
+def sitemap_validators(request, **kwargs):
+    """
+    站点地图的验证器：文章的增删与更新时随之变化
+    """
+    return post_validators(Post.objects.all())
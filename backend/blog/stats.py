@@ -0,0 +1,443 @@
+import atexit
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# 浏览量计数缓冲的缓存别名，未配置时退回默认缓存
+VIEW_COUNTER_CACHE_ALIAS = 'views'
+
+
+def get_view_cache():
+    """
+    获取浏览量计数缓冲所在的缓存
+    """
+    alias = VIEW_COUNTER_CACHE_ALIAS if VIEW_COUNTER_CACHE_ALIAS in settings.CACHES else DEFAULT_CACHE_ALIAS
+    return caches[alias]
+
+
+def view_count_key(pk):
+    """
+    文章浏览量增量的缓存键
+    """
+    return f'views:{pk}'
+
+
+# 本进程记录过浏览、尚未写回的文章主键，写回时只读取这些文章的计数，与文章总数无关
+dirty_view_pks = set()
+dirty_view_pks_lock = threading.Lock()
+
+
+def record_view(pk):
+    """
+    记录一次浏览：只对缓存中的计数原子加一，不访问数据库，增量由 flush_view_counts 批量写回
+    :param pk: 文章主键
+    :return: 该文章尚未写回数据库的浏览量增量
+    """
+    start_view_flusher()
+    with dirty_view_pks_lock:
+        dirty_view_pks.add(pk)
+    cache = get_view_cache()
+    key = view_count_key(pk)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # 计数不存在时创建，并发创建失败的一方重新加一
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def pending_views(pk):
+    """
+    获取文章尚未写回数据库的浏览量增量
+    """
+    return get_view_cache().get(view_count_key(pk), 0)
+
+
+def flush_view_counts(all_posts=False):
+    """
+    将缓存中的浏览量增量批量写回数据库：所有文章合并为一条 UPDATE ... SET views = views + CASE ... END
+    先从计数中扣除已读取的增量，期间新增的浏览保留到下一次写回；写回失败时恢复扣除的增量
+    同一计数缓存只应有一个写回方（后台线程或 flush_views 命令），否则增量可能被重复写回
+    :param all_posts: 是否读取全部文章的计数；默认只读取本进程记录过浏览的文章，
+                      由其他进程记录的计数（如 flush_views 命令写回共享缓存中的计数）需读取全部文章
+    :return: 写回的文章数
+    """
+    from django.apps import apps
+    from django.db.models import Case, F, FloatField, PositiveIntegerField, Value, When
+
+    post_model = apps.get_model('blog', 'Post')
+    cache = get_view_cache()
+    with dirty_view_pks_lock:
+        pks = set(dirty_view_pks)
+        dirty_view_pks.clear()
+    if all_posts:
+        pks.update(post_model.objects.values_list('pk', flat=True))
+    keys = {view_count_key(pk): pk for pk in pks}
+
+    deltas = {}
+    for key, delta in cache.get_many(list(keys)).items():
+        if not delta:
+            continue
+        try:
+            cache.decr(key, delta)
+        except ValueError:
+            # 计数在读取后被淘汰，已读取的增量仍然写回
+            pass
+        deltas[keys[key]] = delta
+
+    if not deltas:
+        return 0
+
+    try:
+        post_model.objects.filter(pk__in=list(deltas)).update(
+            views=F('views') + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                default=Value(0),
+                output_field=PositiveIntegerField(),
+            ),
+            popularity=increased_popularity(Case(
+                *[When(pk=pk, then=Value(float(delta))) for pk, delta in deltas.items()],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )),
+        )
+    except DatabaseError:
+        for pk, delta in deltas.items():
+            key = view_count_key(pk)
+            if not cache.add(key, delta, timeout=None):
+                cache.incr(key, delta)
+        with dirty_view_pks_lock:
+            dirty_view_pks.update(deltas)
+        raise
+
+    refresh_popular_posts()
+    return len(deltas)
+
+
+# 热门文章榜单的长度与缓存有效期（秒），榜单在每次写回浏览量后刷新，有效期只用于更新已修改的标题
+POPULAR_POSTS_SIZE = 10
+POPULAR_POSTS_TIMEOUT = 600
+POPULAR_POSTS_CACHE_KEY = 'popular_posts'
+
+# 榜单保存在数据库缓存中，多个进程与 flush_views 命令共享
+POPULAR_POSTS_CACHE_ALIAS = 'render'
+
+
+def popularity_time(timestamp=None):
+    """
+    将时间换算为半衰期的倍数，热度按 settings.POPULAR_POSTS_HALF_LIFE（秒）指数衰减
+    :param timestamp: Unix 时间戳，None 表示当前时间
+    """
+    half_life = getattr(settings, 'POPULAR_POSTS_HALF_LIFE', 7 * 24 * 3600)
+    return (time.time() if timestamp is None else timestamp) / half_life
+
+
+def increased_popularity(views):
+    """
+    热度保存为 log2(衰减到时间 t 的浏览量) + t（t 以半衰期为单位），不随时间变化即可直接排序，数值不会溢出：
+    所有文章的衰减因子相同，比较热度等价于比较衰减到同一时间的浏览量
+    返回热度增加一批当前发生的浏览后的值，用于 UPDATE 语句：
+    log2(2 ^ (popularity - now) + views) + now，即先将原热度衰减到当前时间再加上新的浏览量
+    从未被浏览的文章热度为 0，衰减到当前时间后下溢为 0
+    :param views: 新增浏览量的表达式
+    """
+    from django.db.models import F, Value
+    from django.db.models.functions import Log, Power
+
+    now = Value(popularity_time())
+    return Log(2, Power(2, F('popularity') - now) + views) + now
+
+
+def get_popular_posts_cache():
+    """
+    获取热门文章榜单所在的缓存
+    """
+    alias = POPULAR_POSTS_CACHE_ALIAS if POPULAR_POSTS_CACHE_ALIAS in settings.CACHES else DEFAULT_CACHE_ALIAS
+    return caches[alias]
+
+
+def refresh_popular_posts():
+    """
+    按热度索引查询前 POPULAR_POSTS_SIZE 篇文章，以 (标题, 链接) 列表的形式写入缓存
+    :return: 榜单
+    """
+    from django.apps import apps
+
+    posts = apps.get_model('blog', 'Post').objects.filter(popularity__gt=0).only('pk', 'title', 'slug')
+    popular = [(post.title, post.get_absolute_url()) for post in posts.order_by('-popularity')[:POPULAR_POSTS_SIZE]]
+    get_popular_posts_cache().set(POPULAR_POSTS_CACHE_KEY, popular, timeout=POPULAR_POSTS_TIMEOUT)
+    return popular
+
+
+def get_popular_posts(num=POPULAR_POSTS_SIZE):
+    """
+    读取热门文章榜单，榜单不在缓存中时重新查询
+    :param num: 文章数量，不超过 POPULAR_POSTS_SIZE
+    :return: (标题, 链接) 列表
+    """
+    popular = get_popular_posts_cache().get(POPULAR_POSTS_CACHE_KEY)
+    if popular is None:
+        popular = refresh_popular_posts()
+    return popular[:num]
+
+
+# HyperLogLog 精度：2^12 个寄存器，每个寄存器 1 字节，草图大小 4 KB，标准误差约 1.6%
+HLL_PRECISION = 12
+
+
+class HyperLogLog:
+    """
+    HyperLogLog 基数估计草图，用于统计独立访客数
+    只保存固定大小的寄存器数组，不保存访客本身；两个草图按寄存器取最大值即可合并（并集）
+    """
+
+    def __init__(self, registers=None, precision=HLL_PRECISION):
+        """
+        :param registers: 已有的寄存器数据（bytes），未提供时为空草图
+        :param precision: 寄存器个数为 2^precision
+        """
+        self.precision = precision
+        size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(size)
+        if len(self.registers) != size:
+            raise ValueError(f'草图大小应为 {size} 字节，实际为 {len(self.registers)} 字节')
+
+    @staticmethod
+    def hash(value):
+        """
+        计算 64 位哈希值
+        """
+        return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def add(self, value):
+        """
+        添加一个元素：高 precision 位选择寄存器，其余位中首个 1 的位置作为秩
+        """
+        h = self.hash(value)
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        合并另一个草图（并集）
+        """
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """
+        估计基数，基数较小时使用线性计数修正
+        """
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+
+# 常见爬虫、监控与命令行工具的 User-Agent 特征，这些请求不计入独立访客
+bot_user_agent_pattern = re.compile(
+    r'bot|crawl|spider|slurp|archiver|facebookexternalhit|embedly|preview|monitor|pingdom|lighthouse|'
+    r'headless|phantomjs|curl|wget|python-requests|python-urllib|httpclient|okhttp|go-http-client|scrapy',
+    re.IGNORECASE
+)
+
+
+def is_bot(user_agent):
+    """
+    判断请求是否来自爬虫等非浏览器客户端，未提供 User-Agent 时视为爬虫
+    """
+    return not user_agent or bot_user_agent_pattern.search(user_agent) is not None
+
+
+def client_ip(request):
+    """
+    客户端 IP：默认为 REMOTE_ADDR；只有直接连接方是 settings.TRUSTED_PROXIES 中的代理时才读取 X-Forwarded-For，
+    取其中最后一个不属于可信代理的地址，客户端自行伪造的前几项不被采用
+    """
+    ip = request.META.get('REMOTE_ADDR', '')
+    trusted = set(getattr(settings, 'TRUSTED_PROXIES', ()))
+    if ip not in trusted:
+        return ip
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for address in reversed([address.strip() for address in forwarded.split(',') if address.strip()]):
+        if address not in trusted:
+            return address
+    return ip
+
+
+def visitor_id(request):
+    """
+    访客标识：客户端 IP 与 User-Agent 的组合，只用于计算哈希，不保存
+    """
+    return f"{client_ip(request)}|{request.META.get('HTTP_USER_AGENT', '')}"
+
+
+# 进程内尚未写回的独立访客草图，键为 (文章主键, 日期)
+visitor_sketches = {}
+visitor_sketches_lock = threading.Lock()
+
+
+def record_visitor(pk, request):
+    """
+    记录一次访问的访客：在进程内的当日草图中添加访客标识，不访问数据库与缓存，由后台线程批量写回
+    未启用后台写回线程（VIEW_FLUSH_INTERVAL 为 0）时不记录，避免草图只增不减
+    :param pk: 文章主键
+    :param request: 当前请求
+    :return: 是否计入（爬虫请求与未启用写回时不计入）
+    """
+    if getattr(settings, 'VIEW_FLUSH_INTERVAL', 0) <= 0 or is_bot(request.META.get('HTTP_USER_AGENT', '')):
+        return False
+
+    start_view_flusher()
+    key = (pk, timezone.localdate())
+    with visitor_sketches_lock:
+        sketch = visitor_sketches.get(key)
+        if sketch is None:
+            sketch = visitor_sketches[key] = HyperLogLog()
+        sketch.add(visitor_id(request))
+    return True
+
+
+def record_post_visit(request, pk):
+    """
+    记录一次文章访问：浏览量与独立访客，整页缓存命中、不执行视图时由缓存中间件调用
+    """
+    record_view(pk)
+    record_visitor(pk, request)
+
+
+def flush_visitor_sketches():
+    """
+    将进程内的访客草图合并写回数据库：缺少的行先批量创建，再锁定相关行，与已有草图合并后批量更新
+    写回失败时草图放回缓冲区，下次再写回
+    :return: 写回的草图数
+    """
+    from django.apps import apps
+
+    with visitor_sketches_lock:
+        buffered = dict(visitor_sketches)
+        visitor_sketches.clear()
+    if not buffered:
+        return 0
+
+    post_model = apps.get_model('blog', 'Post')
+    sketch_model = apps.get_model('blog', 'PostVisitorSketch')
+    try:
+        # 忽略写回前已删除的文章
+        existing = set(post_model.objects.filter(pk__in={pk for pk, _ in buffered}).values_list('pk', flat=True))
+        buffered = {key: sketch for key, sketch in buffered.items() if key[0] in existing}
+
+        days = {}
+        for pk, day in buffered:
+            days.setdefault(day, []).append(pk)
+
+        with transaction.atomic():
+            sketch_model.objects.bulk_create([
+                sketch_model(post_id=pk, date=day, registers=HyperLogLog().to_bytes()) for pk, day in buffered
+            ], ignore_conflicts=True)
+
+            rows = []
+            for day, pks in days.items():
+                rows.extend(sketch_model.objects.select_for_update().filter(date=day, post_id__in=pks))
+            for row in rows:
+                row.registers = HyperLogLog(row.registers).merge(buffered[(row.post_id, row.date)]).to_bytes()
+            sketch_model.objects.bulk_update(rows, ['registers'])
+    except DatabaseError:
+        with visitor_sketches_lock:
+            for key, sketch in buffered.items():
+                if key in visitor_sketches:
+                    sketch.merge(visitor_sketches[key])
+                visitor_sketches[key] = sketch
+        raise
+
+    return len(buffered)
+
+
+def count_unique_visitors(pk, since=None):
+    """
+    估计文章的独立访客数：合并各日草图后计数，同一访客在多日访问只计一次
+    :param pk: 文章主键
+    :param since: 起始日期，None 表示全部
+    """
+    from django.apps import apps
+
+    queryset = apps.get_model('blog', 'PostVisitorSketch').objects.filter(post_id=pk)
+    if since is not None:
+        queryset = queryset.filter(date__gte=since)
+
+    sketch = HyperLogLog()
+    for registers in queryset.values_list('registers', flat=True):
+        sketch.merge(HyperLogLog(registers))
+    return sketch.count()
+
+
+# 后台写回线程，每个进程最多启动一个
+view_flusher = None
+view_flusher_lock = threading.Lock()
+
+
+def start_view_flusher():
+    """
+    按需启动后台写回线程，每隔 settings.VIEW_FLUSH_INTERVAL 秒写回一次，进程退出时再写回一次
+    访客草图保存在进程内，总是由该线程写回；浏览量计数在 FLUSH_VIEW_COUNTS_IN_THREAD 为 False 时不由线程写回，
+    改为定时执行 flush_views 命令（计数缓存为 Redis 等多进程共享的缓存时应如此配置）
+    间隔为 0 时不启动；uWSGI 部署时需开启 enable-threads
+    """
+    global view_flusher
+
+    interval = getattr(settings, 'VIEW_FLUSH_INTERVAL', 0)
+    if interval <= 0 or view_flusher is not None:
+        return
+
+    with view_flusher_lock:
+        if view_flusher is None:
+            view_flusher = threading.Thread(
+                target=run_view_flusher, args=(interval,), name='view-flusher', daemon=True
+            )
+            view_flusher.start()
+            atexit.register(safe_flush_view_counts)
+
+
+def safe_flush_view_counts():
+    """
+    写回浏览量与访客草图，异常只记录日志，供后台线程使用
+    """
+    flushers = [flush_visitor_sketches]
+    if getattr(settings, 'FLUSH_VIEW_COUNTS_IN_THREAD', True):
+        flushers.append(flush_view_counts)
+
+    for flush in flushers:
+        try:
+            flush()
+        except Exception as e:
+            logger.warning(f"写回浏览量失败：{e}")
+    close_old_connections()
+
+
+def run_view_flusher(interval):
+    """
+    后台写回线程主循环
+    """
+    while True:
+        time.sleep(interval)
+        safe_flush_view_counts()
@@ -1,10 +1,10 @@
 from django import template
 from blog.models import Post, Category, Tag
 from django.core.cache import cache
-from django.db.models.functions import Coalesce
 from django.db.models.aggregates import Count
-import re, math
-from django.utils.html import strip_tags
+from blog.pagecache import depend_on
+from blog.utils import count_words, estimate_read_time
+from blog.stats import get_popular_posts
 
 from django.shortcuts import get_object_or_404
 from urllib.parse import quote
@@ -23,6 +23,9 @@ def show_recent_posts(context, num=5):
     return: (dict): 包含最近发布的文章的模板上下文
     """
 
+    # 整页缓存中，包含最近更新的页面在文章增删或修改标题时清除
+    depend_on(context.get('request'), 'posts')
+
     # 生成的缓存键，用于存储和检索缓存数据
     cache_key = f'recent_posts_{num}'
 
@@ -32,10 +35,8 @@ def show_recent_posts(context, num=5):
     # 查询数据并实现分页和缓存
     if not recent_posts:
         try:
-            # 查询所有博客文章，按修改时间降序或创建时间降序排序，限制为前num个
-            recent_posts = Post.objects.order_by(
-                Coalesce('modified_time', 'created_time').desc()
-            ).only('pk', 'title')[:num]
+            # 查询所有博客文章，按修改时间降序或创建时间降序（即 effective_time）排序，限制为前num个
+            recent_posts = Post.objects.order_by('-effective_time').only('pk', 'title', 'slug')[:num]
 
             # 将查询结果存储到缓存中，设置有效时间为600秒
             cache.set(cache_key, recent_posts, timeout=600)
@@ -49,6 +50,19 @@ def show_recent_posts(context, num=5):
     }
 
 
+@register.inclusion_tag('_includes/popular-posts.html', takes_context=True)
+def show_popular_posts(context, num=5):
+    """
+    显示热门文章：按衰减后的浏览量排序，榜单在写回浏览量时预先计算，渲染时只读取一次缓存
+    :param context: 模板上下文，当前未使用，预留扩展
+    :param num: 显示的文章数量
+    :return: 包含热门文章 (标题, 链接) 列表的模板上下文
+    """
+    return {
+        'popular_posts': get_popular_posts(num)
+    }
+
+
 @register.inclusion_tag('_includes/trending-tags.html', takes_context=True)
 def show_trending_tags(context, num=10):
     """
@@ -58,6 +72,9 @@ def show_trending_tags(context, num=10):
     :return: 包含热门标签列表
     """
 
+    # 整页缓存中，包含热门标签的页面在标签或文章的标签变化时清除
+    depend_on(context.get('request'), 'tags')
+
     # 获取所有标签并按管理文章数排序，限制为前10个
     tags = Tag.objects.annotate(num_posts=Count('post')).filter(num_posts__gt=0).order_by('-num_posts')[:num]
     return {
@@ -68,20 +85,17 @@ def show_trending_tags(context, num=10):
 @register.simple_tag(takes_context=True)
 def calculate_read_time(context, content=None, wpm=300):
     """
-    计算文章的预期阅读时间
+    计算任意内容的预期阅读时间
+    文章详情页直接读取保存时计算好的 Post.word_count 与 Post.read_time，无需使用此标签
     :param context: 模板上下文
     :param content: 文章内容
     :param wpm: 每分钟阅读的单词数，默认为 300
     """
-    # 移除 HTML 标签，获取纯文本内容
-    text_content = strip_tags(content)
-
-    # \w+ 匹配英文单词或数字（连贯字符），[\u4e00 -\u9fff] 匹配单个中文汉字。
-    # Python 的 re 默认是 ASCII 模式，[a-zA-Z0-9_]+：比 \w+ 更明确，只匹配字母、数字和下划线。
-    words = len(re.findall(r'[a-zA-Z0-9_]+|[\u4e00-\u9fff]', text_content))
+    # 统计规则与保存文章时一致：英文单词或数字（连贯字符）计为一个单词，单个中文汉字计为一个字
+    words = count_words(content)
 
-    # 计算阅读时间（分钟），向上取整，确保短文章至少 1 分钟
-    read_time = math.ceil(words / wpm) if words > 0 else 0
+    # 计算阅读时间（分钟），向上取整
+    read_time = estimate_read_time(words, wpm)
 
     # 更新模板上下文
     context.update({
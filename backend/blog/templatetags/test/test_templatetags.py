@@ -3,7 +3,9 @@ from unittest.mock import patch
 from django.utils import timezone
 from blog.models import Post, Tag
 from blog.templatetags.blog_tags import show_recent_posts
-from blog.templatetags.blog_tags import show_trending_tags
+from blog.templatetags.blog_tags import show_trending_tags, show_popular_posts
+from blog.stats import record_view, flush_view_counts, get_view_cache, POPULAR_POSTS_SIZE
+from django.test import override_settings
 from blog.templatetags.blog_tags import calculate_read_time, share_detail
 from django.template import Context
 from django.core.cache import cache
@@ -142,6 +144,57 @@ class ShowTrendingTagsTest(TestCase):
             self.assertGreater(tag.num_posts, 0)
 
 
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'render': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'popular-test'},
+    'views': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'popular-views-test'},
+}, POPULAR_POSTS_HALF_LIFE=3600)
+class ShowPopularPostsTest(TestCase):
+    """
+    验证：
+    - 写回浏览量时按半衰期衰减后的浏览量更新热度与榜单
+    - 较早的浏览随时间衰减，排名低于近期浏览较多的文章
+    - 渲染时只读取缓存，不查询数据库
+    """
+
+    def setUp(self):
+        get_view_cache().clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.old, self.new, self.unread = [
+            Post.objects.create(title=f'Post {i}', body=f'Content of post {i}.', author=self.user) for i in range(3)
+        ]
+
+    def view(self, post, times, timestamp):
+        for _ in range(times):
+            record_view(post.pk)
+        with patch('blog.stats.time.time', return_value=timestamp):
+            flush_view_counts()
+
+    def test_decayed_ranking(self):
+        now = timezone.now().timestamp()
+        # 两个半衰期之前的 10 次浏览衰减为 2.5 次
+        self.view(self.old, 10, now - 2 * 3600)
+        self.view(self.new, 2, now)
+        self.assertEqual([title for title, _ in show_popular_posts({}, num=5)['popular_posts']], ['Post 0', 'Post 1'])
+
+        self.view(self.new, 1, now)
+        popular = show_popular_posts({}, num=5)['popular_posts']
+        self.assertEqual(popular, [
+            (self.new.title, self.new.get_absolute_url()),
+            (self.old.title, self.old.get_absolute_url()),
+        ])
+        self.assertEqual(len(show_popular_posts({}, num=1)['popular_posts']), 1)
+
+        # 浏览量照常累加
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.views, 10)
+
+    def test_render_without_queries(self):
+        self.view(self.new, 1, timezone.now().timestamp())
+        with self.assertNumQueries(0):
+            self.assertEqual(len(show_popular_posts({}, num=POPULAR_POSTS_SIZE)['popular_posts']), 1)
+
+
 class CalculateReadTimeTest(TestCase):
     """
     验证：
@@ -151,3 +151,33 @@ class PostAdminPureMockTest(TestCase):
         # 断言无变化
         self.assertEqual(self.post.rendered_body, original_rendered_body)
         self.assertEqual(self.post.toc, original_toc)
+
+
+class PostPreviewViewTest(TestCase):
+    """
+    验证：
+    - 预览接口返回增量渲染的正文与目录
+    - 只接受 POST 请求
+    - 未登录用户无法访问
+    """
+
+    def setUp(self):
+        User.objects.create_superuser(username='admin', password='admin_password', email='admin@example.com')
+        self.url = reverse('admin:blog_post_preview')
+
+    def test_preview(self):
+        self.client.login(username='admin', password='admin_password')
+        response = self.client.post(self.url, {'title': 'Title', 'body': '## 标题\n\n正文'})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn('<h2 id="标题">', data['html'])
+        self.assertIn('href="#标题"', data['toc'])
+
+    def test_get_not_allowed(self):
+        self.client.login(username='admin', password='admin_password')
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_anonymous_redirected(self):
+        response = self.client.post(self.url, {'body': '正文'})
+        self.assertEqual(response.status_code, 302)
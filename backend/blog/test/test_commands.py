@@ -0,0 +1,240 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Post, PostContent
+from blog.management.commands.rerender_posts import render_post
+from blog.pagecache import get_page_cache
+from blog.utils import count_words, estimate_read_time, internal_link_prefix, render_digest, render_markdown_uncached
+from blog.stats import flush_view_counts, get_view_cache, pending_views, record_view, view_count_key
+
+
+class RerenderPostsCommandTest(TestCase):
+    """
+    验证：
+    - 重新渲染 rendered_body、toc 并记录 render_hash，其余字段保持不变
+    - --changed-only 只渲染内容或渲染器有变化的文章
+    - --since 按创建/修改时间过滤
+    - --dry-run 不写入数据库
+    - 多进程渲染结果与进程内渲染一致
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}',
+                slug=f'post-{i}',
+                body=f'## 标题 {i}\n\n正文 {i}',
+                author=self.user,
+            )
+            for i in range(3)
+        ]
+
+    def rerender(self, *args):
+        out = StringIO()
+        call_command('rerender_posts', '--workers', '1', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_rerender_all(self):
+        output = self.rerender()
+        self.assertIn('Re-rendered 3 of 3 posts.', output)
+
+        post = Post.objects.get(pk=self.posts[0].pk)
+        rendered_body, toc = render_markdown_uncached(post.body, title=post.title)
+        self.assertEqual(post.rendered_body, rendered_body)
+        self.assertEqual(post.toc, toc)
+        self.assertEqual(post.render_hash, render_digest(post.body, post.title))
+        self.assertEqual(post.word_count, count_words(rendered_body))
+        self.assertEqual(post.read_time, estimate_read_time(post.word_count))
+        self.assertEqual(post.slug, 'post-0')
+        self.assertEqual(post.excerpt, self.posts[0].excerpt)
+
+    def test_changed_only(self):
+        self.rerender()
+        self.assertIn('Re-rendered 0 of 3 posts.', self.rerender('--changed-only'))
+
+        PostContent.objects.filter(post=self.posts[1]).update(body='## 新标题')
+        self.assertIn('Re-rendered 1 of 3 posts.', self.rerender('--changed-only'))
+        self.assertIn('id="新标题"', Post.objects.get(pk=self.posts[1].pk).rendered_body)
+
+    def test_since(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(created_time=timezone.now() - timedelta(days=30))
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+
+        self.assertIn('Re-rendered 2 of 2 posts.', self.rerender('--since', since))
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).rendered_body, '')
+
+    def test_dry_run(self):
+        self.assertIn('Would re-render 3 of 3 posts.', self.rerender('--dry-run'))
+        self.assertFalse(Post.objects.exclude(content__rendered_body='').exists())
+
+    def test_process_pool(self):
+        call_command('rerender_posts', '--workers', '2', stdout=StringIO())
+
+        for post in Post.objects.all():
+            self.assertEqual(post.rendered_body, render_markdown_uncached(post.body, title=post.title)[0])
+
+    @patch('blog.utils.translate_many', return_value=['Unknown Note'])
+    def test_links_resolved_in_parent(self, mock_translate):
+        PostContent.objects.filter(post=self.posts[0]).update(body='[[Post 1]] [[未知笔记]]')
+        PostContent.objects.filter(post=self.posts[1]).update(body='[[未知笔记|again]]')
+        self.rerender()
+
+        # 未知目标在主进程中每批只翻译一次
+        mock_translate.assert_called_once_with(['未知笔记'])
+        rendered_body = Post.objects.get(pk=self.posts[0].pk).rendered_body
+        self.assertIn(f'href="{internal_link_prefix}post-1"', rendered_body)
+        self.assertIn(f'href="{internal_link_prefix}unknown-note"', rendered_body)
+
+    @patch('blog.utils.translate_many')
+    def test_render_post_without_database(self, mock_translate):
+        # 渲染进程只使用传入的映射，缺失的目标按原文转换，不访问数据库与翻译接口
+        with self.assertNumQueries(0):
+            rendered_body, _, _ = render_post((1, 'Title', '[[已知]] [[未知]]', {'已知': 'known'}))
+
+        mock_translate.assert_not_called()
+        self.assertIn(f'href="{internal_link_prefix}known"', rendered_body)
+
+
+class BackfillWordCountCommandTest(TestCase):
+    """
+    验证：
+    - 根据已渲染正文回填字数与阅读时间
+    - 未渲染的文章渲染后统计，但不写回 rendered_body
+    - 默认只处理字数为 0 的文章，--all 时全部重新统计
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.rendered = Post.objects.create(title='Rendered', slug='rendered', body='x', author=self.user)
+        PostContent.objects.filter(post=self.rendered).update(rendered_body='<p>Hello world 中文</p>')
+        self.unrendered = Post.objects.create(title='Unrendered', slug='unrendered', body='word ' * 600,
+                                              author=self.user)
+
+    def test_backfill(self):
+        call_command('backfill_word_count', stdout=StringIO())
+
+        rendered = Post.objects.get(pk=self.rendered.pk)
+        self.assertEqual((rendered.word_count, rendered.read_time), (4, 1))
+
+        unrendered = Post.objects.get(pk=self.unrendered.pk)
+        self.assertEqual((unrendered.word_count, unrendered.read_time), (600, 3))
+        self.assertEqual(unrendered.rendered_body, '')
+
+    def test_only_missing_by_default(self):
+        Post.objects.filter(pk=self.rendered.pk).update(word_count=1, read_time=1)
+
+        out = StringIO()
+        call_command('backfill_word_count', stdout=out)
+        self.assertIn('Backfilled word count of 1 posts.', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=self.rendered.pk).word_count, 1)
+
+        call_command('backfill_word_count', '--all', stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=self.rendered.pk).word_count, 4)
+
+
+# flush_views 命令要求多进程共享的计数缓存，测试中以文件缓存代替 Redis
+SHARED_VIEW_CACHES = {
+    **settings.CACHES,
+    'views': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'helloblog-test-views'),
+        'TIMEOUT': None,
+    },
+}
+
+
+@override_settings(CACHES=SHARED_VIEW_CACHES)
+class FlushViewsCommandTest(TestCase):
+    """
+    验证：
+    - 浏览文章不写数据库，显示的浏览量为数据库中的值加上未写回的增量
+    - 所有文章的增量合并为一条 UPDATE 写回，写回后增量清零
+    - 后台线程只读取本进程记录过浏览的文章，flush_views 命令读取全部文章
+    - 写回失败时恢复增量
+    - 计数缓存为进程内缓存时 flush_views 命令拒绝执行
+    """
+
+    def setUp(self):
+        get_view_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', slug=f'post-{i}', body='正文', author=self.user, views=10)
+            for i in range(2)
+        ]
+
+    def test_view_is_buffered(self):
+        url = reverse('blog:detail', kwargs={'slug': 'post-0'})
+        self.client.get(url)
+        # 清除整页缓存，第二次访问重新渲染
+        get_page_cache().clear()
+        response = self.client.get(url)
+
+        self.assertEqual(response.context['post'].views, 12)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).views, 10)
+        self.assertEqual(pending_views(self.posts[0].pk), 2)
+
+    def test_flush(self):
+        for _ in range(3):
+            record_view(self.posts[0].pk)
+        record_view(self.posts[1].pk)
+
+        # 只读取记录过浏览的文章的计数，不查询文章主键：
+        # 一次批量 UPDATE（同时更新热度），一次查询热门文章榜单（不计写入榜单缓存）
+        with patch('blog.stats.get_popular_posts_cache'), self.assertNumQueries(2):
+            self.assertEqual(flush_view_counts(), 2)
+
+        self.assertEqual(list(Post.objects.order_by('pk').values_list('views', flat=True)), [13, 11])
+        self.assertEqual(pending_views(self.posts[0].pk), 0)
+
+        out = StringIO()
+        call_command('flush_views', stdout=out)
+        self.assertIn('Flushed views of 0 posts.', out.getvalue())
+
+    def test_command_flushes_all_posts(self):
+        # 其他进程记录到共享缓存中的计数，本进程未登记，由 flush_views 命令读取全部文章写回
+        get_view_cache().set(view_count_key(self.posts[1].pk), 2, timeout=None)
+        self.assertEqual(flush_view_counts(), 0)
+
+        out = StringIO()
+        call_command('flush_views', stdout=out)
+        self.assertIn('Flushed views of 1 posts.', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=self.posts[1].pk).views, 12)
+
+    @override_settings(CACHES={
+        **SHARED_VIEW_CACHES,
+        'views': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'views'},
+    })
+    def test_command_refuses_local_memory_cache(self):
+        record_view(self.posts[0].pk)
+
+        with self.assertRaisesMessage(CommandError, 'LocMemCache'):
+            call_command('flush_views', stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).views, 10)
+        # 计数仍由本进程的后台线程写回
+        self.assertEqual(flush_view_counts(), 1)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).views, 11)
+
+    def test_failed_flush_restores_counts(self):
+        record_view(self.posts[0].pk)
+
+        with patch.object(QuerySet, 'update', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                flush_view_counts()
+
+        self.assertEqual(pending_views(self.posts[0].pk), 1)
+        self.assertEqual(flush_view_counts(), 1)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).views, 11)
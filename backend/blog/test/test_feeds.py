@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from blog.models import Post
 from django.contrib.auth import get_user_model
@@ -71,3 +73,14 @@ class RSSFeedTest(TestCase):
         creator = item.find('dc:creator', namespaces)
         self.assertIsNotNone(creator)
         self.assertEqual(self.user.username, creator.text)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+        # 新文章发布后订阅内容变化
+        Post.objects.create(title='New Post', body='Body', author=self.user)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -1,8 +1,16 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
-from blog.models import Post, Category, Tag
+from django.test.utils import CaptureQueriesContext
+from blog.models import Post, PostContent, Category, Tag
 from django.contrib.auth.models import User
 from django.urls import reverse
-from blog.utils import slugify_translate
+from django.utils import timezone
+from blog.utils import slugify_translate, render_digest, get_link_index_generation
+from blog.stats import get_view_cache
 
 
 class CategoryModelTest(TestCase):
@@ -36,6 +44,43 @@ class CategoryModelTest(TestCase):
         self.assertEqual(self.child_category.parent, self.parent_category)
         self.assertIn(self.child_category, self.parent_category.children.all())
 
+    def test_category_get_absolute_url_without_queries(self):
+        """生成 URL 直接使用物化路径，不查询父级分类"""
+        child = Category.objects.get(pk=self.child_category.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(child.get_absolute_url(),
+                             reverse('blog:category_detail', kwargs={'slug': 'parent-category/child-category'}))
+
+    def test_category_path_rewrite(self):
+        """修改 slug 或移动分类时，用一条 UPDATE 改写所有子孙分类的路径"""
+        grandchild = Category.objects.create(name='Grandchild', parent=self.child_category)
+        other = Category.objects.create(name='Other')
+        self.assertEqual(grandchild.path, 'parent-category/child-category/grandchild')
+
+        self.child_category.parent = other
+        # 读取原路径、更新自身、改写子孙路径，以及更新其中文章的更新时间（touch_category_posts）
+        with self.assertNumQueries(4):
+            self.child_category.save()
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.path, 'other/child-category/grandchild')
+
+        other.slug = 'misc'
+        other.save()
+        self.assertEqual(
+            list(other.get_descendants().order_by('path').values_list('path', flat=True)),
+            ['misc', 'misc/child-category', 'misc/child-category/grandchild']
+        )
+        self.assertEqual(self.parent_category.get_descendants(include_self=False).count(), 0)
+
+    def test_category_cycle_rejected(self):
+        """父级分类不能是自身的子孙分类"""
+        grandchild = Category.objects.create(name='Grandchild', parent=self.child_category)
+        self.parent_category.parent = grandchild
+        with self.assertRaises(ValidationError):
+            self.parent_category.clean()
+        with self.assertRaises(ValueError):
+            self.parent_category.save()
+
     def test_category_str_method(self):
         """确保 Category 模型的 __str__ 方法返回正确的字符串"""
         category = Category.objects.create(name='Test Category')
@@ -112,11 +157,37 @@ class PostModelTest(TestCase):
         self.assertIsNotNone(post.slug)
         self.assertTrue(post.slug.startswith(slugify_translate(post.title)))
 
+    def test_excerpt_generated_without_rendering(self):
+        # 未设置摘要时，直接从 Markdown 生成摘要，不写入 rendered_body
+        post = Post.objects.create(
+            title="Test Post Excerpt",
+            slug="test-post-excerpt",
+            body="## Heading\n\n" + "word " * 100,
+            author=self.user
+        )
+
+        self.assertEqual(post.rendered_body, '')
+        self.assertTrue(post.excerpt.startswith('Heading\nword word'))
+        self.assertTrue(post.excerpt.endswith('...'))
+
+    def test_set_rendered(self):
+        # 设置渲染结果时同时计算渲染摘要、字数与阅读时间
+        post = self.post
+        post.set_rendered('<h2>标题</h2><p>' + 'word ' * 520 + '</p>', '<ul></ul>')
+
+        self.assertEqual(post.toc, '<ul></ul>')
+        self.assertEqual(post.render_hash, render_digest(post.body, post.title))
+        self.assertEqual(post.word_count, 522)
+        self.assertEqual(post.read_time, 3)
+
     def test_post_string_representation(self):
         # 测试 Post 模型的字符串表示
         self.assertEqual(str(self.post), "测试 Post")
 
     def test_increase_views(self):
+        # 清空浏览量缓冲，避免其他测试遗留的计数
+        get_view_cache().clear()
+
         # 初始浏览量
         initial_views = self.post.views
 
@@ -130,3 +201,203 @@ class PostModelTest(TestCase):
         # 获取文章的绝对 URL
         expected_url = f"/posts/{self.post.slug}"
         self.assertEqual(self.post.get_absolute_url(), expected_url)
+
+
+class LinkIndexGenerationTest(TestCase):
+    """
+    验证：
+    - 新增、删除文章或修改标题、slug 时递增内部链接索引版本号
+    - 只修改正文等其他字段时版本号不变
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.post = Post.objects.create(title='链接目标', slug='link-target', body='正文', author=self.user)
+        self.post = Post.objects.get(pk=self.post.pk)
+
+    def save_and_get_generation(self, **kwargs):
+        generation = get_link_index_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save(**kwargs)
+        return generation, get_link_index_generation()
+
+    def test_title_change_bumps_generation(self):
+        self.post.title = '新的标题'
+        before, after = self.save_and_get_generation()
+
+        self.assertEqual(after, before + 1)
+
+    def test_slug_change_bumps_generation(self):
+        self.post.slug = 'new-slug'
+        before, after = self.save_and_get_generation(update_fields=['slug'])
+
+        self.assertEqual(after, before + 1)
+
+    def test_body_change_keeps_generation(self):
+        self.post.body = '新的正文'
+        before, after = self.save_and_get_generation()
+
+        self.assertEqual(after, before)
+
+    def test_create_and_delete_bump_generation(self):
+        before = get_link_index_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='另一篇', slug='another', body='正文', author=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+
+        self.assertEqual(get_link_index_generation(), before + 2)
+
+
+class PostSaveQueryTest(TestCase):
+    """
+    验证：
+    - 已有 slug 时更新只执行文章与内容各一次 UPDATE，创建只执行文章与内容各一次 INSERT
+    - 未读取正文时完整保存不写内容表，只更新内容字段时不写文章表
+    - 重复 slug 通过一次前缀查询追加数字后缀
+    - 字段值为表达式时只额外刷新这些字段
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.post = Post.objects.create(title="Query Post", slug="query-post", body="正文", author=self.user)
+
+    def test_update_is_one_query(self):
+        self.post.title = "New Title"
+        with self.assertNumQueries(2):
+            self.post.save()
+
+        with self.assertNumQueries(1):
+            self.post.save(update_fields=['title'])
+
+        # 未读取正文的实例只写文章表
+        post = Post.objects.get(pk=self.post.pk)
+        with self.assertNumQueries(1):
+            post.save()
+
+    def test_update_content_only(self):
+        self.post.body = "新的正文"
+        with CaptureQueriesContext(connection) as queries:
+            self.post.save(update_fields=['body'])
+        self.assertEqual(len(queries), 1)
+        self.assertIn(connection.ops.quote_name(PostContent._meta.db_table), queries[0]['sql'])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).body, "新的正文")
+
+    def test_create_with_slug_is_one_query(self):
+        with self.assertNumQueries(2):
+            Post.objects.create(title="Another", slug="another", body="正文", author=self.user)
+
+    def test_slug_allocated_with_one_query(self):
+        Post.objects.create(title="Query Post", slug="query-post-2", body="正文", author=self.user)
+
+        # 一次前缀查询 + 文章与内容各一次 INSERT（翻译命中进程内缓存）
+        slugify_translate("Query Post")
+        with self.assertNumQueries(3):
+            post = Post.objects.create(title="Query Post", body="正文", author=self.user)
+        self.assertEqual(post.slug, "query-post-3")
+
+    def test_expression_refreshes_expression_fields_only(self):
+        self.post.views = F('views') + 1
+        with self.assertNumQueries(2):
+            self.post.save(update_fields=['views'])
+        self.assertEqual(self.post.views, 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post.body, "正文")
+
+
+class PostEffectiveTimeTest(TestCase):
+    """
+    验证：
+    - 排序时间为修改时间，没有修改时间时为创建时间
+    - 只更新修改时间时排序时间一并写入
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.post = Post.objects.create(title="Time Post", slug="time-post", body="正文", author=self.user)
+
+    def test_effective_time(self):
+        self.assertEqual(self.post.effective_time, self.post.created_time)
+
+        self.post.modified_time = timezone.now() + timedelta(hours=1)
+        self.post.save(update_fields=['modified_time'])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).effective_time, self.post.modified_time)
+
+
+class PostContentTest(TestCase):
+    """
+    验证：
+    - 文章查询不读取正文等大字段，首次访问正文时查询一次内容表
+    - select_related('content') 时正文随文章一并查询
+    - 删除文章时一并删除内容
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.post = Post.objects.create(title="Content Post", slug="content-post", body="# 正文", author=self.user)
+        self.post.set_rendered('<h1>正文</h1>', '<ul></ul>')
+        self.post.save()
+
+    def test_lazy_content(self):
+        with CaptureQueriesContext(connection) as queries:
+            post = Post.objects.get(pk=self.post.pk)
+        self.assertNotIn('body', queries[0]['sql'])
+
+        with self.assertNumQueries(1):
+            self.assertEqual((post.body, post.rendered_body, post.toc), ("# 正文", '<h1>正文</h1>', '<ul></ul>'))
+
+    def test_select_related(self):
+        post = Post.objects.select_related('content').get(pk=self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(post.body, "# 正文")
+
+    def test_delete(self):
+        self.post.delete()
+        self.assertFalse(PostContent.objects.exists())
+
+
+class PostUpdateFieldsTest(TestCase):
+    """
+    验证：
+    - 只更新计数、置顶等字段时不生成摘要、不重新索引，且只写入指定的列
+    - 更新正文时重新生成摘要并写入，同时重新索引
+    - 未指定 update_fields 时照常重新索引
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.post = Post.objects.create(title="Fields Post", slug="fields-post", body="正文内容", author=self.user)
+        Post.objects.filter(pk=self.post.pk).update(excerpt='')
+        self.post.excerpt = ''
+
+        # 由配置的信号处理器（HAYSTACK_SIGNAL_PROCESSOR）触发索引更新
+        patcher = patch('blog.search_indexes.PostIndex.update_object')
+        self.mock_update_object = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_counter_update_is_single_column(self):
+        self.post.views = 5
+        self.post.pin = True
+        with patch('blog.models.generate_summary_from_markdown') as mock_summary, \
+                CaptureQueriesContext(connection) as queries:
+            self.post.save(update_fields=['views'])
+
+        mock_summary.assert_not_called()
+        self.mock_update_object.assert_not_called()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(connection.ops.quote_name('excerpt'), queries[0]['sql'])
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.views, post.pin, post.excerpt), (5, False, ''))
+
+    def test_body_update_regenerates_excerpt(self):
+        self.post.body = '新的正文'
+        self.post.save(update_fields=['body'])
+
+        self.assertEqual(Post.objects.get(pk=self.post.pk).excerpt, '新的正文\n')
+        self.mock_update_object.assert_called_once()
+
+    def test_full_save_reindexes(self):
+        self.post.save()
+        self.mock_update_object.assert_called_once()
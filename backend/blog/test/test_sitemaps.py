@@ -69,3 +69,10 @@ class SitemapTest(TestCase):
         for tag in items:
             url = sitemap.location(tag)
             self.assertEqual(url, reverse('blog:tag_detail', args=[tag.slug]))
+
+    def test_not_modified(self):
+        url = reverse('blog:django.contrib.sitemaps.views.sitemap')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
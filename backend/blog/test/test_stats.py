@@ -0,0 +1,120 @@
+import datetime
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog import stats
+from blog.models import Post, PostVisitorSketch
+from blog.stats import HyperLogLog, is_bot, record_visitor, flush_visitor_sketches, count_unique_visitors
+
+
+class HyperLogLogTest(TestCase):
+    """
+    验证：
+    - 基数估计误差在 5% 以内，重复添加不改变计数
+    - 合并结果等于并集的计数，序列化后大小固定
+    """
+
+    def test_count(self):
+        sketch = HyperLogLog()
+        for i in range(10000):
+            sketch.add(f'visitor-{i}')
+            sketch.add(f'visitor-{i}')
+        self.assertAlmostEqual(sketch.count(), 10000, delta=500)
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_merge(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            first.add(f'visitor-{i}')
+            second.add(f'visitor-{i + 2000}')
+
+        merged = HyperLogLog(first.to_bytes()).merge(second)
+        self.assertAlmostEqual(merged.count(), 5000, delta=250)
+        self.assertEqual(len(merged.to_bytes()), 4096)
+        with self.assertRaises(ValueError):
+            HyperLogLog(b'\x00' * 10)
+
+
+@override_settings(VIEW_FLUSH_INTERVAL=60)
+class UniqueVisitorTest(TestCase):
+    """
+    验证：
+    - 记录访客不访问数据库，爬虫请求与未启用后台写回时不计入
+    - 只在直接连接方为可信代理时采用 X-Forwarded-For
+    - 多次写回的草图与已有草图合并，同一访客只计一次
+    - 按日期保存草图，可按起始日期统计
+    """
+
+    def setUp(self):
+        stats.visitor_sketches.clear()
+        user = User.objects.create_user(username='visitor', password='password')
+        self.post = Post.objects.create(title='访客统计', body='正文', author=user)
+        self.factory = RequestFactory()
+
+        # 不启动后台写回线程，由测试直接调用 flush_visitor_sketches
+        patcher = patch('blog.stats.start_view_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, ip, user_agent='Mozilla/5.0', **extra):
+        return self.factory.get('/', REMOTE_ADDR=ip, HTTP_USER_AGENT=user_agent, **extra)
+
+    def test_is_bot(self):
+        self.assertTrue(is_bot('Mozilla/5.0 (compatible; Googlebot/2.1)'))
+        self.assertTrue(is_bot('curl/8.0'))
+        self.assertTrue(is_bot(''))
+        self.assertFalse(is_bot('Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0'))
+
+    def test_record_without_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(record_visitor(self.post.pk, self.request('10.0.0.1')))
+            self.assertFalse(record_visitor(self.post.pk, self.request('10.0.0.2', 'Baiduspider')))
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(VIEW_FLUSH_INTERVAL=0)
+    def test_not_recorded_without_flusher(self):
+        self.assertFalse(record_visitor(self.post.pk, self.request('10.0.0.1')))
+        self.assertEqual(stats.visitor_sketches, {})
+
+    def test_forwarded_for_only_from_trusted_proxy(self):
+        forwarded = {'HTTP_X_FORWARDED_FOR': '1.1.1.1, 2.2.2.2'}
+        self.assertEqual(stats.client_ip(self.request('10.0.0.1', **forwarded)), '10.0.0.1')
+
+        with self.settings(TRUSTED_PROXIES=['10.0.0.1']):
+            # 客户端可伪造前几项，取最后一个不属于可信代理的地址
+            self.assertEqual(stats.client_ip(self.request('10.0.0.1', **forwarded)), '2.2.2.2')
+            self.assertEqual(stats.client_ip(self.request('10.0.0.1')), '10.0.0.1')
+
+    def test_flush_merges(self):
+        for i in range(100):
+            record_visitor(self.post.pk, self.request(f'10.0.0.{i}'))
+        self.assertEqual(flush_visitor_sketches(), 1)
+        self.assertEqual(stats.visitor_sketches, {})
+
+        # 第二次写回：一半是已计入的访客
+        for i in range(50, 150):
+            record_visitor(self.post.pk, self.request(f'10.0.0.{i}'))
+        record_visitor(self.post.pk + 1000, self.request('10.0.0.1'))  # 不存在的文章被忽略
+        self.assertEqual(flush_visitor_sketches(), 1)
+
+        self.assertEqual(PostVisitorSketch.objects.count(), 1)
+        self.assertAlmostEqual(self.post.unique_visitors(), 150, delta=5)
+        self.assertEqual(flush_visitor_sketches(), 0)
+
+    def test_daily_sketches(self):
+        today = datetime.date(2026, 10, 18)
+        with patch('blog.stats.timezone.localdate', return_value=today - datetime.timedelta(days=1)):
+            for i in range(20):
+                record_visitor(self.post.pk, self.request(f'10.0.1.{i}'))
+        with patch('blog.stats.timezone.localdate', return_value=today):
+            for i in range(10, 40):
+                record_visitor(self.post.pk, self.request(f'10.0.1.{i}'))
+        flush_visitor_sketches()
+
+        self.assertEqual(PostVisitorSketch.objects.filter(post=self.post).count(), 2)
+        self.assertAlmostEqual(count_unique_visitors(self.post.pk), 40, delta=2)
+        self.assertAlmostEqual(count_unique_visitors(self.post.pk, since=today), 30, delta=2)
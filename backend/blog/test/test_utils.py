@@ -0,0 +1,522 @@
+import random
+import re
+from django.test import TestCase, override_settings
+from unittest.mock import Mock, patch
+from blog import utils
+from blog.utils import render_markdown, render_digest, render_markdown_uncached, generate_toc, markdown_renderer
+from blog.utils import resolve_img_src_to_url, external_link_prefix
+from blog.utils import generate_summary, generate_summary_from_markdown, SummaryTextExtractor
+from blog.utils import update_obsidian_links, LinkParser, NextCharFinder
+from blog.utils import render_markdown_incremental, split_markdown_blocks
+from blog.utils import translate, translate_many, slugify_translate
+from blog.models import Translation, Post
+from django.contrib.auth.models import User
+from blog.translators import BaseTranslator, BaiduTranslator
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'render': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'render-test',
+        'TIMEOUT': None,
+    },
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RenderCacheTest(TestCase):
+    """
+    验证：
+    - 相同内容只渲染一次，后续直接命中缓存
+    - 正文、标题或渲染器版本变化时缓存键随之变化
+    - use_cache=False 时跳过缓存
+    """
+
+    body = '## 标题\n\n正文内容'
+
+    def setUp(self):
+        utils.get_render_cache().clear()
+
+    def test_render_is_cached(self):
+        """内容不变时不重复渲染"""
+        with patch('blog.utils.render_markdown_uncached', wraps=utils.render_markdown_uncached) as mock_render:
+            first = render_markdown(self.body, title='Title')
+            second = render_markdown(self.body, title='Title')
+
+        self.assertEqual(first, second)
+        mock_render.assert_called_once()
+
+    def test_digest_depends_on_content_and_title(self):
+        """正文或标题变化时摘要不同"""
+        digest = render_digest(self.body, 'Title')
+        self.assertEqual(digest, render_digest(self.body, 'Title'))
+        self.assertNotEqual(digest, render_digest(self.body + '!', 'Title'))
+        self.assertNotEqual(digest, render_digest(self.body, 'Other'))
+
+    def test_link_index_bump_invalidates_digest(self):
+        """内部链接索引变化后摘要不同，渲染结果中的链接随之更新"""
+        digest = render_digest(self.body, 'Title')
+        utils.bump_link_index_generation()
+
+        self.assertNotEqual(digest, render_digest(self.body, 'Title'))
+
+    def test_version_bump_invalidates_cache(self):
+        """递增渲染器版本号后重新渲染"""
+        render_markdown(self.body, title='Title')
+
+        with patch('blog.utils.RENDERER_VERSION', utils.RENDERER_VERSION + 1), \
+                patch('blog.utils.render_markdown_uncached', wraps=utils.render_markdown_uncached) as mock_render:
+            render_markdown(self.body, title='Title')
+
+        mock_render.assert_called_once()
+
+    def test_use_cache_false_skips_cache(self):
+        """use_cache=False 时每次都渲染"""
+        with patch('blog.utils.render_markdown_uncached', wraps=utils.render_markdown_uncached) as mock_render:
+            render_markdown(self.body, use_cache=False)
+            render_markdown(self.body, use_cache=False)
+
+        self.assertEqual(mock_render.call_count, 2)
+
+
+class SingleParseRenderTest(TestCase):
+    """
+    验证：
+    - 目录与正文共用同一份 token 流，目录链接与正文标题 id 一致
+    - 重复标题不会在目录中被合并，并得到去重后的锚点
+    - 目录层级嵌套正确
+    """
+
+    def test_duplicate_headings_get_unique_anchors(self):
+        body = '## 小结\n\n第一处\n\n## 小结\n\n第二处'
+        rendered_body, toc = render_markdown_uncached(body)
+
+        self.assertIn('<h2 id="小结">', rendered_body)
+        self.assertIn('<h2 id="小结-1">', rendered_body)
+        self.assertIn('href="#小结"', toc)
+        self.assertIn('href="#小结-1"', toc)
+        self.assertEqual(toc.count('toc-list-item'), 2)
+
+    def test_toc_nesting(self):
+        tokens = markdown_renderer.parse('## A\n\n### B\n\n#### C\n\n## D')
+        toc = generate_toc(tokens)
+
+        self.assertEqual(toc.count('<ul class="toc_list">'), 3)
+        self.assertIn('node-name--H4', toc)
+        self.assertTrue(toc.startswith('<ul class="toc_list"><li class="toc-list-item"><a href="#a"'))
+
+    def test_empty_toc(self):
+        _, toc = render_markdown_uncached('没有标题的正文')
+        self.assertEqual(toc, '')
+
+
+class ImgSrcRewriteTest(TestCase):
+    """
+    验证：
+    - 原始 HTML 中相对路径的 img src 被改写为图床地址，其余属性原样保留
+    - http(s) 图片地址保持不变
+    - 代码块与行内代码中的 img 标签不被改写
+    - 不对整段内容做 HTML 转义（如引用块保持有效）
+    """
+
+    def test_relative_src_rewritten(self):
+        html = '<img src="/res/Pasted%20image%2020240109205907.png" width="700" alt="别名" />'
+        self.assertEqual(
+            resolve_img_src_to_url(html),
+            f'<img src="{external_link_prefix}Pasted%20image%2020240109205907.png" width="700" alt="别名" />'
+        )
+
+    def test_unquoted_and_single_quoted_src(self):
+        self.assertEqual(resolve_img_src_to_url('<img src=a.png>'), f'<img src="{external_link_prefix}a.png">')
+        self.assertEqual(resolve_img_src_to_url("<img src='res/a b.png'>"), f'<img src="{external_link_prefix}a%20b.png">')
+
+    def test_web_src_unchanged(self):
+        html = '<img src="https://example.com/a.png" width="60%" height="50%">'
+        self.assertEqual(resolve_img_src_to_url(html), html)
+
+    def test_render_rewrites_html_tokens_only(self):
+        body = '<div>\n<img src="res/a.png">\n</div>\n\n行内 <img src="b.png"> 图片\n\n`<img src="c.png">`\n\n> 引用'
+        rendered_body, _ = render_markdown_uncached(body)
+
+        self.assertIn(f'<img src="{external_link_prefix}a.png">', rendered_body)
+        self.assertIn(f'<img src="{external_link_prefix}b.png">', rendered_body)
+        self.assertIn('<code>&lt;img src=&quot;c.png&quot;&gt;</code>', rendered_body)
+        self.assertIn('<blockquote>', rendered_body)
+
+
+class SummaryTest(TestCase):
+    """
+    验证：
+    - 摘要截断与省略号
+    - <script>、<pre> 中的内容不计入摘要
+    - 收集到足够字符后停止解析
+    - 直接从 Markdown 生成摘要时跳过代码块
+    """
+
+    def test_truncate_with_ellipsis(self):
+        self.assertEqual(generate_summary('<p>abcdef</p>', 3), 'abc...')
+        self.assertEqual(generate_summary('<p>abc</p>', 3), 'abc')
+
+    def test_skip_script_and_pre(self):
+        html = '<p>a &amp; b</p><script>var x = 1;</script><pre><code>code</code></pre><p>c</p>'
+        self.assertEqual(generate_summary(html, 120), 'a & bc')
+
+    def test_early_exit(self):
+        html = '<p>' + '字' * 200 + '</p>' + '<p>正文</p>' * 50000
+        with patch.object(SummaryTextExtractor, 'feed', autospec=True, side_effect=SummaryTextExtractor.feed) as mock_feed:
+            summary = generate_summary(html, 120)
+
+        self.assertEqual(summary, '字' * 120 + '...')
+        self.assertEqual(mock_feed.call_count, 1)
+
+    def test_summary_from_markdown(self):
+        body = '## 标题\n\n```python\nprint(1)\n```\n\n正文 **加粗** `code`'
+        self.assertEqual(generate_summary_from_markdown(body, 120), '标题\n正文 加粗 code\n')
+
+    def test_summary_from_long_markdown(self):
+        body = '开头段落' * 10 + '\n\n' + '\n\n'.join(['后续段落'] * 50000)
+        self.assertEqual(generate_summary_from_markdown(body, 10), '开头段落开头段落开头...')
+
+
+class ObsidianLinkScanTest(TestCase):
+    """
+    验证：
+    - 代码块与行内代码中的链接原样保留
+    - wiki 图片链接与本地 Markdown 图片被改写，网页链接保持不变
+    - 正文中字面出现的 __CODE_BLOCK__ 不受影响
+    - 未闭合的代码标记不吞掉后续链接
+    """
+
+    def test_code_untouched(self):
+        content = '```\n![[a.png]]\n```\n\n`![[b.png]]` ![[c.png]]\n\n~~~\n![d](d.png)\n~~~'
+        self.assertEqual(
+            update_obsidian_links(content),
+            f'```\n![[a.png]]\n```\n\n`![[b.png]]` <img src="{external_link_prefix}c.png" alt="c.png" />'
+            '\n\n~~~\n![d](d.png)\n~~~'
+        )
+
+    def test_links_rewritten(self):
+        content = '![[a.png|图|300x200]] ![图](res/b c.png) [Django](https://www.djangoproject.com/)'
+        self.assertEqual(
+            update_obsidian_links(content),
+            f'<img src="{external_link_prefix}a.png" width="300" height="200" alt="图" /> '
+            f'![图]({external_link_prefix}b%20c.png) [Django](https://www.djangoproject.com/)'
+        )
+
+    def test_literal_placeholder_preserved(self):
+        content = '`code` __CODE_BLOCK__ `more`'
+        self.assertEqual(update_obsidian_links(content), content)
+
+    def test_unclosed_code_marker(self):
+        content = '```` ![[a.png]] ~~~ `'
+        self.assertEqual(
+            update_obsidian_links(content),
+            f'```` <img src="{external_link_prefix}a.png" alt="a.png" /> ~~~ `'
+        )
+
+
+# 原链接正则，仅作为解析器语义一致性的参照
+LEGACY_WIKI_LINK_REGEX = re.compile(
+    r'(!?)\[\[([^\]\|\n#]*?)(?:#([^\]\|\n]*?))?(?:\|([^\]\|\n]*?))?(?:\|(\d+)(?:x(\d+))?)?\]\]'
+)
+LEGACY_LINK_REGEX = re.compile(
+    r'(!)?\[((?:[^\]\|\n]*(?:\|[^\]\n]*)?))\]\(((?:[^()\n]|\([^()\n]*\))*[^)\n]*)\)'
+)
+
+
+class LinkParserTest(TestCase):
+    """
+    验证：
+    - 随机输入下解析结果与原正则完全一致（位置与各分组）
+    - 病态单行输入上扫描的字符数与长度成线性关系
+    """
+
+    fragments = ['[', '[[', ']', ']]', '(', ')', '!', '|', '#', 'x', '300', '3x4', 'a', '\n', ' ', '１２']
+
+    @staticmethod
+    def as_tuple(match, groups):
+        return match.start(), match.end(), tuple(match.group(i) for i in range(groups + 1))
+
+    def test_same_matches_as_regex(self):
+        rng = random.Random(0)
+        for _ in range(3000):
+            content = ''.join(rng.choice(self.fragments) for _ in range(rng.randint(1, 30)))
+            parser = LinkParser(content)
+
+            self.assertEqual(
+                [self.as_tuple(m, 3) for m in parser.iter_matches('[', parser.match_link)],
+                [self.as_tuple(m, 3) for m in LEGACY_LINK_REGEX.finditer(content)],
+                content
+            )
+            self.assertEqual(
+                [self.as_tuple(m, 6) for m in parser.iter_matches('[[', parser.match_wiki)],
+                [self.as_tuple(m, 6) for m in LEGACY_WIKI_LINK_REGEX.finditer(content)],
+                content
+            )
+
+    def test_url_parentheses(self):
+        parser = LinkParser('[a](x (y) z [b](p (q) r')
+        urls = [match.group(3) for match in parser.iter_matches('[', parser.match_link)]
+        self.assertEqual(urls, ['x (y) z [b](p (q'])
+
+    def parser_work(self, content):
+        """
+        解析器扫描的字符数：NextCharFinder 实际执行查找时扫过的长度，与 wiki 链接内容中查找 | 的长度之和
+        每次查找至少计 1，查找次数同样计入
+        """
+        work = 0
+        find = NextCharFinder.__call__
+        match_wiki = LinkParser.match_wiki
+
+        def counting_find(finder, pos):
+            nonlocal work
+            cached = finder.start <= pos <= finder.end
+            end = find(finder, pos)
+            if not cached:
+                work += end - pos + 1
+            return end
+
+        def counting_match_wiki(parser, pos):
+            nonlocal work
+            scanned = (parser.wiki_start, parser.wiki_stop)
+            match = match_wiki(parser, pos)
+            if (parser.wiki_start, parser.wiki_stop) != scanned:
+                work += parser.wiki_stop - parser.wiki_start + 1
+            return match
+
+        with patch.object(NextCharFinder, '__call__', counting_find), \
+                patch.object(LinkParser, 'match_wiki', counting_match_wiki):
+            update_obsidian_links(content)
+        return work
+
+    def test_pathological_lines_scale_linearly(self):
+        """病态输入上扫描的字符数与文本长度成线性关系，不依赖耗时（耗时对比见 benchmarks/bench_redos.py）"""
+        cases = {
+            'unclosed url': lambda n: '[a](' + 'x' * n,
+            'unbalanced parens': lambda n: '[a](' + '(x' * (n // 2),
+            'pipes in text': lambda n: '[' + '|' * n,
+            'link openers': lambda n: '[a](' * (n // 4),
+            'wiki openers': lambda n: '[[' * (n // 2),
+            'wiki pipes': lambda n: '[[' * (n // 8) + '|' * (n // 2) + ']]',
+            'wiki size': lambda n: '[[' * (n // 8) + 'a|b|' + '1' * (n // 2) + 'y]]',
+        }
+
+        for name, build in cases.items():
+            for size in (1 << 12, 1 << 14):
+                content = build(size)
+                # 回溯正则或每个起点重新扫描时为平方级，约为长度的 size 倍
+                self.assertLessEqual(self.parser_work(content), 4 * len(content), (name, size))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IncrementalRenderTest(TestCase):
+    """
+    验证：
+    - 增量渲染结果与整体渲染完全一致（含目录）
+    - 修改一个块后只重新渲染该块
+    - 跨块的重复标题按全文顺序去重
+    - 围栏代码块、列表内的空行不切分
+    - 包含引用式链接定义时退回整体渲染
+    - 内部链接索引变化后缓存的块失效
+    """
+
+    body = (
+        '导语段落\n\n'
+        '## 安装\n\n说明 `code`\n\n'
+        '```python\ndef f():\n\n    return 1\n```\n\n'
+        '- 列表项\n\n  续行\n- 第二项\n\n'
+        '## 安装\n\n### 步骤\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n'
+        '> 引用\n\n## 安装-1\n\n结尾'
+    )
+
+    def setUp(self):
+        utils.get_render_cache().clear()
+
+    def test_matches_full_render(self):
+        expected = render_markdown_uncached(self.body, title='Title')
+        self.assertEqual(render_markdown_incremental(self.body, title='Title'), expected)
+        # 第二次全部命中缓存
+        self.assertEqual(render_markdown_incremental(self.body, title='Title'), expected)
+
+    def test_duplicate_headings_across_blocks(self):
+        rendered_body, toc = render_markdown_incremental(self.body)
+        for slug in ('安装', '安装-1', '安装-1-1'):
+            self.assertIn(f'id="{slug}"', rendered_body)
+            self.assertIn(f'href="#{slug}"', toc)
+
+    def test_fences_and_lists_not_split(self):
+        blocks = split_markdown_blocks(self.body)
+        # 各块保留末尾的空行，拼接后与原文一致
+        self.assertEqual(''.join(blocks), self.body)
+        self.assertIn('```python\ndef f():\n\n    return 1\n```\n\n', blocks)
+        self.assertIn('- 列表项\n\n  续行\n- 第二项\n\n', blocks)
+
+    def test_only_changed_block_rendered(self):
+        render_markdown_incremental(self.body)
+        edited = self.body.replace('结尾', '新的结尾')
+
+        with patch('blog.utils.render_block', wraps=utils.render_block) as mock_render:
+            result = render_markdown_incremental(edited)
+
+        mock_render.assert_called_once()
+        self.assertEqual(mock_render.call_args.args[:2], ('新的结尾', None))
+        self.assertEqual(result, render_markdown_uncached(edited))
+
+    def test_link_index_change_invalidates_blocks(self):
+        """链接目标改名后，缓存的块中的内部链接随之更新"""
+        user = User.objects.create_user(username='writer', password='password')
+        post = Post.objects.create(title='目标文章', slug='old-slug', body='正文', author=user)
+        body = '导语\n\n见 [[目标文章]]'
+        self.assertIn(f'href="{utils.internal_link_prefix}old-slug"', render_markdown_incremental(body)[0])
+
+        # 保存文章时由 invalidate_link_index 在提交后递增版本号，此处直接改写并递增
+        Post.objects.filter(pk=post.pk).update(slug='new-slug')
+        utils.bump_link_index_generation()
+
+        rendered_body, _ = render_markdown_incremental(body)
+        self.assertIn(f'href="{utils.internal_link_prefix}new-slug"', rendered_body)
+        self.assertEqual(rendered_body, render_markdown_uncached(body)[0])
+
+    def test_reference_definitions_fall_back(self):
+        body = '见 [文档][doc]\n\n[doc]: https://example.com'
+        with patch('blog.utils.render_block') as mock_render:
+            rendered_body, _ = render_markdown_incremental(body)
+
+        mock_render.assert_not_called()
+        self.assertIn('href="https://example.com"', rendered_body)
+
+
+class LinkSlugIndexTest(TestCase):
+    """
+    验证：
+    - wiki 链接与本地 Markdown 链接按标题、文件名或 slug 解析为已有文章的 slug，不调用翻译接口
+    - 同一次渲染中索引只加载一次，与链接数量无关
+    - 未知的 ASCII 目标直接转换为 slug，其余未知目标合并为一次翻译请求，且同一目标只翻译一次
+    """
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from blog.models import Post
+
+        user = User.objects.create_user(username='testuser', password='password')
+        Post.objects.create(title='缓存设计', slug='cache-design', body='正文', author=user)
+        Post.objects.create(title='Django  Signals', slug='django-signals', body='正文', author=user)
+
+    @patch('blog.utils.translate_many')
+    def test_resolve_existing_posts(self, mock_translate):
+        content = '[[缓存设计]] [[notes/缓存设计.md#小结|别名]] [[django signals]] [文档](docs/缓存设计.md) [[cache-design]]'
+        result = update_obsidian_links(content)
+
+        self.assertEqual(result.count(f'href="{utils.internal_link_prefix}cache-design"'), 4)
+        self.assertIn(f'href="{utils.internal_link_prefix}django-signals"', result)
+        mock_translate.assert_not_called()
+
+    @patch('blog.utils.translate_many')
+    def test_index_loaded_once(self, mock_translate):
+        content = ' '.join(f'[[缓存设计|链接 {i}]]' for i in range(50))
+        with self.assertNumQueries(1):
+            render_markdown_uncached(content)
+
+        # 不含内部链接时不查询数据库
+        with self.assertNumQueries(0):
+            render_markdown_uncached('![[a.png]] [Django](https://www.djangoproject.com/)')
+
+    @patch('blog.utils.translate_many', return_value=['Unknown Note', 'Other Note'])
+    def test_unknown_targets(self, mock_translate):
+        result = update_obsidian_links('[[Some Note]] [[未知笔记]] [[未知笔记|again]] [文档](其他笔记.md)')
+
+        self.assertIn(f'href="{utils.internal_link_prefix}some-note"', result)
+        self.assertEqual(result.count(f'href="{utils.internal_link_prefix}unknown-note"'), 2)
+        self.assertIn(f'href="{utils.internal_link_prefix}other-note"', result)
+        # 未知目标合并为一次批量翻译
+        mock_translate.assert_called_once_with(['未知笔记', '其他笔记'])
+
+
+class RecordingTranslator(BaseTranslator):
+    """记录每次调用的测试用翻译后端"""
+    calls = []
+
+    def translate_many(self, texts, from_lang='zh', to_lang='en'):
+        self.calls.append(list(texts))
+        return [None if text == '失败' else f'translated {len(text)}' for text in texts]
+
+
+@override_settings(TRANSLATION_BACKEND='blog.test.test_utils.RecordingTranslator')
+class TranslationCacheTest(TestCase):
+    """
+    验证：
+    - 未命中的原文去重后合并为一次后端请求，结果写入翻译缓存表
+    - 进程内缓存未命中时从翻译缓存表读取，不再调用后端；进程内缓存命中时不访问数据库
+    - 翻译失败时返回原文，且不写入缓存
+    - 桩后端的结果不写入翻译缓存表
+    """
+
+    def setUp(self):
+        utils.translation_cache.clear()
+        RecordingTranslator.calls = []
+
+    def test_batched_and_persisted(self):
+        self.assertEqual(translate_many(['标题', '文章', '标题']), ['translated 2'] * 3)
+        self.assertEqual(RecordingTranslator.calls, [['标题', '文章']])
+        self.assertEqual(Translation.objects.get(source='标题', from_lang='zh', to_lang='en').text, 'translated 2')
+
+    def test_cache_layers(self):
+        translate('标题')
+        utils.translation_cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(translate('标题'), 'translated 2')
+        with self.assertNumQueries(0):
+            self.assertEqual(slugify_translate('标题'), 'translated-2')
+        self.assertEqual(len(RecordingTranslator.calls), 1)
+
+    def test_failure_not_cached(self):
+        self.assertEqual(translate('失败'), '失败')
+        self.assertEqual(translate('失败'), '失败')
+        self.assertEqual(len(RecordingTranslator.calls), 2)
+        self.assertFalse(Translation.objects.exists())
+
+    @override_settings(TRANSLATION_BACKEND='blog.translators.StubTranslator')
+    def test_stub_not_persisted(self):
+        self.assertEqual(translate('标题'), '标题')
+        self.assertFalse(Translation.objects.exists())
+
+
+class BaiduTranslatorTest(TestCase):
+    """
+    验证：
+    - 多段原文在一次请求中按行翻译
+    - 超出单次请求长度时分多次请求
+    - 请求失败或行数不一致时对应位置返回 None
+    """
+
+    def setUp(self):
+        self.translator = BaiduTranslator()
+        self.translator.interval = 0
+
+    def response(self, *lines):
+        return Mock(json=Mock(return_value={'trans_result': [{'src': '', 'dst': line} for line in lines]}))
+
+    @patch('blog.translators.requests.get')
+    def test_batch_request(self, mock_get):
+        mock_get.return_value = self.response('Title', 'Article')
+
+        self.assertEqual(self.translator.translate_many(['标题', '文\n章']), ['Title', 'Article'])
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args.kwargs['params']['q'], '标题\n文 章')
+
+    @patch('blog.translators.requests.get')
+    def test_split_batches(self, mock_get):
+        self.translator.max_chars = 5
+        mock_get.side_effect = [self.response('A', 'B'), self.response('C')]
+
+        self.assertEqual(self.translator.translate_many(['一', '二', '三四五']), ['A', 'B', 'C'])
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch('blog.translators.requests.get')
+    def test_failure(self, mock_get):
+        mock_get.return_value = self.response('A')
+        self.assertEqual(self.translator.translate_many(['一', '二']), [None, None])
+
+        mock_get.side_effect = ConnectionError
+        self.assertEqual(self.translator.translate_many(['一']), [None])
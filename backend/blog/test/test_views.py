@@ -1,6 +1,21 @@
+from datetime import timedelta
+from unittest import skipUnless
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from blog.pagination import bump_post_count_version, encode_cursor
+from blog.pagecache import get_page_cache, get_page_cache_stats
 from django.urls import reverse
-from django.test import TestCase
+from django.utils import timezone
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils.cache import has_vary_header
 from blog.models import Post, Category, Tag
+from comment.models import Comment
+from blog.stats import get_view_cache, pending_views
+from blog.models import build_category_tree, get_category_tree, clear_category_tree
+from blog.models import CATEGORY_TREE_CACHE_KEY, get_category_tree_cache
+from django.core.cache import cache, caches
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
@@ -92,6 +107,389 @@ class IndexViewTest(TestCase):
         post_list = response.context['post_list']
         self.assertEqual(post_list[0].title, post_3.title)  # 确保 Post 3 出现在最前面
 
+    def test_pinned_and_modified_ordering(self):
+        """置顶文章在前，其余按修改时间（没有时为创建时间）降序"""
+        self.post_1.modified_time = timezone.now() + timedelta(days=1)
+        self.post_1.save(update_fields=['modified_time'])
+        post_3 = Post.objects.create(title='Post 3', slug='post-3', body='Body', author=self.user, pin=True,
+                                     created_time=timezone.now() - timedelta(days=30))
+
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [post.pk for post in response.context['post_list']],
+            [post_3.pk, self.post_1.pk, self.post_2.pk]
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', '查询计划的格式与数据库有关')
+    def test_ordering_uses_index(self):
+        """首页查询按 (pin, effective_time) 索引顺序扫描，无需排序"""
+        plan = Post.objects.order_by('-pin', '-effective_time')[:10].explain()
+        self.assertIn('blog_post_pin_effective_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class IndexCursorPaginationTest(TestCase):
+    """
+    验证：
+    - 沿 ?after= 游标逐页读取的结果与按页码分页一致，?before= 返回上一页
+    - 按页码分页的页面中，上一页、下一页的链接为游标
+    - 游标分页不执行 COUNT(*)，也不使用 OFFSET
+    - 按页码分页时总数被缓存，新增文章后失效，失效对共享缓存的其他进程同样有效
+    - 无效游标返回 404
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        now = timezone.now()
+        # 部分文章排序时间相同，由主键区分先后
+        for i in range(25):
+            Post.objects.create(title=f'Post {i}', slug=f'post-{i}', body='Body', author=self.user, pin=i == 3,
+                                created_time=now - timedelta(minutes=i // 2))
+        self.url = reverse('blog:index')
+
+    def titles(self, response):
+        return [post.title for post in response.context['post_list']]
+
+    def post_queries(self, queries):
+        table = f'FROM {connection.ops.quote_name(Post._meta.db_table)}'
+        return ' '.join(query['sql'] for query in queries if table in query['sql'])
+
+    def test_cursor_walk(self):
+        expected = []
+        for page in range(1, 4):
+            expected.extend(self.titles(self.client.get(self.url, {'page': page})))
+
+        response = self.client.get(self.url)
+        walked = self.titles(response)
+        pages = [walked[:]]
+        cursor = list(response.context['post_list'])[-1]
+        after = encode_cursor([cursor.pin, cursor.effective_time, cursor.pk])
+        while after:
+            response = self.client.get(self.url, {'after': after})
+            page_obj = response.context['page_obj']
+            pages.append(self.titles(response))
+            walked.extend(pages[-1])
+            after = page_obj.next_cursor
+        self.assertEqual(walked, expected)
+        self.assertEqual(len(pages), 3)
+
+        # 从最后一页返回上一页
+        response = self.client.get(self.url, {'before': page_obj.previous_cursor})
+        self.assertEqual(self.titles(response), pages[1])
+        self.assertContains(response, 'rel="next"')
+
+    def test_numbered_page_links_cursors(self):
+        """按页码分页时上一页、下一页的箭头使用游标，与相邻页码的内容一致"""
+        page_2 = self.client.get(self.url, {'page': 2})
+        page_obj = page_2.context['page_obj']
+        self.assertContains(page_2, f'href="?after={page_obj.next_cursor}"')
+        self.assertContains(page_2, f'href="?before={page_obj.previous_cursor}"')
+
+        after = self.client.get(self.url, {'after': page_obj.next_cursor})
+        self.assertEqual(self.titles(after), self.titles(self.client.get(self.url, {'page': 3})))
+        before = self.client.get(self.url, {'before': page_obj.previous_cursor})
+        self.assertEqual(self.titles(before), self.titles(self.client.get(self.url)))
+
+    def test_cursor_page_queries(self):
+        post = Post.objects.order_by('-pin', '-effective_time', '-pk')[15]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'after': encode_cursor([post.pin, post.effective_time, post.pk])})
+        sql = self.post_queries(queries)
+        self.assertNotIn('COUNT(*)', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_cached_count(self):
+        self.client.get(self.url, {'page': 2})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'page': 3})
+        self.assertNotIn('COUNT(*)', self.post_queries(queries))
+        self.assertEqual(response.context['paginator'].num_pages, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(6):
+                Post.objects.create(title=f'New {i}', slug=f'new-{i}', body='Body', author=self.user)
+        self.assertEqual(self.client.get(self.url).context['paginator'].num_pages, 4)
+
+    def test_cached_count_shared_between_processes(self):
+        """总数与版本号保存在共享缓存中：一个进程递增版本号后，其他进程缓存的总数随即失效"""
+        # 两个独立的缓存客户端，分别代表两个进程
+        writer, reader = caches.create_connection('render'), caches.create_connection('render')
+        with patch('blog.pagination.get_post_count_cache', return_value=reader):
+            self.assertEqual(self.client.get(self.url, {'page': 3}).context['paginator'].count, 25)
+
+        Post.objects.filter(title__in=['Post 23', 'Post 24']).delete()
+        with patch('blog.pagination.get_post_count_cache', return_value=writer):
+            bump_post_count_version()
+
+        get_page_cache().clear()
+        with patch('blog.pagination.get_post_count_cache', return_value=reader):
+            response = self.client.get(self.url, {'page': 3})
+        self.assertEqual(response.context['paginator'].count, 23)
+        self.assertEqual(len(response.context['post_list']), 3)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'after': 'invalid'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'after': encode_cursor([1])}).status_code, 404)
+
+
+class StoreLastURLMiddlewareTest(TestCase):
+    """
+    验证：
+    - 默认（LAST_URL_STORAGE = None）匿名访问不创建会话，响应不设置 Cookie，也不按 Cookie 区分缓存
+    - LAST_URL_STORAGE = 'session' 时返回地址保存在会话中
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        Post.objects.create(title='Post', slug='post', body='Body', author=self.user)
+
+    def test_no_storage(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blog:detail', kwargs={'slug': 'post'}))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(has_vary_header(response, 'Cookie'))
+        self.assertFalse(any('django_session' in query['sql'] for query in queries))
+        self.assertNotContains(response, 'last_url')
+
+    @override_settings(LAST_URL_STORAGE='session')
+    def test_session_storage(self):
+        self.client.get(reverse('blog:archives'))
+        self.assertEqual(self.client.session['last_url'], 'http://testserver/archives/')
+
+
+class ConditionalGetTest(TestCase):
+    """
+    验证：
+    - 文章页与列表页带有 ETag 与 Last-Modified，验证器匹配时返回 304，只执行一次聚合查询，不渲染模板
+    - 文章正文、标题、标签或文章列表变化后验证器随之变化，标签、分类改名后相关页面的验证器随之变化
+    - 只更新浏览量时验证器不变
+    - 返回 304 时仍计入浏览量，不存在的标签照常返回 404
+    """
+
+    def setUp(self):
+        get_view_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.tag = Tag.objects.create(name='Django', slug='django')
+        self.category = Category.objects.create(name='Python')
+        self.post = Post.objects.create(title='Post', slug='post', body='Body', author=self.user)
+        self.post.tags.add(self.tag)
+        self.post.categories.add(self.category)
+
+    def revalidate(self, url, etag):
+        """
+        带 If-None-Match 请求，清除整页缓存以由视图验证
+        :return: (状态码, 博客数据表的查询次数)
+        """
+        get_page_cache().clear()
+        tables = [
+            connection.ops.quote_name(model._meta.db_table)
+            for model in apps.get_app_config('blog').get_models(include_auto_created=True)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response.status_code, sum(any(table in query['sql'] for table in tables) for query in queries)
+
+    def assertChanged(self, urls, etags, change):
+        """
+        执行 change 后各页面的验证器均变化，返回新的 ETag
+        """
+        change()
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.revalidate(url, etag)[0], 200, url)
+        return [self.client.get(url)['ETag'] for url in urls]
+
+    def test_detail(self):
+        url = self.post.get_absolute_url()
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertIn('Last-Modified', response)
+
+        with patch('django.template.loader.get_template') as get_template:
+            self.assertEqual(self.revalidate(url, etag), (304, 1))
+        get_template.assert_not_called()
+        self.assertEqual(pending_views(self.post.pk), 2)
+
+        # 只更新浏览量时不变
+        self.post.views = 10
+        self.post.save(update_fields=['views'])
+        self.assertEqual(self.revalidate(url, etag)[0], 304)
+
+        # 正文重新渲染后渲染摘要变化
+        def rerender():
+            self.post.body = 'New body'
+            self.post.set_rendered('<p>New body</p>', '')
+            self.post.save()
+        [etag] = self.assertChanged([url], [etag], rerender)
+
+        # 只修改标题、添加标签或标签改名时正文不重新渲染，由更新时间标识
+        def retitle():
+            self.post.title = 'New title'
+            self.post.save(update_fields=['title'])
+        [etag] = self.assertChanged([url], [etag], retitle)
+        [etag] = self.assertChanged([url], [etag], lambda: self.post.tags.add(Tag.objects.create(name='New')))
+
+        def rename_tag():
+            self.tag.name = 'Renamed'
+            self.tag.save()
+        self.assertChanged([url], [etag], rename_tag)
+
+    def test_lists(self):
+        urls = [
+            reverse('blog:index'), reverse('blog:archives'), reverse('blog:tags'), reverse('blog:categories'),
+            reverse('blog:tag_detail', kwargs={'slug': 'django'}), self.category.get_absolute_url(),
+        ]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.revalidate(url, etag), (304, 1), url)
+
+        def create():
+            post = Post.objects.create(title='New', slug='new', body='Body', author=self.user)
+            post.tags.add(self.tag)
+            post.categories.add(self.category)
+        etags = self.assertChanged(urls, etags, create)
+
+        # 文章数与排序时间不变，只修改标题时列表中的文章随之变化
+        def retitle():
+            self.post.title = 'New title'
+            self.post.save(update_fields=['title'])
+        post_urls = [urls[0], urls[1], urls[3], urls[4], urls[5]]
+        post_etags = [etags[0], etags[1], etags[3], etags[4], etags[5]]
+        self.assertChanged(post_urls, post_etags, retitle)
+
+        # 标签、分类改名
+        def rename():
+            self.tag.name = 'Renamed'
+            self.tag.save()
+            self.category.name = 'Renamed'
+            self.category.save()
+        self.assertChanged([urls[2], urls[3]], [etags[2], etags[3]], rename)
+
+    def test_last_modified(self):
+        url = reverse('blog:index')
+        last_modified = self.client.get(url)['Last-Modified']
+        get_page_cache().clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_missing(self):
+        url = reverse('blog:tag_detail', kwargs={'slug': 'missing'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    def test_cached_page(self):
+        url = reverse('blog:index')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['X-Page-Cache']), (304, 'HIT'))
+        self.assertEqual(len(queries), 1)
+
+
+class PageCacheTest(TestCase):
+    """
+    验证：
+    - 匿名访问的页面被缓存，命中时只执行一次缓存查询，且仍计入浏览量
+    - 只修改正文时只清除包含该文章的页面（包括只保存内容表时），修改标题时清除所有依赖于文章列表的页面
+    - 只有分页参数参与缓存键，带有其他查询参数的请求不使用缓存
+    - 标签与评论的变化清除依赖于它们的页面
+    - 登录用户不使用缓存
+    """
+
+    def setUp(self):
+        get_view_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword', is_staff=True)
+        self.tag = Tag.objects.create(name='Django', slug='django')
+        self.post_a = Post.objects.create(title='Post A', slug='post-a', body='Body A', excerpt='A', author=self.user)
+        self.post_b = Post.objects.create(title='Post B', slug='post-b', body='Body B', excerpt='B', author=self.user)
+        self.post_a.tags.add(self.tag)
+        self.urls = {
+            'index': reverse('blog:index'),
+            'a': self.post_a.get_absolute_url(),
+            'b': self.post_b.get_absolute_url(),
+            'tag': reverse('blog:tag_detail', kwargs={'slug': 'django'}),
+            'archives': reverse('blog:archives'),
+        }
+
+    def get(self, name):
+        # 每次都作为没有会话的新访客
+        self.client.cookies.clear()
+        return self.client.get(self.urls[name])
+
+    def warm(self):
+        for name in self.urls:
+            self.assertEqual(self.get(name)['X-Page-Cache'], 'MISS')
+
+    def cached(self):
+        return {name for name in self.urls if self.get(name).get('X-Page-Cache') == 'HIT'}
+
+    def test_hit(self):
+        self.get('a')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('a')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'Body A')
+        # 命中时仍计入浏览量
+        self.assertEqual(pending_views(self.post_a.pk), 2)
+
+    def test_body_change(self):
+        self.warm()
+        post = Post.objects.get(pk=self.post_a.pk)
+        # 只写入内容表，不发送文章的 post_save 信号
+        with self.captureOnCommitCallbacks(execute=True):
+            post.body = 'New body'
+            post.save(update_fields=['body'])
+        self.assertEqual(self.cached(), {'b', 'archives'})
+
+        # cached() 已重新缓存全部页面
+        with self.captureOnCommitCallbacks(execute=True):
+            # 完整保存但列表字段未变化
+            post.save()
+        self.assertEqual(self.cached(), {'b', 'archives'})
+
+    def test_title_change(self):
+        self.warm()
+        post = Post.objects.get(pk=self.post_b.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.title = 'New title'
+            post.save()
+        self.assertEqual(self.cached(), set())
+
+    def test_tag_and_comment(self):
+        self.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(name='name', email='a@example.com', text='text', post=self.post_b)
+        self.assertEqual(self.cached(), set(self.urls) - {'b'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_b.tags.add(self.tag)
+        self.assertEqual(self.get('tag')['X-Page-Cache'], 'MISS')
+        self.assertContains(self.get('tag'), 'Post B')
+
+    def test_query_params(self):
+        """只有分页参数参与缓存键，带有其他参数的请求不使用缓存"""
+        index = self.urls['index']
+        self.assertEqual(self.client.get(index, {'page': 1})['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(index, {'page': 1})['X-Page-Cache'], 'HIT')
+
+        for query in ({'page': 1, 'utm_source': 'x'}, {'q': 'django'}, {'page': [1, 2]}):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(index, query)
+            self.assertNotIn('X-Page-Cache', response)
+            self.assertFalse(any('page_cache' in query['sql'] for query in queries))
+
+    def test_authenticated(self):
+        before = get_page_cache_stats()
+        self.client.force_login(self.user)
+        self.client.get(self.urls['index'])
+        response = self.client.get(self.urls['index'])
+        self.assertNotIn('X-Page-Cache', response)
+
+        stats = self.client.get(reverse('blog:page_cache_stats')).json()
+        self.assertEqual((stats['hits'], stats['misses']), (before['hits'], before['misses']))
+
 
 class PostDetailViewTest(TestCase):
     """
@@ -103,6 +501,9 @@ class PostDetailViewTest(TestCase):
     """
 
     def setUp(self):
+        # 清空浏览量缓冲，避免其他测试遗留的计数
+        get_view_cache().clear()
+
         # 创建一个用户
         self.user = get_user_model().objects.create_user(
             username='testuser',
@@ -235,6 +636,49 @@ class CategoryListViewTest(TestCase):
         self.assertTrue(hasattr(categories[1], 'posts_list'))
         self.assertEqual(len(categories[1].posts_list), 2)  # Technology 分类下有 2 篇文章
 
+    def test_category_tree_counts(self):
+        """分类树在一次聚合查询中得到文章数与子分类数，只列出顶级分类"""
+        Category.objects.create(name='Python', parent=self.category1)
+        tree = build_category_tree()
+
+        self.assertEqual([category.name for category in tree], ['Lifestyle', 'Technology'])
+        technology = tree[1]
+        self.assertEqual((technology.post_count, technology.child_count), (2, 1))
+        self.assertEqual([category.name for category in technology.subcategories], ['Python'])
+        self.assertEqual(technology.posts_list, [self.post2, self.post1])
+
+    def test_category_tree_query_count(self):
+        """分类数量增加时查询次数不变，缓存命中时只读取一次共享缓存，不查询分类与文章"""
+        clear_category_tree()
+        with self.assertNumQueries(2):
+            build_category_tree()
+
+        for i in range(5):
+            category = Category.objects.create(name=f'Extra {i}')
+            Post.objects.create(title=f'Extra Post {i}', body='Content', author=self.user).categories.add(category)
+        with self.assertNumQueries(2):
+            tree = build_category_tree()
+        self.assertEqual(len(tree), 7)
+
+        get_category_tree()
+        with CaptureQueriesContext(connection) as queries:
+            get_category_tree()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(connection.ops.quote_name(Category._meta.db_table), queries[0]['sql'])
+
+    def test_category_tree_invalidation(self):
+        """文章分类变化时清除缓存，只更新浏览量时保留"""
+        self.assertEqual(get_category_tree()[0].post_count, 1)
+
+        self.post1.views = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post1.save(update_fields=['views'])
+        self.assertIsNotNone(get_category_tree_cache().get(CATEGORY_TREE_CACHE_KEY))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post1.categories.add(self.category2)
+        self.assertEqual(get_category_tree()[0].post_count, 2)
+
     def test_get_breadcrumbs(self):
         response = self.client.get(self.url)
         self.assertIn('breadcrumbs', response.context)
@@ -317,6 +761,25 @@ class CategoryDetailViewTest(TestCase):
 
         self.assertEqual(response.status_code, 404)
 
+    def test_descendant_posts(self):
+        """子孙分类的文章一并列出，按完整路径查找分类"""
+        child = Category.objects.create(name='Python', parent=self.category1)
+        grandchild = Category.objects.create(name='Django', parent=child)
+        post4 = Post.objects.create(title='Test Post 4', body='Content 4', author=self.user)
+        post4.categories.add(child, grandchild)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['related_posts']), 3)
+        self.assertIn(post4, response.context['related_posts'])
+
+        response = self.client.get(child.get_absolute_url())
+        self.assertEqual(response.context['selected_category'], child)
+        self.assertEqual(list(response.context['related_posts']), [post4])
+
+        # 只有完整路径能找到子分类
+        response = self.client.get(reverse('blog:category_detail', kwargs={'slug': 'python'}))
+        self.assertEqual(response.status_code, 404)
+
 
 class TagListViewTest(TestCase):
     def setUp(self):
@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class BaseTranslator:
+    """
+    翻译后端基类，由 settings.TRANSLATION_BACKEND 指定使用的后端
+    子类实现 translate_many，一次翻译多段文本
+    """
+    # 翻译结果是否写入数据库中的翻译缓存
+    persistent = True
+
+    def translate_many(self, texts, from_lang='zh', to_lang='en'):
+        """
+        :param texts: 原文列表
+        :param from_lang: 原文语言
+        :param to_lang: 目标语言
+        :return: 与 texts 一一对应的译文列表，翻译失败的位置为 None
+        """
+        raise NotImplementedError
+
+
+class StubTranslator(BaseTranslator):
+    """
+    本地桩后端：原样返回原文，不访问网络，用于测试与离线环境
+    结果不写入数据库，切换到真实后端后不会误用
+    """
+    persistent = False
+
+    def translate_many(self, texts, from_lang='zh', to_lang='en'):
+        return list(texts)
+
+
+# 百度翻译 API 凭证
+APP_ID = '20250611002379582'
+SECRET_KEY = 'QeVzbItxwBorSBcsLC5G'
+
+
+class BaiduTranslator(BaseTranslator):
+    """
+    百度翻译后端：多段原文以换行符拼接后在一次请求中翻译
+    """
+    url = 'https://fanyi-api.baidu.com/api/trans/vip/translate'
+
+    # 单次请求的最大原文长度（字符数），接口限制为 6000 字节
+    max_chars = 2000
+
+    # 两次请求之间的最小间隔（秒），接口访问频率受限
+    interval = 1
+
+    # 各进程内所有实例共用的上次请求时间
+    _lock = threading.Lock()
+    _last_request = 0.0
+
+    def translate_many(self, texts, from_lang='zh', to_lang='en'):
+        # 原文中的换行会打乱按行对应的结果，替换为空格
+        texts = [' '.join(text.splitlines()) for text in texts]
+        results = []
+        for batch in self.batches(texts):
+            results.extend(self.request(batch, from_lang, to_lang))
+        return results
+
+    def batches(self, texts):
+        """
+        按 max_chars 将原文分组，每组对应一次请求
+        """
+        batch = []
+        size = 0
+        for text in texts:
+            if batch and size + len(text) + 1 > self.max_chars:
+                yield batch
+                batch = []
+                size = 0
+            batch.append(text)
+            size += len(text) + 1
+        if batch:
+            yield batch
+
+    def wait(self):
+        """
+        距上次请求不足 interval 时等待，首次请求无需等待
+        """
+        with self._lock:
+            delay = BaiduTranslator._last_request + self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            BaiduTranslator._last_request = time.monotonic()
+
+    def request(self, texts, from_lang, to_lang):
+        """
+        发送一次翻译请求
+        :return: 译文列表，失败时全部为 None
+        """
+        query = '\n'.join(texts)
+        salt = str(random.randint(32768, 65536))
+        sign = hashlib.md5((APP_ID + query + salt + SECRET_KEY).encode('utf-8')).hexdigest()
+        params = {
+            'q': query,
+            'from': from_lang,
+            'to': to_lang,
+            'appid': APP_ID,
+            'salt': salt,
+            'sign': sign
+        }
+
+        result = None
+        try:
+            self.wait()
+            resp = requests.get(self.url, params=params, timeout=3)
+            result = resp.json()
+            # 接口按行返回译文，顺序与原文一致
+            translated = [item['dst'] for item in result['trans_result']]
+            if len(translated) != len(texts):
+                raise ValueError(f'译文行数 {len(translated)} 与原文行数 {len(texts)} 不一致')
+        except Exception as e:
+            logger.warning(f"翻译失败：{e}，失败结果：{result}")
+            return [None] * len(texts)
+
+        return translated
@@ -2,7 +2,8 @@ from django.urls import path, include
 from blog import views
 from blog.feeds import LatestPostsFeed
 from django.contrib.sitemaps.views import sitemap
-from blog.sitemaps import PostSitemap, HomeSitemap, TagSitemap
+from blog.sitemaps import PostSitemap, HomeSitemap, TagSitemap, sitemap_validators
+from blog.conditional import conditional
 
 app_name = 'blog'  # 定义 URL 命名空间
 
@@ -28,6 +29,9 @@ urlpatterns = [
     path('rss/', LatestPostsFeed(), name='rss_feed'),
     path('search/', views.search, name='search'),
 
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    # 条件 GET：文章未变化时返回 304，不生成站点地图
+    path('sitemap.xml', conditional(sitemap_validators)(sitemap), {'sitemaps': sitemaps},
+         name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', views.robots_txt, name='robots_txt'),
+    path('page-cache-stats/', views.page_cache_stats, name='page_cache_stats'),
 ]
@@ -1,15 +1,19 @@
 import re
-from collections import defaultdict
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from django.utils.text import slugify
 from markdown_it import MarkdownIt
 from mdit_py_plugins.anchors import anchors_plugin
+from mdit_py_plugins.anchors.index import unique_slug
 from django.utils.html import strip_tags
 from haystack.utils import Highlighter
-import random
+from django.conf import settings
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.db import DatabaseError
+from django.utils.module_loading import import_string
+from collections import OrderedDict
+import bisect
+import math
 import hashlib
-import time
-import requests
 import os
 import logging
 
@@ -18,18 +22,159 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger('ObsidianLinkConverter')
 
 
-def generate_summary(html, max_length=200):
+class SummaryTextExtractor(HTMLParser):
+    """
+    增量提取 HTML 可见文本，收集到足够字符后立即停止解析
+    <script>、<style>、<pre> 中的内容不计入摘要
+    """
+    skip_tags = {'script', 'style', 'pre'}
+
+    class Done(Exception):
+        """已收集到足够的字符"""
+
+    def __init__(self, limit):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts = []
+        self.length = 0
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skip_tags:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.skip_tags and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        self.parts.append(data)
+        self.length += len(data)
+        if self.length >= self.limit:
+            raise self.Done
+
+    @property
+    def text(self):
+        return ''.join(self.parts)
+
+
+def truncate_summary(text, max_length):
+    """
+    截断摘要文本，超出长度时追加省略号
+    """
+    return text[:max_length] + '...' if len(text) > max_length else text
+
+
+def generate_summary(html, max_length=200, chunk_size=4096):
     """
     生成 HTML 摘要
+    按块增量解析 HTML，收集到 max_length 个可见字符后立即停止，耗时与正文总长度无关
     :param html: HTML 文本
     :param max_length: 最大长度
+    :param chunk_size: 每次送入解析器的字符数
+    """
+    # 多收集一个字符，用于判断是否需要追加省略号
+    extractor = SummaryTextExtractor(max_length + 1)
+    try:
+        for start in range(0, len(html), chunk_size):
+            extractor.feed(html[start:start + chunk_size])
+        extractor.close()
+    except SummaryTextExtractor.Done:
+        pass
+
+    return truncate_summary(extractor.text, max_length)
+
+
+# 生成摘要使用的轻量解析器（不挂载锚点等插件）
+summary_parser = MarkdownIt('gfm-like')
+
+
+def collect_markdown_text(tokens, limit):
+    """
+    从 markdown-it token 流中收集可见文本，达到 limit 个字符后停止
+    代码块、原始 HTML 块不计入摘要
+    :param tokens: token 列表
+    :param limit: 需要收集的字符数
+    :return: 收集到的文本
+    """
+    parts = []
+    length = 0
+
+    for token in tokens:
+        if token.type == 'inline':
+            for child in token.children or []:
+                if child.type in ('text', 'code_inline'):
+                    content = child.content
+                elif child.type in ('softbreak', 'hardbreak'):
+                    content = '\n'
+                else:
+                    continue
+                parts.append(content)
+                length += len(content)
+                if length >= limit:
+                    return ''.join(parts)
+        elif token.nesting == -1 and token.block:
+            # 块级元素结束时换行，与 HTML 渲染后提取文本的效果一致
+            parts.append('\n')
+            length += 1
+
+    return ''.join(parts)
+
+
+def generate_summary_from_markdown(markdown_text, max_length=200, window=1024):
+    """
+    直接从 Markdown 文本生成摘要，无需先渲染 HTML
+    只解析正文开头的一段（在空行处截断以保持块结构完整），文本不足时窗口成倍扩大
+    :param markdown_text: Markdown 文本
+    :param max_length: 最大长度
+    :param window: 初始解析窗口大小（字符数）
     """
-    # 使用 BeautifulSoup 解析 HTML
-    soup = BeautifulSoup(html, 'html.parser')
-    text = soup.get_text()
-    summary_text = text[:max_length] + '...' if len(text) > max_length else text
+    limit = max_length + 1
+    text = ''
+
+    while True:
+        chunk = markdown_text[:window]
+        if window < len(markdown_text):
+            # 在最后一个空行处截断，避免切断段落、列表等块结构
+            cut = chunk.rfind('\n\n')
+            if cut > 0:
+                chunk = chunk[:cut]
+
+        text = collect_markdown_text(summary_parser.parse(chunk), limit)
+        if len(text) >= limit or window >= len(markdown_text):
+            break
+        window *= 4
+
+    return truncate_summary(text, max_length)
+
+
+# 字数统计规则：连续的英文字母、数字、下划线计为一个单词，每个中文汉字计为一个字
+word_pattern = re.compile(r'[a-zA-Z0-9_]+|[\u4e00-\u9fff]')
+
+# 阅读速度（每分钟单词/字数），用于估算文章阅读时间
+READING_WPM = 260
+
+
+def count_words(html):
+    """
+    统计 HTML 内容的字数
+    :param html: HTML 内容
+    :return: 单词与汉字总数
+    """
+    if not html:
+        return 0
+    return sum(1 for _ in word_pattern.finditer(strip_tags(html)))
+
 
-    return summary_text
+def estimate_read_time(words, wpm=READING_WPM):
+    """
+    估算阅读时间（分钟），向上取整，无内容时为 0
+    :param words: 字数
+    :param wpm: 每分钟阅读的单词/字数
+    """
+    return math.ceil(words / wpm) if words > 0 else 0
 
 
 def replace_markdown_symbols(markdown_text):
@@ -69,96 +214,117 @@ def custom_slugify(text):
     return re.sub(r'[^\w\u4e00-\u9fff]+', '-', text.lower()).strip('-')
 
 
-def dict_to_html(toc, active_title=None, collapsed=False):
+# 参与生成目录的标题层级
+TOC_LEVELS = ('h2', 'h3', 'h4', 'h5')
+
+
+def toc_to_html(toc, active_title=None, collapsed=False):
     """
-    将目录结构字典转换为 HTML
-    :param toc: 嵌套目录结构
+    将目录结构列表转换为 HTML
+    :param toc: 嵌套目录结构，元素为 {'title', 'slug', 'level', 'children'}
     :param active_title: 当前高亮标题（只高亮这个）
     :param collapsed: 是否折叠子目录
     :return: HTML 字符串
     """
+    if not toc:
+        return ''
+
+    # 设置 ul_class，根据折叠状态添加相应样式
+    ul_class = "toc-list is-collapsible is-collapsed" if collapsed else "toc_list"
+
+    # 使用列表收集片段，最后一次性拼接，避免递归中反复拼接字符串
+    parts = []
 
     def render_toc_items(items):
         """内部函数，递归处理目录项"""
-
-        # 设置 ul_class，根据折叠状态添加相应样式
-        ul_class = "toc-list is-collapsible is-collapsed" if collapsed else "toc_list"
-        html = f'<ul class="{ul_class}">'
+        parts.append(f'<ul class="{ul_class}">')
 
         # 遍历当前层级的所有标题项
-        for title, data in items.items():
-            # 生成标题的 URL slug（用于锚点链接）
-            slug = custom_slugify(title)
-            # 获取标题的层级
-            level = int(data['level'])
-            # 检查当前标题是否为活动标题
-            is_active = (title == active_title)
+        for item in items:
+            title = item['title']
+            level = item['level']
 
             # 设置 li 和 a 标签的类名
             li_class = "toc-list-item"
             link_class = f"toc-link node-name--H{level}"
 
             # 如果是活动标题，添加高亮样式
-            if is_active:
+            if title == active_title:
                 li_class += " is-active-li"
                 link_class += " is-active-link"
 
             # 构建列表项：包含链接到标题的锚点
-            html += f'<li class="{li_class}"><a href="#{slug}" class="{link_class}">{title}</a>'
+            parts.append(f'<li class="{li_class}"><a href="#{item["slug"]}" class="{link_class}">{title}</a>')
 
-            if data['children']:  # 递归处理子目录
-                html += render_toc_items(data['children'])
-            html += '</li>'
+            if item['children']:  # 递归处理子目录
+                render_toc_items(item['children'])
+            parts.append('</li>')
 
-        html += '</ul>'
-        return html
+        parts.append('</ul>')
 
-    return render_toc_items(toc) if toc else ''
+    render_toc_items(toc)
+    return ''.join(parts)
 
 
-def generate_toc(markdown_parser, markdown_text, active_title=None):
+def nest_headings(headings):
     """
-    从 Markdown 文本生成嵌套的 HTML TOC（目录）
-    :param markdown_parser: MarkdownIt 实例
-    :param markdown_text: 原始 Markdown 字符串
-    :param active_title: 当前文章标题（用于高亮）
-    :return: HTML 字符串
+    将按出现顺序排列的标题转换为嵌套目录结构
+    :param headings: 标题列表，元素为 {'title', 'slug', 'level'}
+    :return: 嵌套目录结构，元素为 {'title', 'slug', 'level', 'children'}
     """
-
-    # 使用 Markdown 解析器将文本解析为 token 流
-    tokens = markdown_parser.parse(markdown_text)
-    # print("tokens:", tokens)
-
-    # 使用 defaultdict 创建嵌套字典结构
-    toc = defaultdict(dict)
+    toc = []
 
     # 初始化栈：用于跟踪当前标题层级和位置
-    # 栈元素为元组 (children_dict, level)
+    # 栈元素为元组 (children_list, level)
     stack = []
 
-    # 遍历解析得到的所有 token
-    for i, token in enumerate(tokens):
-        if token.type == 'heading_open' and token.tag in ['h2', 'h3', 'h4', 'h5']:
-            level = int(token.tag[1])
+    for heading in headings:
+        level = heading['level']
 
-            # 获取标题文本内容（下一个 token 是标题文本）
-            title = tokens[i + 1].content.strip()
+        # 弹出栈中所有高于或等于当前层级的元素
+        while stack and stack[-1][1] >= level:
+            stack.pop()
+
+        # 确定当前标题的父容器（栈顶或根目录）
+        current = stack[-1][0] if stack else toc
 
-            # 弹出栈中所有高于或等于当前层级的元素
-            while stack and stack[-1][1] >= level:
-                stack.pop()
+        # 添加新标题项（包含子容器和层级）
+        item = {'title': heading['title'], 'slug': heading['slug'], 'level': level, 'children': []}
+        current.append(item)
 
-            # 确定当前标题的父容器（栈顶或根目录）
-            current = stack[-1][0] if stack else toc
+        # 将新标题的子容器压入栈
+        stack.append((item['children'], level))
 
-            # 添加新标题项（包含子容器和层级）
-            current[title] = {'children': {}, 'level': level}
+    return toc
+
+
+def collect_headings(tokens):
+    """
+    从 Markdown token 流中收集参与生成目录的标题
+    :param tokens: MarkdownIt.parse 得到的 token 列表
+    :return: 标题列表，元素为 {'title', 'slug', 'level'}
+    """
+    headings = []
+    for i, token in enumerate(tokens):
+        if token.type == 'heading_open' and token.tag in TOC_LEVELS:
+            # 获取标题文本内容（下一个 token 是标题文本）
+            title = tokens[i + 1].content.strip()
+            # 优先使用正文中的锚点 id，保证目录链接与正文标题一致
+            slug = token.attrGet('id') or custom_slugify(title)
+            headings.append({'title': title, 'slug': slug, 'level': int(token.tag[1])})
+    return headings
 
-            # 将新标题的子容器压入栈
-            stack.append((current[title]['children'], level))
 
-    # 转换嵌套字典为HTML
-    return dict_to_html(dict(toc), active_title)
+def generate_toc(tokens, active_title=None):
+    """
+    从 Markdown token 流生成嵌套的 HTML TOC（目录）
+    与正文渲染共用同一份 token 流，锚点直接取标题 token 上由 anchors 插件生成的 id，
+    因此重复标题会得到与正文一致的去重锚点（如 title、title-1）
+    :param tokens: MarkdownIt.parse 得到的 token 列表
+    :param active_title: 当前文章标题（用于高亮）
+    :return: HTML 字符串
+    """
+    return toc_to_html(nest_headings(collect_headings(tokens)), active_title)
 
 
 # 配置路径
@@ -174,74 +340,217 @@ supported_extensions = {
     'archive': ['zip', 'rar', '7z', 'tar', 'gz']
 }
 
-# # 正则表达式匹配所有 Obsidian 链接
-# # 格式：[[文件名]] 或 ![[文件名]]
-# link_regex = re.compile(
-#     r'(!?)\[\[([^\]\|\n#]*?)(?:#([^\]\|\n]*?))?(?:\|([^\]\|\n]*?))?(?:\|(\d+)(?:x(\d+))?)?\]\]',
-#     re.MULTILINE
-# )
-#
-# # 代码块匹配正则（同时匹配多行代码块和单行内联代码）
-# code_pattern = re.compile(
-#     r'(?s)(```.*?```|~~~.*?~~~|`[^`]+?`)',
-#     re.DOTALL
-# )
-
-# 匹配 Obsidian 特有的 Wiki 链接格式
-# 格式：[[文件]] 或 ![[文件]]
-link_regex = re.compile(
-    r'(!?)\[\[([^\]\|\n#]*?)(?:#([^\]\|\n]*?))?(?:\|([^\]\|\n]*?))?(?:\|(\d+)(?:x(\d+))?)?\]\]',
-    re.MULTILINE
-)
-
-# 匹配标准的 Markdown 超链接语法（包括图片链接）
-# 如 [描述](链接) 或 ![描述](链接)
-link_pattern = r'''
-    (!)?                    # 图片标识（可选）
-    \[                      # 开始括号 [
-    (                       # 捕获组：链接文本/图片描述
-        (?:                 # 非捕获组（处理尺寸或别名部分）
-            [^\]\|\n]*      # 除 ]、|、换行外的任意字符
-            (?:\|           # 分隔符 |（可选）
-                [^\]\n]*    # 除 ]、换行外的任意字符
-            )?              # 分隔符部分结束
-        )                   # 非捕获组结束
-    )                       # 捕获组结束
-    \]                      # 结束括号 ]
-    \(                      # 开始括号 (
-    (                       # 捕获组：URL/路径
-        (?:                 # 允许括号出现在URL中
-            [^()\n]         # 非括号字符
-            |               # 或
-            \([^()\n]*\)    # 成对的括号内容
-        )*                  # 重复多次
-        [^)\n]*             # 最后可以有一些非括号字符
-    )                       # URL捕获组结束
-    \)                      # 结束括号 )
-'''
-
-compiled_pattern = re.compile(link_pattern, re.VERBOSE)
-
-# 代码块匹配正则（同时匹配多行代码块和单行内联代码）
-code_pattern = re.compile(
-    r'(```[\s\S]*?```|~~~[\s\S]*?~~~|`[^`]*?`)'
-)
-
-
-def save_code_blocks(content):
-    """
-    保存代码块，并替换为占位符
-    """
-    code_blocks = code_pattern.findall(content)
-    content = code_pattern.sub('__CODE_BLOCK__', content)
-    return content, code_blocks
-
-
-def restore_code_blocks(content, code_blocks):
-    """恢复代码块"""
-    for code_block in code_blocks:
-        content = content.replace('__CODE_BLOCK__', code_block, 1)
-    return content
+
+class NextCharFinder:
+    """
+    查找给定字符集合中任一字符自某位置起首次出现的位置
+    缓存上一次的查找区间，查找位置单调推进时总开销与文本长度成线性关系
+    """
+
+    def __init__(self, content, chars):
+        self.content = content
+        self.pattern = re.compile(f'[{re.escape(chars)}]')
+        self.start = self.end = -1
+
+    def __call__(self, pos):
+        """
+        :param pos: 起始位置
+        :return: 首次出现的位置，不存在时返回文本长度
+        """
+        # [start, end) 区间内不含目标字符，区间内任一位置的查找结果都是 end
+        if not self.start <= pos <= self.end:
+            found = self.pattern.search(self.content, pos)
+            self.start = pos
+            self.end = found.start() if found else len(self.content)
+        return self.end
+
+
+class LinkMatch:
+    """
+    链接匹配结果，提供与正则匹配对象相同的 group()、start()、end() 接口
+    """
+
+    def __init__(self, content, start, end, groups):
+        self.content = content
+        self._start = start
+        self._end = end
+        self.groups = groups
+
+    def group(self, index=0):
+        if index == 0:
+            return self.content[self._start:self._end]
+        return self.groups[index - 1]
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+
+def is_size(text):
+    """
+    判断是否为尺寸参数：300 或 300x200
+    """
+    width, _, height = text.partition('x')
+    return width.isdecimal() and (not _ or height.isdecimal())
+
+
+class LinkParser:
+    """
+    线性时间的链接解析器，不使用回溯正则，避免病态输入（如未闭合的括号）导致耗时失控
+
+    wiki 链接：(!)[[文件#锚点|别名|宽x高]]
+    - 内容为 [[ 之后直到第一个 ] 的文本，不能跨行，且必须以 ]] 结束
+    - 以 | 分隔：第一段为文件与锚点（以第一个 # 分隔）；仅有两段时第二段总是别名；
+      三段时第三段必须为尺寸参数；超过三段不构成链接
+
+    标准链接：(!)[文本](地址)
+    - 文本为 [ 之后直到第一个 ] 的内容，不能跨行，其后必须紧跟 (
+    - 地址中允许成对的单层括号；遇到未配对的 ( 时地址延续到下一个 )；
+      若行内再无 )，则在最后一组成对括号的 ) 处结束
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self.find_bracket_end = NextCharFinder(content, ']\n')
+        self.find_paren = NextCharFinder(content, '()\n')
+        self.find_url_end = NextCharFinder(content, ')\n')
+        # 最近一次 wiki 链接内容的范围及其中 | 的位置，供同一结束位置的多次尝试复用
+        self.wiki_start = self.wiki_stop = -1
+        self.wiki_pipes = []
+        self.wiki_size = (-1, None)
+
+    def match_wiki(self, pos):
+        """
+        匹配从 pos 开始的 wiki 链接
+        :return: LinkMatch，group(1)~group(6) 依次为 !、文件、锚点、别名、宽、高；未匹配时返回 None
+        """
+        content = self.content
+        is_image = content.startswith('!', pos)
+        start = pos + 3 if is_image else pos + 2
+        if not content.startswith('[[', start - 2):
+            return None
+
+        stop = self.find_bracket_end(start)
+        if not content.startswith(']]', stop):
+            return None
+
+        if stop != self.wiki_stop or start < self.wiki_start:
+            self.wiki_start, self.wiki_stop = start, stop
+            self.wiki_pipes = []
+            i = content.find('|', start, stop)
+            while i != -1:
+                self.wiki_pipes.append(i)
+                i = content.find('|', i + 1, stop)
+        first = bisect.bisect_left(self.wiki_pipes, start)
+        pipes = self.wiki_pipes[first:first + 3]
+        if len(pipes) > 2:
+            return None
+
+        alias = width = height = None
+        if len(pipes) == 2:
+            # 尺寸参数只取决于最后一个 | 的位置，结果随 | 的位置一同缓存
+            if self.wiki_size[0] != pipes[1]:
+                size = content[pipes[1] + 1:stop]
+                self.wiki_size = (pipes[1], size if is_size(size) else None)
+            size = self.wiki_size[1]
+            if size is None:
+                return None
+            width, _, height = size.partition('x')
+            height = height or None
+            alias = content[pipes[0] + 1:pipes[1]]
+        elif pipes:
+            alias = content[pipes[0] + 1:stop]
+
+        resource, sep, anchor = content[start:pipes[0] if pipes else stop].partition('#')
+        groups = ('!' if is_image else '', resource, anchor if sep else None, alias, width, height)
+        return LinkMatch(content, pos, stop + 2, groups)
+
+    def match_link(self, pos):
+        """
+        匹配从 pos 开始的标准 Markdown 链接
+        :return: LinkMatch，group(1)~group(3) 依次为 !、文本、地址；未匹配时返回 None
+        """
+        content = self.content
+        is_image = content.startswith('!', pos)
+        start = pos + 2 if is_image else pos + 1
+        if not content.startswith('[', start - 1):
+            return None
+
+        stop = self.find_bracket_end(start)
+        if not content.startswith('](', stop):
+            return None
+
+        url_start = i = stop + 2
+        last_group_end = -1
+        # 跳过普通字符与成对的单层括号
+        while True:
+            i = self.find_paren(i)
+            if i < len(content) and content[i] == '(':
+                close = self.find_paren(i + 1)
+                if close < len(content) and content[close] == ')':
+                    last_group_end = close
+                    i = close + 1
+                    continue
+            break
+
+        # 其后直到下一个 ) 都属于地址
+        url_end = self.find_url_end(i)
+        if not content.startswith(')', url_end):
+            if last_group_end == -1:
+                return None
+            url_end = last_group_end
+
+        groups = ('!' if is_image else None, content[start:stop], content[url_start:url_end])
+        return LinkMatch(content, pos, url_end + 1, groups)
+
+    def iter_matches(self, opener, match_func):
+        """
+        从左到右依次查找互不重叠的链接
+        """
+        content = self.content
+        pos = 0
+        while True:
+            i = content.find(opener, pos)
+            if i == -1:
+                return
+            # 图片标记 ! 属于链接的一部分
+            start = i - 1 if i > pos and content[i - 1] == '!' else i
+            match = match_func(start)
+            if match:
+                yield match
+                pos = match.end()
+            else:
+                pos = i + 1
+
+
+# 单次扫描时关注的起始字符：代码（` 与 ~）和链接（[ 与 !）
+link_scan_pattern = re.compile(r'[`~!\[]')
+
+
+def match_code(content, pos, missing):
+    """
+    匹配从 pos 开始的代码块或行内代码，规则与 ```...```、~~~...~~~、`...` 一致
+    :param content: 文本内容
+    :param pos: 起始位置
+    :param missing: 已确认在后文中不存在的结束标记，避免未闭合的代码标记引起重复查找
+    :return: 代码结束位置，未匹配时返回 -1
+    """
+    for fence in ('```', '~~~'):
+        if fence not in missing and content.startswith(fence, pos):
+            end = content.find(fence, pos + 3)
+            if end != -1:
+                return end + 3
+            missing.add(fence)
+
+    if content[pos] == '`' and '`' not in missing:
+        end = content.find('`', pos + 1)
+        if end != -1:
+            return end + 1
+        missing.add('`')
+
+    return -1
 
 
 def get_file_type(filename):
@@ -267,51 +576,56 @@ def decode_url_space_only(url):
     return url.replace("%20", " ")
 
 
-def extract_resource_links(content):
+def parse_resource_link(match):
     """
-    提取笔记中资源的链接
+    解析标准 Markdown 链接的匹配结果
+    :param match: LinkParser.match_link 的匹配结果
+    :return: 链接信息字典
     """
-    matches = []
-    for match in compiled_pattern.finditer(content):
-        is_image = match.group(1) is not None
-        link_text = match.group(2)
-        url = match.group(3).strip()  # 去除首尾空格
-        url = decode_url_space_only(url)
-        size_info = None
-        alt_text = link_text
-
-        if is_image:
-            if re.match(r'^\d+$', link_text):
-                width = link_text.split('x')
-                size_info = f"width={width}"
-
-            elif re.match(r'^\d+x\d+$', link_text):
-                width, height = link_text.split('x')
+    is_image = match.group(1) is not None
+    link_text = match.group(2)
+    url = match.group(3).strip()  # 去除首尾空格
+    url = decode_url_space_only(url)
+    size_info = None
+    alt_text = link_text
+
+    if is_image:
+        if re.match(r'^\d+$', link_text):
+            width = link_text.split('x')
+            size_info = f"width={width}"
+
+        elif re.match(r'^\d+x\d+$', link_text):
+            width, height = link_text.split('x')
+            size_info = f"width={width}, height={height}"
+
+        elif '|' in link_text:
+            parts = link_text.split('|', 1)
+            alt_text = parts[0]
+            size_part = parts[1]
+
+            if re.match(r'^\d+x\d+$', size_part):
+                width, height = size_part.split('x')
                 size_info = f"width={width}, height={height}"
+            elif re.match(r'^\d+$', size_part):
+                size_info = f"width={size_part}"
+
+    return {
+        'type': 'image' if is_image else 'link',
+        'full_match': match.group(0),
+        'text': alt_text,
+        'url': url,
+        'size': size_info,
+        'start': match.start(),
+        'end': match.end()
+    }
 
-            elif '|' in link_text:
-                parts = link_text.split('|', 1)
-                alt_text = parts[0]
-                size_part = parts[1]
-
-                if re.match(r'^\d+x\d+$', size_part):
-                    width, height = size_part.split('x')
-                    size_info = f"width={width}, height={height}"
-                elif re.match(r'^\d+$', size_part):
-                    size_info = f"width={size_part}"
-
-        match_info = {
-            'type': 'image' if is_image else 'link',
-            'full_match': match.group(0),
-            'text': alt_text,
-            'url': url,
-            'size': size_info,
-            'start': match.start(),
-            'end': match.end()
-        }
-        matches.append(match_info)
 
-    return matches
+def extract_resource_links(content):
+    """
+    提取笔记中资源的链接
+    """
+    parser = LinkParser(content)
+    return [parse_resource_link(match) for match in parser.iter_matches('[', parser.match_link)]
 
 
 def is_web_link(link):
@@ -347,236 +661,775 @@ def is_web_link(link):
     return False
 
 
-def convert_obsidian_wiki_links(content, title=None):
+def normalize_link_target(name):
     """
-    将 Obsidian 的 wiki 链接转换为标准 Markdown 链接格式
+    统一链接目标的写法：去除首尾空白、合并连续空白并忽略大小写
     """
+    return ' '.join(name.split()).casefold()
 
-    def replacement(match):
-        """内部函数，处理匹配到的链接"""
-        # 获取匹配组
-        full_match = match.group(0)
-        type = match.group(1)
-        resource_path = match.group(2) or ''
-        anchor = match.group(3) or ''
-        alias_or_param = match.group(4) or ''
-        width = match.group(5) or ''
-        height = match.group(6) or ''
-        # print("resource_path：", resource_path)
-        # print("alias_or_param：", alias_or_param)
-        if not resource_path:
-            resource_path = title
 
-        resource_name = os.path.basename(resource_path)
-        file_type = get_file_type(resource_name)
-
-        if file_type == 'image':
-            # 图片链接到外部资源
-            extended_link = f'{external_link_prefix}{resource_name}'
-            alt_text = alias_or_param or resource_name
-            if width and height:
-                return f'<img src="{extended_link}" width="{width}" height="{height}" alt="{alt_text}" />'
-            elif width:
-                return f'<img src="{extended_link}" width="{width}" alt="{alt_text}" />'
-            elif height:
-                return f'<img src="{extended_link}" height="{height}" alt="{alt_text}" />'
+def load_link_slugs():
+    """
+    从数据库加载内部链接目标到文章 slug 的映射，键为文章标题与 slug
+    标题优先于 slug，重名标题取最早创建的文章
+    :return: {规范化的链接目标: slug}
+    """
+    from django.apps import apps
+
+    post_model = apps.get_model('blog', 'Post')
+    # 数据库不可用时（如尚未迁移）不影响渲染，链接均按未知目标处理
+    try:
+        rows = list(post_model.objects.exclude(slug=None).exclude(slug='').order_by('pk').values_list('title', 'slug'))
+    except DatabaseError as e:
+        logger.warning(f"加载内部链接索引失败：{e}")
+        return {}
+    slugs = {normalize_link_target(slug): slug for _, slug in rows}
+    titles = {}
+    for title, slug in rows:
+        titles.setdefault(normalize_link_target(title), slug)
+    slugs.update(titles)
+    return slugs
+
+
+def wiki_link_target(match, title=None):
+    """
+    获取 wiki 链接指向的内部文章名称
+    :param match: LinkParser.match_wiki 的匹配结果
+    :param title: 文章标题，链接未指定文件时使用
+    :return: 不含扩展名的文件名，图片链接返回 None
+    """
+    resource_name = os.path.basename(match.group(2) or title or '')
+    if not resource_name or get_file_type(resource_name) == 'image':
+        return None
+    return os.path.splitext(resource_name)[0]
+
+
+def resource_link_target(match, title=None):
+    """
+    获取标准 Markdown 链接指向的内部文章名称
+    :param match: parse_resource_link 返回的链接信息
+    :param title: 文章标题，处理页内锚点链接时使用
+    :return: 不含扩展名的文件名，图片与网页链接返回 None
+    """
+    url = match['url']
+    if match['type'] != 'link' or is_web_link(url):
+        return None
+    resource_path = title if url.startswith('#') else url.split('#', 1)[0]
+    resource_name = os.path.basename(resource_path or '')
+    return os.path.splitext(resource_name)[0] if resource_name else None
+
+
+class LinkSlugIndex:
+    """
+    内部链接目标（文章标题、文件名或 slug）到已有文章 slug 的索引
+    首次解析时一次性加载，同一次渲染中的所有链接共用，每个链接的查找为常数时间；
+    索引中不存在的目标：可直接转换为 slug 的 ASCII 名称不再翻译，其余名称合并为一次批量翻译，结果同样记入索引
+    """
+
+    def __init__(self, slugs=None, translate=True):
+        """
+        :param slugs: 预先加载的映射（见 load_link_slugs），未提供时首次解析时从数据库加载
+        :param translate: 是否翻译未知目标；为 False 时不访问数据库与翻译接口，未知目标按原文转换为 slug，
+                          与翻译失败时相同，适用于已预先解析全部目标的索引（如批量渲染的子进程）
+        """
+        self.slugs = dict(slugs) if slugs is not None else None
+        self.translate = translate
+
+    def prefetch(self, names):
+        """
+        批量解析链接目标，结果记入索引
+        :param names: 链接目标（不含扩展名），None 会被忽略
+        """
+        targets = {}
+        for name in names:
+            if name is not None:
+                targets.setdefault(normalize_link_target(name), name)
+        if not targets:
+            return
+
+        if self.slugs is None:
+            self.slugs = load_link_slugs()
+
+        pending = []
+        for key, name in targets.items():
+            if key in self.slugs:
+                continue
+            slug = slugify(name)
+            if slug and name.isascii():
+                self.slugs[key] = slug
             else:
-                return f'<img src="{extended_link}" alt="{alt_text}" />'
+                pending.append((key, name))
+
+        if pending:
+            names = [name for _, name in pending]
+            translations = translate_many(names) if self.translate else names
+            for (key, _), text in zip(pending, translations):
+                self.slugs[key] = slugify(text)
+
+    def resolve_many(self, names):
+        """
+        批量解析链接目标
+        :param names: 链接目标（不含扩展名），None 会被忽略
+        :return: {规范化的链接目标: slug}，可作为其他索引的完整映射
+        """
+        names = [name for name in names if name is not None]
+        self.prefetch(names)
+        return {key: self.slugs[key] for key in map(normalize_link_target, names)}
+
+    def resolve(self, name):
+        """
+        :param name: 链接目标，不含扩展名
+        :return: 对应的 slug
+        """
+        self.prefetch([name])
+        return self.slugs[normalize_link_target(name)]
+
+
+def convert_wiki_link(match, title=None, link_index=None):
+    """
+    将单个 Obsidian wiki 链接转换为 HTML 链接或图片标签
+    :param match: LinkParser.match_wiki 的匹配结果
+    :param title: 文章标题，链接未指定文件时使用
+    :param link_index: 内部链接索引（LinkSlugIndex），未提供时新建
+    :return: 替换后的文本
+    """
+    resource_path = match.group(2) or ''
+    anchor = match.group(3) or ''
+    alias_or_param = match.group(4) or ''
+    width = match.group(5) or ''
+    height = match.group(6) or ''
+    if not resource_path:
+        resource_path = title
+
+    resource_name = os.path.basename(resource_path)
+    file_type = get_file_type(resource_name)
+
+    if file_type == 'image':
+        # 图片链接到外部资源
+        extended_link = f'{external_link_prefix}{resource_name}'
+        alt_text = alias_or_param or resource_name
+        if width and height:
+            return f'<img src="{extended_link}" width="{width}" height="{height}" alt="{alt_text}" />'
+        elif width:
+            return f'<img src="{extended_link}" width="{width}" alt="{alt_text}" />'
+        elif height:
+            return f'<img src="{extended_link}" height="{height}" alt="{alt_text}" />'
+        else:
+            return f'<img src="{extended_link}" alt="{alt_text}" />'
+    else:
+        # 其他链接到网站内部资源
+        resource_name = os.path.splitext(resource_name)[0]
+        resource_slug = (link_index or LinkSlugIndex()).resolve(resource_name)
+        extended_link = f'{internal_link_prefix}{resource_slug}'
+        display_text = alias_or_param or anchor or resource_name
+        return f'<a href="{extended_link}">{display_text}</a>'
+
+
+def convert_obsidian_wiki_links(content, title=None, link_index=None):
+    """
+    将 Obsidian 的 wiki 链接转换为标准 Markdown 链接格式
+    """
+    link_index = link_index or LinkSlugIndex()
+    parser = LinkParser(content)
+    matches = list(parser.iter_matches('[[', parser.match_wiki))
+    link_index.prefetch(wiki_link_target(match, title) for match in matches)
+    parts = []
+    last_end = 0
+    for match in matches:
+        parts.append(content[last_end:match.start()])
+        parts.append(convert_wiki_link(match, title, link_index))
+        last_end = match.end()
+    parts.append(content[last_end:])
+    return ''.join(parts)
+
+
+def convert_resource_link(match, title=None, link_index=None):
+    """
+    将单个标准 Markdown 链接转换为 Web 可访问的外部链接格式，网页链接保持不变
+    :param match: parse_resource_link 返回的链接信息
+    :param title: 文章标题，处理页内锚点链接时使用
+    :param link_index: 内部链接索引（LinkSlugIndex），未提供时新建
+    :return: 替换后的文本
+    """
+    type = match['type']  # 链接类型（link 或 image）
+    text = match['text']  # 链接文本
+    url = match['url']  # 链接地址
+    size = match['size']  # 尺寸信息
+
+    # 默认保留原始链接
+    replacement_str = match['full_match']
+
+    # 处理本地资源链接
+    if not is_web_link(url):
+        anchor = None
+
+        # 本地可能存在非图片格式：![alt text](file://path/to/file#anchor)
+        # 处理内部锚点链接
+        if url.startswith('#'):
+            anchor = url[1:]
+            resource_path = title
+            resource_name = os.path.basename(resource_path)
         else:
-            # 其他链接到网站内部资源
-            resource_name = os.path.splitext(resource_name)[0]
-            resource_slug = slugify_translate(resource_name)
-            extended_link = f'{internal_link_prefix}{resource_slug}'
-            display_text = alias_or_param or anchor or resource_name
-            return f'<a href="{extended_link}">{display_text}</a>'
+            # 处理带锚点的文件链接
+            if '#' in url:
+                url_parts = url.split('#', 1)
+                resource_path = url_parts[0]
+                anchor = url_parts[1]
+            # 处理普通文件链接
+            else:
+                resource_path = url
+
+            resource_name = os.path.basename(resource_path)
+
+        if resource_name:
+            resource_name = decode_url_space_only(resource_name)
+            resource_name = encode_url_space_only(resource_name)
+            if type == 'image':
+                # 生成外部链接格式，链接到外部图床资源
+                extended_link = f'{external_link_prefix}{resource_name}'
+                # 添加锚点（如果存在）
+                if anchor:
+                    encoded_anchor = encode_url_space_only(anchor)
+                    extended_link += f'#{encoded_anchor}'
+
+                alt_text = text or resource_name
+                if size:
+                    replacement_str = f'<img src="{extended_link}" {size} alt="{alt_text}" />'
+                else:
+                    replacement_str = f'![{alt_text}]({extended_link})'
+            elif type == 'link':
+                # 生成外部链接格式，链接到网站内部资源
+                display_text = text or anchor or resource_name
+                resource_name = os.path.splitext(resource_name)[0]
+                resource_slug = (link_index or LinkSlugIndex()).resolve(decode_url_space_only(resource_name))
+                extended_link = f'{internal_link_prefix}{resource_slug}'
+                replacement_str = f'<a href="{extended_link}">{display_text}</a>'
 
-    updated_content = link_regex.sub(replacement, content)
+        else:
+            logger.warning(f"⚠️ 警告: 资源未找到： {resource_path}")
 
-    return updated_content
+    return replacement_str
 
 
-def convert_standard_markdown_links(content, title=None):
+def convert_standard_markdown_links(content, title=None, link_index=None):
     """
     将标准 Markdown 链接转换为 Web 可访问的外部链接格式
     """
-    # 提取所有资源链接和图片匹配项
+    link_index = link_index or LinkSlugIndex()
     matches = extract_resource_links(content)
-
-    # 按起始位置正向排序
-    matches.sort(key=lambda m: m['start'])
+    link_index.prefetch(resource_link_target(match, title) for match in matches)
 
     # 使用列表拼接构建新内容
     parts = []
     last_end = 0  # 记录上次处理结束位置
 
     for match in matches:
-        full_match = match['full_match']  # 完整匹配
-        type = match['type']  # 链接类型（link 或 image）
-        text = match['text']  # 链接文本
-        url = match['url']  # 链接地址
-        size = match['size']  # 尺寸信息
-        start = match['start']  # 起始位置
-        end = match['end']  # 结束位置
-
-        # 添加匹配前的文本
-        parts.append(content[last_end:start])
+        # 添加匹配前的文本及替换后的内容
+        parts.append(content[last_end:match['start']])
+        parts.append(convert_resource_link(match, title, link_index))
+        last_end = match['end']  # 更新上次处理结束位置
 
-        # 默认保留原始链接
-        replacement_str = full_match
+    # 添加最后一段文本
+    parts.append(content[last_end:])
 
-        # 处理本地资源链接
-        if not is_web_link(url):
-            anchor = None
+    return ''.join(parts)
 
-            # 本地可能存在非图片格式：![alt text](file://path/to/file#anchor)
-            # 处理内部锚点链接
-            if url.startswith('#'):
-                anchor = url[1:]
-                resource_path = title
-                resource_name = os.path.basename(resource_path)
-            else:
-                # 处理带锚点的文件链接
-                if '#' in url:
-                    url_parts = url.split('#', 1)
-                    resource_path = url_parts[0]
-                    anchor = url_parts[1]
-                # 处理普通文件链接
-                else:
-                    resource_path = url
-
-                resource_name = os.path.basename(resource_path)
-
-            if resource_name:
-                resource_name = decode_url_space_only(resource_name)
-                resource_name = encode_url_space_only(resource_name)
-                if type == 'image':
-                    # 生成外部链接格式，链接到外部图床资源
-                    extended_link = f'{external_link_prefix}{resource_name}'
-                    # 添加锚点（如果存在）
-                    if anchor:
-                        encoded_anchor = encode_url_space_only(anchor)
-                        extended_link += f'#{encoded_anchor}'
-
-                    alt_text = text or resource_name
-                    if size:
-                        replacement_str = f'<img src="{extended_link}" {size} alt="{alt_text}" />'
-                    else:
-                        replacement_str = f'![{alt_text}]({extended_link})'
-                elif type == 'link':
-                    # 生成外部链接格式，链接到网站内部资源
-                    display_text = text or anchor or resource_name
-                    resource_name = os.path.splitext(resource_name)[0]
-                    resource_slug = slugify_translate(resource_name)
-                    extended_link = f'{internal_link_prefix}{resource_slug}'
-                    replacement_str = f'<a href="{extended_link}">{display_text}</a>'
 
-            else:
-                logger.warning(f"⚠️ 警告: 资源未找到： {resource_path}")
+# 匹配 HTML 片段中的 <img> 标签
+img_tag_pattern = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
 
-        # 添加替换后的内容
-        parts.append(replacement_str)
-        last_end = end  # 更新上次处理结束位置
+# 匹配 <img> 标签中的 src 属性，属性值可为双引号、单引号或无引号形式
+img_src_pattern = re.compile(r'''(\ssrc\s*=\s*)(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''', re.IGNORECASE)
 
-    # 添加最后一段文本
-    parts.append(content[last_end:])
 
-    # 拼接所有部分
-    updated_content = ''.join(parts)
+def resolve_img_src(src):
+    """
+    将图片的相对路径转换为外部图床 URL，http(s) 链接保持不变
+    :param src: 图片 src 属性值
+    :return: 转换后的 src
+    """
+    if src.startswith('http://') or src.startswith('https://'):
+        return src
 
-    return updated_content
+    img_name = os.path.basename(src)
+    img_name = decode_url_space_only(img_name)
+    img_name = encode_url_space_only(img_name)
+    # 图片链接到外部图床资源
+    return f'{external_link_prefix}{img_name}'
 
 
 def resolve_img_src_to_url(content):
     """
-    将图片链接中的 src 属性转换为 URL
+    将 HTML 片段中 <img> 标签的 src 属性转换为 URL
+    只改写 src 属性值，标签其余部分原样保留，不做整段 HTML 解析
     :param content: 包含 HTML 内容的字符串
     :return: 修改后的 HTML 内容
     """
-    # 解析 HTML
-    soup = BeautifulSoup(content, 'html.parser')
+    # 快速路径：不含 img 标签的片段直接返回
+    if '<img' not in content and '<IMG' not in content:
+        return content
 
-    # 遍历所有 img 标签
-    for img in soup.find_all('img'):
-        src = img.get('src')
-        alt = img.get('alt', '')  # 默认为空字符串
+    def replace_src(match):
+        """内部函数，改写 src 属性值"""
+        prefix = match.group(1)
+        src = next(value for value in match.group(2, 3, 4) if value is not None)
+        return f'{prefix}"{resolve_img_src(src)}"'
 
-        if src is None:
-            continue
+    def replace_tag(match):
+        """内部函数，处理单个 img 标签"""
+        return img_src_pattern.sub(replace_src, match.group(0), count=1)
 
-        # 判断是否为相对路径
-        if not (src.startswith('http://') or src.startswith('https://')):
-            img_name = os.path.basename(src)
-            img_name = decode_url_space_only(img_name)
-            if alt is None:
-                img['alt'] = img_name
-            img_name = encode_url_space_only(img_name)
-            # 图片链接到外部图床资源
-            new_src = f'{external_link_prefix}{img_name}'
-            img['src'] = new_src
+    return img_tag_pattern.sub(replace_tag, content)
 
-    modified_content = str(soup)
 
-    return modified_content
+def img_src_rule(state):
+    """
+    markdown-it core 规则：改写图片地址
+    - html_block / html_inline：改写原始 HTML 中 <img> 的 src
+    - image：改写 Markdown 图片语法中的本地路径
+    代码块与行内代码不会产生上述 token，因此天然不受影响
+    """
+    for token in state.tokens:
+        if token.type == 'html_block':
+            token.content = resolve_img_src_to_url(token.content)
+        elif token.type == 'inline' and token.children:
+            for child in token.children:
+                if child.type == 'html_inline':
+                    child.content = resolve_img_src_to_url(child.content)
+                elif child.type == 'image':
+                    src = child.attrGet('src')
+                    if src and not is_web_link(src):
+                        child.attrSet('src', resolve_img_src(src))
+
+
+def img_src_plugin(md):
+    """
+    注册图片地址改写规则的 markdown-it 插件
+    """
+    md.core.ruler.push('img_src', img_src_rule)
 
 
-def update_obsidian_links(content, title=None):
+def update_obsidian_links(content, title=None, link_index=None):
     """
     更新 Obsidian 链接形式
+    对正文做单次线性扫描：代码块与行内代码原样保留，收集 wiki 链接与标准 Markdown 链接，
+    再一次性解析其中的内部链接目标（未知目标合并为一次翻译请求），最后就地改写，结果写入列表缓冲区
+    原始 HTML 中 <img> 的相对路径由渲染器的 img_src 规则在 token 层面改写
+    :param content: 原始 Markdown 文本
+    :param title: 文章标题，用于处理页内链接
+    :param link_index: 内部链接索引（LinkSlugIndex），未提供时新建
+    :return: 更新后的文本
+    """
+    link_index = link_index or LinkSlugIndex()
+    links = scan_links(content)
+
+    # 一次性解析全部内部链接目标
+    link_index.prefetch(link_targets(links, title))
+
+    parts = []
+    last_end = 0  # 已输出内容的结束位置
+    for start, end, match, is_wiki in links:
+        parts.append(content[last_end:start])
+        if is_wiki:
+            parts.append(convert_wiki_link(match, title, link_index))
+        else:
+            parts.append(convert_resource_link(match, title, link_index))
+        last_end = end
+    parts.append(content[last_end:])
+
+    return ''.join(parts)
+
+
+def scan_links(content):
+    """
+    单次线性扫描正文中的 wiki 链接与标准 Markdown 链接，代码块与行内代码中的链接不计入
+    :param content: 原始 Markdown 文本
+    :return: [(起始位置, 结束位置, 匹配结果, 是否为 wiki 链接)]
+    """
+    links = []
+    pos = 0
+    missing = set()  # 后文中不存在的代码结束标记
+    parser = LinkParser(content)
+
+    while True:
+        found = link_scan_pattern.search(content, pos)
+        if found is None:
+            break
+        pos = found.start()
+        char = content[pos]
+        end = -1
+
+        if char in '`~':
+            # 代码块与行内代码整体跳过，其中的链接原样保留
+            end = match_code(content, pos, missing)
+        else:
+            # wiki 链接优先于标准链接
+            match = None
+            if content.startswith('[[', pos + (char == '!')):
+                match = parser.match_wiki(pos)
+                if match:
+                    links.append((pos, match.end(), match, True))
+            if match is None:
+                match = parser.match_link(pos)
+                if match:
+                    links.append((pos, match.end(), parse_resource_link(match), False))
+            if match:
+                end = match.end()
+
+        pos = pos + 1 if end == -1 else end
+
+    return links
+
+
+def link_targets(links, title=None):
+    """
+    :param links: scan_links 的结果
+    :param title: 文章标题，用于处理页内链接
+    :return: 各链接指向的内部文章名称，外部链接与图片为 None
+    """
+    return [
+        wiki_link_target(match, title) if is_wiki else resource_link_target(match, title)
+        for _, _, match, is_wiki in links
+    ]
+
+
+# 渲染器版本号：修改渲染流程或解析器配置后需递增，使所有已缓存的渲染结果一次性失效
+RENDERER_VERSION = 5
+
+# 参与缓存键计算的渲染配置，配置变化时缓存键随之变化
+RENDERER_CONFIG = {
+    'preset': 'gfm-like',
+    'anchor_levels': (2, 5),
+    'toc_levels': TOC_LEVELS,
+    'internal_link_prefix': internal_link_prefix,
+    'external_link_prefix': external_link_prefix,
+}
+
+# 模块级 Markdown 渲染器，进程内复用，避免每次渲染重复构建解析规则
+# 'gfm-like' 模式支持表格、任务列表等扩展语法；锚点层级与目录层级保持一致
+markdown_renderer = MarkdownIt(RENDERER_CONFIG['preset']).use(
+    anchors_plugin,
+    min_level=RENDERER_CONFIG['anchor_levels'][0],
+    max_level=RENDERER_CONFIG['anchor_levels'][1],
+    slug_func=custom_slugify,  # 自定义 slugify 函数
+    permalink=True,
+    permalinkSymbol='',
+    permalinkBefore=False,
+    permalinkSpace=True
+).use(img_src_plugin)
+
+# 渲染结果缓存的别名，未配置时退回默认缓存
+RENDER_CACHE_ALIAS = 'render'
+
+
+def get_render_cache():
+    """
+    获取渲染结果缓存
     """
-    # 提取代码内容并用占位符替换
-    updated_content, code_blocks = save_code_blocks(content)
+    alias = RENDER_CACHE_ALIAS if RENDER_CACHE_ALIAS in settings.CACHES else DEFAULT_CACHE_ALIAS
+    return caches[alias]
 
-    # 转换为标准 Markdown 链接格式
-    updated_content = convert_obsidian_wiki_links(updated_content, title)
 
-    # 转换为 Web 可访问的外部链接格式
-    updated_content = convert_standard_markdown_links(updated_content, title)
+# 内部链接索引的版本号：文章新增、删除或修改标题、slug 时递增
+# 渲染结果中的内部链接取决于当时的索引，版本号计入渲染摘要，索引变化后已缓存的渲染结果与 render_hash 随之失效
+LINK_INDEX_GENERATION_KEY = 'link_index_generation'
 
-    # 更新图片链接相对路径为 URL
-    updated_content = resolve_img_src_to_url(updated_content)
 
-    # 恢复代码内容
-    updated_content = restore_code_blocks(updated_content, code_blocks)
+def get_link_index_generation():
+    """
+    获取内部链接索引的版本号，保存在渲染缓存中，多个进程共享
+    """
+    try:
+        return get_render_cache().get(LINK_INDEX_GENERATION_KEY, 0)
+    except Exception as e:
+        logger.warning(f"读取链接索引版本失败：{e}")
+        return 0
 
-    return updated_content
+
+def bump_link_index_generation():
+    """
+    递增内部链接索引的版本号
+    """
+    render_cache = get_render_cache()
+    try:
+        render_cache.incr(LINK_INDEX_GENERATION_KEY)
+    except ValueError:
+        render_cache.set(LINK_INDEX_GENERATION_KEY, 1, timeout=None)
 
 
-def render_markdown(body, title=None):
+def render_digest(body, title=None, link_generation=None):
+    """
+    计算渲染内容摘要，由正文、标题、内部链接索引版本、渲染器版本及配置共同决定
+    :param body: 原始 Markdown 格式的文本内容
+    :param title: 文章标题
+    :param link_generation: 内部链接索引版本号，未提供时从缓存读取；批量计算时可预先读取一次
+    :return: 十六进制摘要字符串
+    """
+    if link_generation is None:
+        link_generation = get_link_index_generation()
+    hasher = hashlib.sha256()
+    hasher.update(f'{RENDERER_VERSION}|{sorted(RENDERER_CONFIG.items())!r}|{link_generation}'.encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update((title or '').encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update((body or '').encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def render_markdown(body, title=None, use_cache=True, link_index=None):
     """
-    将 Markdown 文本转换为 HTML 并生成目录(TOC)
+    将 Markdown 文本转换为 HTML 并生成目录(TOC)，结果按内容摘要缓存
+    内容未变化时直接返回缓存结果，缓存后端由 CACHES['render'] 配置（跨进程、跨重启共享）
     :param body: 原始 Markdown 格式的文本内容
     :param title: 文章标题，用于处理链接
+    :param use_cache: 是否读写渲染缓存
+    :param link_index: 内部链接索引（LinkSlugIndex），批量渲染时可共用同一个索引
     :return tuple: (rendered_body, toc)
             rendered_body (str): 渲染后的 HTML 内容
             toc (str): 生成的 HTML 目录
     """
-    body = update_obsidian_links(body, title=title)
+    if not use_cache:
+        return render_markdown_uncached(body, title=title, link_index=link_index)
+
+    cache_key = f'render:{render_digest(body, title)}'
+    render_cache = get_render_cache()
+
+    # 缓存不可用时不影响渲染，仅记录警告
+    try:
+        cached = render_cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"读取渲染缓存失败：{e}")
+        cached = None
+
+    if cached is not None:
+        return tuple(cached)
+
+    rendered_body, toc = render_markdown_uncached(body, title=title, link_index=link_index)
+
+    try:
+        render_cache.set(cache_key, (rendered_body, toc), timeout=None)
+    except Exception as e:
+        logger.warning(f"写入渲染缓存失败：{e}")
+
+    return rendered_body, toc
+
+
+def render_markdown_uncached(body, title=None, link_index=None):
+    """
+    执行完整的渲染流程，不经过缓存
+    :param body: 原始 Markdown 格式的文本内容
+    :param title: 文章标题，用于处理链接
+    :param link_index: 内部链接索引（LinkSlugIndex），未提供时新建
+    :return tuple: (rendered_body, toc)
+    """
+    body = update_obsidian_links(body, title=title, link_index=link_index)
 
     # 替换 Markdown 标题中的特殊符号
     processed_body = replace_markdown_symbols(body)
 
-    # 初始化 Markdown 解析器（使用类似 GitHub 的解析规则）
-    # 'gfm-like' 模式支持表格、任务列表等扩展语法
-    md = MarkdownIt('gfm-like').use(
-        anchors_plugin,
-        min_level=2,
-        max_level=4,
-        slug_func=custom_slugify,  # 自定义 slugify 函数
-        permalink=True,
-        permalinkSymbol='',
-        permalinkBefore=False,
-        permalinkSpace=True
-    )
+    # 解析一次，正文 HTML 与目录共用同一份 token 流
+    env = {}
+    tokens = markdown_renderer.parse(processed_body, env)
 
     # 渲染 Markdown 为 HTML
-    rendered_body = md.render(processed_body)
+    rendered_body = markdown_renderer.renderer.render(tokens, markdown_renderer.options, env)
 
     # 生成目录(TOC)
-    toc = generate_toc(md, processed_body)
+    toc = generate_toc(tokens)
 
     return rendered_body, toc
 
 
+# 增量渲染的块缓存有效期（秒），预览过程中产生的中间版本会自然过期
+RENDER_BLOCK_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 围栏代码块的开始与结束行
+fence_open_pattern = re.compile(r' {0,3}(`{3,}|~{3,})')
+fence_close_pattern = re.compile(r' {0,3}(`{3,}|~{3,})[ \t]*$')
+
+# 列表项开始行
+list_item_pattern = re.compile(r' {0,3}(?:[-+*]|\d{1,9}[.)])(?:[ \t]|$)')
+
+# 内部允许空行的 HTML 块及其结束标记
+html_block_pattern = re.compile(r' {0,3}<(script|pre|style|textarea|!--)', re.IGNORECASE)
+HTML_BLOCK_ENDS = {
+    'script': '</script>',
+    'pre': '</pre>',
+    'style': '</style>',
+    'textarea': '</textarea>',
+    '!--': '-->',
+}
+
+# 引用式链接定义，如 [id]: https://example.com
+reference_definition_pattern = re.compile(r'^ {0,3}\[[^\]\n]+\]:', re.MULTILINE)
+
+# 正文标题及其永久链接上的锚点
+heading_anchor_pattern = re.compile(r'(<h[2-5] id="|<a class="header-anchor" href="#)([^"]*)"')
+
+
+def split_markdown_blocks(text):
+    """
+    将 Markdown 文本按空行切分为可独立渲染的顶层块，各块拼接后与原文一致
+    - 围栏代码块与 <script>、<pre>、<style>、<textarea>、HTML 注释内部的空行不切分
+    - 缩进行（列表项内容、缩进代码等）不切分
+    - 列表中以空行分隔的列表项不切分，保持松散列表的渲染结果
+    :param text: Markdown 文本
+    :return: 块列表
+    """
+    blocks = []
+    current = []
+    first_line = None  # 当前块的第一个非空行
+    fence = None  # 未闭合的围栏代码块 (字符, 长度)
+    html_end = None  # 未闭合 HTML 块的结束标记
+    after_blank = False
+
+    for line in text.splitlines(keepends=True):
+        if fence:
+            current.append(line)
+            match = fence_close_pattern.match(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= fence[1]:
+                fence = None
+            continue
+
+        if html_end:
+            current.append(line)
+            if html_end in line.lower():
+                html_end = None
+            continue
+
+        blank = not line.strip()
+        if after_blank and not blank and line[0] not in ' \t' and not (
+                first_line and list_item_pattern.match(line) and list_item_pattern.match(first_line)):
+            blocks.append(''.join(current))
+            current = []
+            first_line = None
+
+        current.append(line)
+        if first_line is None and not blank:
+            first_line = line
+        after_blank = blank
+
+        match = fence_open_pattern.match(line)
+        # 反引号围栏的信息字符串中不能再出现反引号，否则是行内代码
+        if match and not (match.group(1)[0] == '`' and '`' in line[match.end():]):
+            fence = (match.group(1)[0], len(match.group(1)))
+            continue
+
+        match = html_block_pattern.match(line)
+        if match:
+            end = HTML_BLOCK_ENDS[match.group(1).lower()]
+            if end not in line[match.end():].lower():
+                html_end = end
+
+    if current:
+        blocks.append(''.join(current))
+    return blocks
+
+
+def render_block(block, title=None, link_index=None):
+    """
+    渲染单个顶层块
+    :param block: 块的 Markdown 文本
+    :param title: 文章标题，用于处理链接
+    :param link_index: 内部链接索引（LinkSlugIndex），未提供时新建
+    :return tuple: (html, headings)
+            headings 元素为 {'title', 'slug', 'level', 'anchor'}，
+            slug 为块内去重后的锚点，anchor 为去重前的锚点，用于拼接时按全文重新去重
+    """
+    block = update_obsidian_links(block, title=title, link_index=link_index)
+    env = {}
+    tokens = markdown_renderer.parse(replace_markdown_symbols(block), env)
+    html = markdown_renderer.renderer.render(tokens, markdown_renderer.options, env)
+
+    headings = collect_headings(tokens)
+    heading_tokens = [
+        tokens[i + 1] for i, token in enumerate(tokens)
+        if token.type == 'heading_open' and token.tag in TOC_LEVELS
+    ]
+    for heading, inline in zip(headings, heading_tokens):
+        # 与 anchors 插件相同，锚点由标题中的文本与行内代码生成
+        text = ''.join(child.content for child in inline.children or [] if child.type in ('text', 'code_inline'))
+        heading['anchor'] = custom_slugify(text)
+
+    return html, headings
+
+
+def rename_anchors(html, renames):
+    """
+    替换正文中标题及其永久链接的锚点
+    :param html: 块的 HTML
+    :param renames: 原锚点 -> 新锚点
+    """
+    return heading_anchor_pattern.sub(
+        lambda match: f'{match.group(1)}{renames.get(match.group(2), match.group(2))}"', html
+    )
+
+
+def render_markdown_incremental(body, title=None):
+    """
+    块级增量渲染，用于编辑时的实时预览
+    按顶层块切分正文，以块内容摘要为键缓存各块的 HTML 与标题信息，只渲染变化的块；
+    重复标题的锚点在拼接时按全文顺序重新去重，目录由缓存的标题信息生成
+    正文包含引用式链接定义时块之间相互依赖，退回整体渲染
+    :param body: 原始 Markdown 格式的文本内容
+    :param title: 文章标题，用于处理链接
+    :return tuple: (rendered_body, toc)
+    """
+    if reference_definition_pattern.search(body):
+        return render_markdown(body, title=title)
+
+    blocks = split_markdown_blocks(body)
+    # 渲染器版本、配置、内部链接索引版本与标题对所有块相同，只计算一次，各块复制哈希状态后再追加块内容
+    # 块中的内部链接取决于当时的索引，与 render_digest 相同，索引变化后缓存的块随之失效
+    base = hashlib.sha256()
+    base.update(
+        f'{RENDERER_VERSION}|{sorted(RENDERER_CONFIG.items())!r}|{get_link_index_generation()}\0{title or ""}\0'
+        .encode('utf-8')
+    )
+    keys = []
+    for block in blocks:
+        hasher = base.copy()
+        hasher.update(block.encode('utf-8'))
+        keys.append(f'render-block:{hasher.hexdigest()}')
+
+    render_cache = get_render_cache()
+    try:
+        cached = render_cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"读取块渲染缓存失败：{e}")
+        cached = {}
+
+    missing = {}
+    parts = []
+    headings = []
+    slugs = set()
+    # 所有待渲染的块共用同一个链接索引
+    link_index = LinkSlugIndex()
+    for key, block in zip(keys, blocks):
+        if key not in cached:
+            cached[key] = missing[key] = render_block(block, title, link_index)
+        html, block_headings = cached[key]
+
+        # 按全文顺序重新去重，与整体渲染时 anchors 插件的结果一致
+        renames = {}
+        for heading in block_headings:
+            slug = unique_slug(heading['anchor'], slugs)
+            if slug != heading['slug']:
+                renames[heading['slug']] = slug
+            headings.append({'title': heading['title'], 'slug': slug, 'level': heading['level']})
+        if renames:
+            html = rename_anchors(html, renames)
+        parts.append(html)
+
+    if missing:
+        try:
+            render_cache.set_many(missing, timeout=RENDER_BLOCK_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"写入块渲染缓存失败：{e}")
+
+    return ''.join(parts), toc_to_html(nest_headings(headings))
+
+
 class CustomHighlighter(Highlighter):
     """
     自定义关键词高亮器类，扩展 Haystack 的 Highlighter。
@@ -639,49 +1492,150 @@ def normalize_highlight(highlighted):
     return ''  # 如果既不是列表也不是字符串，返回空字符
 
 
-# 百度翻译 API 凭证
-APP_ID = '20250611002379582'
-SECRET_KEY = 'QeVzbItxwBorSBcsLC5G'
+# 进程内翻译缓存的条目数
+TRANSLATION_CACHE_SIZE = 4096
 
 
-def translate_baidu(text, from_lang='zh', to_lang='en'):
+class LRUCache:
     """
-    翻译文本
-    :param text: 要翻译的文本
+    简单的进程内 LRU 缓存，超出容量时淘汰最久未使用的条目
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self.data:
+            return default
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+
+
+# 进程内翻译缓存，键为 (原文, 原文语言, 目标语言)
+translation_cache = LRUCache(TRANSLATION_CACHE_SIZE)
+
+
+def get_translator():
+    """
+    获取 settings.TRANSLATION_BACKEND 指定的翻译后端
+    """
+    return import_string(getattr(settings, 'TRANSLATION_BACKEND', 'blog.translators.BaiduTranslator'))()
+
+
+def translation_hash(text):
+    """
+    计算原文摘要，作为翻译缓存表的查询键
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_translations(texts, from_lang, to_lang):
+    """
+    从翻译缓存表中批量读取译文
+    :return: {原文: 译文}
+    """
+    from django.apps import apps
+
+    translation_model = apps.get_model('blog', 'Translation')
+    hashes = {translation_hash(text): text for text in texts}
+    # 数据库不可用时（如尚未迁移）退回翻译后端
+    try:
+        rows = translation_model.objects.filter(
+            source_hash__in=list(hashes), from_lang=from_lang, to_lang=to_lang
+        ).values_list('source_hash', 'text')
+        return {hashes[source_hash]: text for source_hash, text in rows}
+    except DatabaseError as e:
+        logger.warning(f"读取翻译缓存失败：{e}")
+        return {}
+
+
+def save_translations(translations, from_lang, to_lang):
+    """
+    将译文批量写入翻译缓存表，已存在的记录忽略
+    :param translations: {原文: 译文}
+    """
+    from django.apps import apps
+
+    translation_model = apps.get_model('blog', 'Translation')
+    try:
+        translation_model.objects.bulk_create([
+            translation_model(source_hash=translation_hash(source), source=source,
+                              from_lang=from_lang, to_lang=to_lang, text=text)
+            for source, text in translations.items()
+        ], ignore_conflicts=True)
+    except DatabaseError as e:
+        logger.warning(f"写入翻译缓存失败：{e}")
+
+
+def translate_many(texts, from_lang='zh', to_lang='en'):
+    """
+    批量翻译文本
+    依次查询进程内 LRU 缓存与数据库中的翻译缓存，仍未命中的原文合并后一次性交给翻译后端；
+    翻译失败的原文原样返回，且不写入缓存
+    :param texts: 要翻译的文本列表
     :param from_lang: 原文语言
     :param to_lang: 目标语言
-    :return: 翻译后的文本
+    :return: 与 texts 一一对应的译文列表
     """
-    salt = str(random.randint(32768, 65536))
-    sign_str = APP_ID + text + salt + SECRET_KEY
-    sign = hashlib.md5(sign_str.encode('utf-8')).hexdigest()
-
-    url = 'https://fanyi-api.baidu.com/api/trans/vip/translate'
-    params = {
-        'q': text,
-        'from': from_lang,
-        'to': to_lang,
-        'appid': APP_ID,
-        'salt': salt,
-        'sign': sign
-    }
+    results = {}
+    missing = []
+    for text in dict.fromkeys(texts):
+        cached = translation_cache.get((text, from_lang, to_lang))
+        if cached is not None:
+            results[text] = cached
+        elif not text.strip():
+            results[text] = text
+        else:
+            missing.append(text)
 
-    result = None
+    if missing:
+        stored = load_translations(missing, from_lang, to_lang)
+        pending = [text for text in missing if text not in stored]
 
-    try:
-        time.sleep(1)  # 翻译API访问频率受限
-        resp = requests.get(url, params=params, timeout=3)
-        result = resp.json()
-        return result['trans_result'][0]['dst']
-    except Exception as e:
-        print(f"翻译失败：{e}")
-        print(f"失败结果：{result}")
-        return text
+        translated = {}
+        if pending:
+            translator = get_translator()
+            translated = {
+                text: result
+                for text, result in zip(pending, translator.translate_many(pending, from_lang, to_lang))
+                if result
+            }
+            if translated and translator.persistent:
+                save_translations(translated, from_lang, to_lang)
+
+        for text in missing:
+            result = stored.get(text) or translated.get(text)
+            if result:
+                translation_cache.set((text, from_lang, to_lang), result)
+            results[text] = result or text
+
+    return [results[text] for text in texts]
+
+
+def translate(text, from_lang='zh', to_lang='en'):
+    """
+    翻译文本，经过与 translate_many 相同的缓存
+    :param text: 要翻译的文本
+    :param from_lang: 原文语言
+    :param to_lang: 目标语言
+    :return: 翻译后的文本
+    """
+    return translate_many([text], from_lang, to_lang)[0]
 
 
 def slugify_translate(text):
     """
     翻译并生成 URL 友好的字符串
     """
-    translate_text = translate_baidu(text)
+    translate_text = translate(text)
     return slugify(translate_text)
@@ -1,16 +1,20 @@
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
-from blog.models import Post, Category, Tag
+from blog.models import Post, Category, Tag, get_category_tree
 from django.shortcuts import get_object_or_404
 from django.utils.functional import cached_property
+from blog.pagination import CursorPaginationMixin
+from blog.pagecache import PageCacheMixin, on_page_hit, get_page_cache_stats
+from blog.conditional import ConditionalGetMixin, merge_latest, post_validators
 from blog.utils import render_markdown
+from blog.stats import record_visitor, record_post_visit
 
 from django.views.generic import DetailView
 from django.views.generic import ListView
 from django.urls import reverse
-from django.db.models import Case, When, Value, F
 
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Q
 
 from haystack.query import SearchQuerySet
@@ -20,8 +24,8 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.template.loader import render_to_string
 from blog.utils import normalize_highlight, is_highlight_title_first
 
-from django.db.models import Count
-from django.db.models.functions import Coalesce, ExtractYear, TruncYear
+from django.db.models import Count, Max
+from django.db.models.functions import ExtractYear, TruncYear
 from django.views.generic import TemplateView
 from django.db.models import Prefetch
 from blog.utils import update_obsidian_links
@@ -71,7 +75,7 @@ class BreadcrumbMixin:
 
 
 # 用于处理 Post 模型对象列表的视图逻辑
-class IndexView(BreadcrumbMixin, ListView):
+class IndexView(ConditionalGetMixin, PageCacheMixin, BreadcrumbMixin, CursorPaginationMixin, ListView):
     """
     类的继承顺序影响类的继承链（MRO，方法解析顺序）。
     类的继承链：IndexView -> BreadcrumbMixin -> ListView -> TemplateView -> View -> object
@@ -85,6 +89,9 @@ class IndexView(BreadcrumbMixin, ListView):
     # 指定 paginate_by 属性后开启分页功能，其值代表每页有多少个文章
     paginate_by = 10
 
+    # 游标分页（?after= / ?before=）的排序字段，与 get_queryset 的排序一致
+    cursor_fields = ('pin', 'effective_time', 'pk')
+
     # # 先按照文章创建时间倒序排列，如果创建时间相同，则按照文章修改时间倒序排列
     # # 这样的排序对那些没有 modified_time 的文章会有问题，不适合modified_time字段为空的情况
     # ordering = ['-modified_time', '-created_time']
@@ -92,17 +99,20 @@ class IndexView(BreadcrumbMixin, ListView):
     def get_queryset(self):
         # 获取基础查询集
         queryset = super().get_queryset() \
-            .only('pk', 'title', 'slug', 'excerpt', 'created_time', 'modified_time') \
+            .only('pk', 'title', 'slug', 'excerpt', 'pin', 'created_time', 'modified_time') \
             .prefetch_related(Prefetch('categories', queryset=Category.objects.only('name')))
 
-        # 首先按修改时间排序，如果么有，使用创建时间排序，动态选择合适的时间字段用于排序
-        return queryset.annotate(  # 使用 annotate() 方法添加额外的字段
-            ordering_time=Case(
-                When(modified_time__isnull=False, then=F('modified_time')),
-                When(modified_time__isnull=True, then=F('created_time')),
-                default=F('created_time'),
-            )
-        ).order_by('-ordering_time')
+        # 置顶文章在前，再按修改时间排序，如果么有，使用创建时间排序
+        # effective_time 保存时已按此规则计算，与 pin 组成联合索引，分页查询为索引范围扫描
+        # 主键保证排序唯一，游标分页依赖于此
+        return queryset.order_by('-pin', '-effective_time', '-pk')
+
+    def get_validators(self):
+        return post_validators(Post.objects.all())
+
+    def get_page_dependencies(self, context):
+        # 文章的增删、排序变化与标题修改清除 'posts'，只修改摘要等字段时只清除包含该文章的页面
+        return ['posts', 'categories', *(f'post:{post.pk}' for post in context['post_list'])]
 
     def get_breadcrumbs(self):
         return [
@@ -115,14 +125,14 @@ class IndexView(BreadcrumbMixin, ListView):
         ]
 
 
-class PostDetailView(BreadcrumbMixin, DetailView):
+class PostDetailView(ConditionalGetMixin, PageCacheMixin, BreadcrumbMixin, DetailView):
     model = Post
     template_name = 'blog/post.html'
     context_object_name = 'post'
 
     def get_queryset(self):
-        # 获取查询集：优化查询，关联外键字段
-        queryset = Post.objects.select_related('author').prefetch_related('categories', 'tags')
+        # 获取查询集：优化查询，关联外键字段，正文与目录保存在 PostContent 中，一并查询
+        queryset = Post.objects.select_related('author', 'content').prefetch_related('categories', 'tags')
         return queryset
 
     def get_object(self, queryset=None):
@@ -135,18 +145,40 @@ class PostDetailView(BreadcrumbMixin, DetailView):
         context = super().get_context_data(**kwargs)  # 返回包含上下文数据的的字典
         post = self.object  # 获取当前文章对象
 
-        # 阅读量 +1
+        # 阅读量 +1：只计入缓存中的浏览量缓冲，显示的浏览量为数据库中的值加上尚未写回的增量
         post.increase_views()
+        # 独立访客：只写入进程内的草图，由后台线程批量写回
+        record_visitor(post.pk, self.request)
+        # 整页缓存命中时不执行视图，由缓存中间件计入浏览量与独立访客
+        on_page_hit(self.request, 'blog.stats.record_post_visit', post.pk)
 
         # 如果文章的正文或目录为空，则使用 Markdown 渲染器进行渲染
         if not post.rendered_body or not post.toc:
-            post.rendered_body, post.toc = render_markdown(post.body, title=post.title)
+            post.set_rendered(*render_markdown(post.body, title=post.title))
 
         # 将处理后的 post 对象传递给模板
         context['post'] = post
 
         return context
 
+    def get_validators(self):
+        # 更新时间（随页面显示的字段、标签与分类变化）与渲染摘要（随渲染结果变化），只读取一行中的几列，不读取正文
+        post = Post.objects.filter(slug=self.kwargs.get('slug')).values('pk', 'updated_time', 'render_hash').first()
+        if post is None:
+            return None
+        self.post_pk = post['pk']
+        return {'latest': post['updated_time'], 'pk': post['pk'], 'render_hash': post['render_hash']}
+
+    def not_modified(self):
+        # 返回 304 时不执行视图，在此计入浏览量与独立访客
+        record_post_visit(self.request, self.post_pk)
+
+    def get_page_dependencies(self, context):
+        post = context['post']
+        return [
+            'categories', f'post:{post.pk}', f'comments:{post.pk}', *(f'tag:{tag.pk}' for tag in post.tags.all())
+        ]
+
     def get_breadcrumbs(self):
         post = getattr(self, 'object', None)
         if not post:
@@ -162,24 +194,28 @@ class PostDetailView(BreadcrumbMixin, DetailView):
         ]
 
 
-class CategoryListView(BreadcrumbMixin, ListView, ):
+class CategoryListView(ConditionalGetMixin, PageCacheMixin, BreadcrumbMixin, ListView, ):
     model = Category
     template_name = 'blog/categories.html'
     context_object_name = 'category_list'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        categories = Category.objects.filter(parent__isnull=True).order_by('name')
-        for category in categories:
-            # 查询该分类下的文章并仅获取需要的字段
-            posts = category.post_set.only('title', 'created_time', 'modified_time').order_by('-created_time')
-            # 为每个类别动态设置 posts_list 属性
-            category.posts_list = posts
-
-        context['categories'] = categories
+        # 顶级分类及其文章数、子分类数与文章列表，查询次数固定并缓存，分类或文章变化时清除
+        context['categories'] = get_category_tree()
 
         return context
 
+    def get_validators(self):
+        # 分类数、文章与分类的关联数，以及分类与其中文章的最新更新时间
+        return merge_latest(Category.objects.aggregate(
+            latest=Max('post__updated_time'), category_updated=Max('updated_time'),
+            categories=Count('pk', distinct=True), count=Count('post'),
+        ), 'category_updated')
+
+    def get_page_dependencies(self, context):
+        return ['categories', 'posts']
+
     def get_breadcrumbs(self):
         return [
             {'title': '首页', 'url': reverse('blog:index')},
@@ -192,20 +228,24 @@ class CategoryListView(BreadcrumbMixin, ListView, ):
         ]
 
 
-class CategoryDetailView(BreadcrumbMixin, ListView):
+class CategoryDetailView(ConditionalGetMixin, PageCacheMixin, BreadcrumbMixin, ListView):
     model = Post
     template_name = 'blog/category.html'
     context_object_name = 'related_posts'
 
     @cached_property
     def selected_category(self):
-        category_slug = self.kwargs.get('slug', None)  # 获取 URL 中的分类 slug 参数
-        return get_object_or_404(Category, slug=category_slug)
+        category_path = self.kwargs.get('slug', None)  # 获取 URL 中的分类路径，如 python/django
+        return get_object_or_404(Category, path=category_path)
 
     def get_queryset(self, **kwargs):
         # 使用 select_related 和prefetch_related 来预加载相关对象，提高查询效率
         # return Post.objects.filter(categories=selected_category).select_related('author').prefetch_related('tags')
-        return Post.objects.filter(categories=self.selected_category).only('title', 'created_time', 'modified_time')
+        # 当前分类及所有子孙分类下的文章：按物化路径前缀匹配分类，一次查询完成，同时属于多个子分类的文章只出现一次
+        category = self.selected_category
+        return Post.objects.filter(
+            Q(categories__path=category.path) | Q(categories__path__startswith=f'{category.path}/')
+        ).distinct().only('title', 'created_time', 'modified_time')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -213,6 +253,21 @@ class CategoryDetailView(BreadcrumbMixin, ListView):
 
         return context
 
+    def get_validators(self):
+        path = self.kwargs.get('slug')
+        validators = Category.objects.filter(Q(path=path) | Q(path__startswith=f'{path}/')).aggregate(
+            latest=Max('post__updated_time'),
+            category_updated=Max('updated_time'),
+            categories=Count('pk', distinct=True),
+            count=Count('post', distinct=True),
+        )
+        # 分类不存在时照常执行视图，返回 404
+        return merge_latest(validators, 'category_updated') if validators['categories'] else None
+
+    def get_page_dependencies(self, context):
+        # 分类路径随上级分类变化，分类的任何变化都清除 'categories'
+        return ['categories', *(f'post:{post.pk}' for post in context['related_posts'])]
+
     def get_breadcrumbs(self):
         return [
             {'title': '首页', 'url': reverse('blog:index')},
@@ -226,7 +281,7 @@ class CategoryDetailView(BreadcrumbMixin, ListView):
         ]
 
 
-class TagListView(BreadcrumbMixin, ListView):
+class TagListView(ConditionalGetMixin, PageCacheMixin, BreadcrumbMixin, ListView):
     model = Tag
     template_name = 'blog/tags.html'
     context_object_name = 'tag_list'
@@ -237,6 +292,15 @@ class TagListView(BreadcrumbMixin, ListView):
             num_posts=Count('post')  # 聚合函数，计算与每个标签关联的文章数量
         ).order_by('-num_posts')  # 按照文章数量降序排列
 
+    def get_validators(self):
+        # 标签数、文章与标签的关联数及标签的最新更新时间（改名与关联变化时更新），页面不显示文章
+        return Tag.objects.aggregate(
+            latest=Max('updated_time'), tags=Count('pk', distinct=True), count=Count('post'),
+        )
+
+    def get_page_dependencies(self, context):
+        return ['tags']
+
     def get_breadcrumbs(self):
         return [
             {'title': '首页', 'url': reverse('blog:index')},
@@ -249,7 +313,7 @@ class TagListView(BreadcrumbMixin, ListView):
         ]
 
 
-class TagDetailView(BreadcrumbMixin, ListView):
+class TagDetailView(ConditionalGetMixin, PageCacheMixin, BreadcrumbMixin, ListView):
     model = Post
     template_name = 'blog/tag.html'
     context_object_name = 'post_list'
@@ -282,6 +346,17 @@ class TagDetailView(BreadcrumbMixin, ListView):
 
         return context
 
+    def get_validators(self):
+        validators = Tag.objects.filter(slug=self.kwargs.get('slug')).aggregate(
+            latest=Max('post__updated_time'), tag_updated=Max('updated_time'),
+            tags=Count('pk', distinct=True), count=Count('post'),
+        )
+        # 标签不存在时照常执行视图，返回 404
+        return merge_latest(validators, 'tag_updated') if validators['tags'] else None
+
+    def get_page_dependencies(self, context):
+        return [f'tag:{self.selected_tag.pk}', *(f'post:{post.pk}' for post in context['post_list'])]
+
     def get_breadcrumbs(self):
         return [
             {'title': '首页', 'url': reverse('blog:index')},
@@ -295,7 +370,7 @@ class TagDetailView(BreadcrumbMixin, ListView):
         ]
 
 
-class ArchiveView(BreadcrumbMixin, ListView):
+class ArchiveView(ConditionalGetMixin, PageCacheMixin, BreadcrumbMixin, ListView):
     model = Post
     template_name = 'blog/archives.html'
     context_object_name = 'post_list'
@@ -310,10 +385,11 @@ class ArchiveView(BreadcrumbMixin, ListView):
         #     year=ExtractYear(Coalesce('modified_time', 'created_time')),
         # ).order_by('-year', Coalesce('modified_time', 'created_time').desc())
 
+        # 年份随 effective_time 单调变化，只按已建索引的 effective_time 排序即可
         posts = super(ArchiveView, self).get_queryset().annotate(
-            year=ExtractYear(Coalesce('modified_time', 'created_time')),
-        ).only('title', 'modified_time', 'created_time') \
-            .order_by('-year', Coalesce('modified_time', 'created_time').desc())
+            year=ExtractYear('effective_time'),
+        ).only('title', 'slug', 'modified_time', 'created_time') \
+            .order_by('-effective_time')
 
         # 按年份分组
         post_list_by_year = {}
@@ -326,6 +402,12 @@ class ArchiveView(BreadcrumbMixin, ListView):
 
         return context
 
+    def get_validators(self):
+        return post_validators(Post.objects.all())
+
+    def get_page_dependencies(self, context):
+        return ['posts']
+
     def get_breadcrumbs(self):
         return [
             {'title': '首页', 'url': reverse('blog:index')},
@@ -338,7 +420,7 @@ class ArchiveView(BreadcrumbMixin, ListView):
         ]
 
 
-class AboutView(BreadcrumbMixin, TemplateView):
+class AboutView(PageCacheMixin, BreadcrumbMixin, TemplateView):
     template_name = 'blog/about.html'
 
     def get_breadcrumbs(self):
@@ -456,3 +538,9 @@ def robots_txt(request):
     ]
 
     return HttpResponse("\n".join(lines), content_type="text/plain")
+
+
+@staff_member_required
+def page_cache_stats(request):
+    """整页缓存的命中统计，只统计处理本次请求的进程"""
+    return JsonResponse(get_page_cache_stats())
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
+from blog.pagecache import purge_pages
 
 
 # Create your models here.
@@ -26,3 +29,12 @@ class Comment(models.Model):
     def __str__(self):
         # format方法用于格式化字符串，替换占位符为实际的值
         return '{}: {}'.format(self.name, self.text[:20])
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    """
+    评论变化时清除整页缓存中所评论文章的详情页，文章列表不显示评论，不受影响
+    """
+    post_id = instance.post_id
+    transaction.on_commit(lambda: purge_pages(f'comments:{post_id}'))
@@ -100,8 +100,8 @@ HAYSTACK_CONNECTIONS = {
 }
 
 # 可选的配置项
-# 设置实时信号处理器，以便在模型保存时自动更新索引
-HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
+# 设置实时信号处理器，以便在模型保存时自动更新索引；只更新浏览量等未被索引的字段时跳过
+HAYSTACK_SIGNAL_PROCESSOR = 'blog.signals.UpdateFieldsSignalProcessor'
 # 指定自定义高亮显示器，用于搜索结果中的高亮显示
 HAYSTACK_CUSTOM_HIGHLIGHTER = 'blog.utils.CustomHighlighter'
 
@@ -113,11 +113,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # 匿名用户的整页缓存，命中时不执行视图
+    'blog.pagecache.PageCacheMiddleware',
     'blog.middleware.StoreLastURLMiddleware',  # 自定义中间件
 ]
 
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
+# 返回地址（last_url）的保存位置，见 blog.middleware.StoreLastURLMiddleware
+# None：不保存，普通 GET 请求不读写会话；'session'：每个请求写入服务器会话
+LAST_URL_STORAGE = None
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -168,6 +174,65 @@ DATABASES = {
     }
 }
 
+# 缓存配置
+# default：进程内缓存，用于侧边栏等短期数据
+# render：Markdown 渲染结果缓存，存储于数据库，多个 uWSGI 进程共享且重启后仍有效
+# 需先执行 python manage.py createcachetable 创建缓存表
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'render': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'render_cache',
+        'TIMEOUT': None,  # 渲染结果按内容摘要寻址，无需过期
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,  # 最大缓存条目数，超出后按 CULL_FREQUENCY 淘汰
+            'CULL_FREQUENCY': 4,  # 达到上限时淘汰 1/4 的条目
+        },
+    },
+    # pages：匿名用户的整页缓存，存储于数据库，多个进程共享，保存文章、标签、分类或评论时按依赖清除
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'page_cache',
+        'TIMEOUT': 300,  # 与 blog.pagecache.PAGE_CACHE_TIMEOUT 一致
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # views：浏览量计数缓冲，浏览时只在缓存中计数，由后台线程定期批量写回数据库
+    # 进程内缓存的计数各进程独立：页面显示的浏览量只包含本进程未写回的增量，
+    # 进程被强制回收（如 uWSGI 的 harakiri、max-requests）时不会执行退出时的写回，最多丢失一个写回间隔内的计数
+    # 改用 Redis 等多进程共享的缓存时，应将 FLUSH_VIEW_COUNTS_IN_THREAD 设为 False 并定时执行 flush_views 命令，
+    # 该命令在进程内缓存上读不到其他进程的计数，会拒绝执行
+    'views': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'views',
+        'TIMEOUT': None,  # 计数在写回前不能过期
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# 浏览量与独立访客草图的写回间隔（秒），0 表示不启动后台写回线程，此时不记录独立访客
+VIEW_FLUSH_INTERVAL = 60
+
+# 后台线程是否写回浏览量计数，独立访客草图保存在进程内，总是由后台线程写回
+FLUSH_VIEW_COUNTS_IN_THREAD = True
+
+# 可信反向代理的地址：直接连接方为其中之一时，才从 X-Forwarded-For 中读取客户端 IP（用于统计独立访客）
+# Nginx 通过 uwsgi_pass 转发时 REMOTE_ADDR 已是客户端地址，无需配置
+TRUSTED_PROXIES = []
+
+# 热门文章热度的半衰期（秒），热度为按此半衰期指数衰减的浏览量
+# 热度以半衰期为单位保存，修改后已有热度与新增浏览的热度不再可比，需重新积累
+POPULAR_POSTS_HALF_LIFE = 7 * 24 * 3600
+
+# 翻译后端，用于根据标题生成 slug，翻译结果持久化在 Translation 表中
+TRANSLATION_BACKEND = 'blog.translators.BaiduTranslator'
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,13 @@
+"""
+测试设置，在开发设置的基础上替换依赖外部服务的配置
+
+运行测试：DJANGO_SETTINGS_MODULE=settings.test python manage.py test
+"""
+
+from .development import *
+
+# 使用本地桩翻译后端，测试不访问网络
+TRANSLATION_BACKEND = 'blog.translators.StubTranslator'
+
+# 不启动浏览量后台写回线程，测试中由用例显式写回
+VIEW_FLUSH_INTERVAL = 0
@@ -0,0 +1,63 @@
+/**
+ * 文章编辑页实时预览：正文停止输入一段时间后提交到预览接口，服务端按块增量渲染
+ */
+
+(function () {
+  const DELAY = 300;
+
+  function previewUrl() {
+    // 编辑页地址为 .../blog/post/add/ 或 .../blog/post/<id>/change/，预览接口位于 .../blog/post/preview/
+    const match = window.location.pathname.match(/^(.*\/blog\/post\/)/);
+    return match ? match[1] + 'preview/' : null;
+  }
+
+  function init() {
+    const body = document.getElementById('id_body');
+    const title = document.getElementById('id_title');
+    const csrf = document.querySelector('input[name="csrfmiddlewaretoken"]');
+    const url = previewUrl();
+    if (!body || !csrf || !url) {
+      return;
+    }
+
+    const preview = document.createElement('div');
+    preview.id = 'post-preview';
+    preview.className = 'post-preview';
+    body.closest('.form-row').insertAdjacentElement('afterend', preview);
+
+    let timer = null;
+    let pending = null;
+
+    function refresh() {
+      // 只保留最后一次请求的结果
+      if (pending) {
+        pending.abort();
+      }
+      pending = new AbortController();
+
+      const data = new FormData();
+      data.append('csrfmiddlewaretoken', csrf.value);
+      data.append('title', title ? title.value : '');
+      data.append('body', body.value);
+
+      fetch(url, { method: 'POST', body: data, signal: pending.signal })
+        .then((response) => (response.ok ? response.json() : Promise.reject(response.status)))
+        .then((result) => {
+          preview.innerHTML = result.toc + result.html;
+        })
+        .catch((error) => {
+          if (error.name !== 'AbortError') {
+            console.error('预览失败：', error);
+          }
+        });
+    }
+
+    body.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(refresh, DELAY);
+    });
+    refresh();
+  }
+
+  document.addEventListener('DOMContentLoaded', init);
+})();
@@ -9,6 +9,9 @@ cd ${PROJECT_PATH}
 # 数据库迁移
 pipenv run python manage.py migrate
 
+# 创建缓存表（渲染结果缓存）
+pipenv run python manage.py createcachetable
+
 # 收集静态文件 
 pipenv run python manage.py collectstatic --noinput
 